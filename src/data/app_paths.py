@@ -0,0 +1,18 @@
+import os
+
+# 應用程式資料（快取、起點設定等）存放的目錄
+APP_DATA_DIR = os.path.join(os.path.expanduser('~'), '.routemap')
+
+
+def app_data_dir(*parts):
+    """取得應用程式資料目錄下的子目錄，並確保其存在"""
+    path = os.path.join(APP_DATA_DIR, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def app_data_path(*parts):
+    """取得應用程式資料目錄下的檔案路徑，並確保上層目錄存在"""
+    path = os.path.join(APP_DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+
+class AppendBuffer:
+    """可在尾端附加數據的一維陣列
+
+    保留比實際筆數大的容量，附加時只複製新增的部分，容量不足時加倍，
+    每筆的攤銷成本為常數。values 為實際數據的視圖，不複製；新數據的型別
+    較寬時（例如整數欄位出現 NaN）整個緩衝區改用共同型別。
+    """
+    def __init__(self, values, min_capacity=1024):
+        values = np.asarray(values)
+        self._data = np.empty(max(2 * len(values), min_capacity), dtype=values.dtype)
+        self._data[:len(values)] = values
+        self.length = len(values)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def values(self):
+        return self._data[:self.length]
+
+    def holds(self, values):
+        """values 是否為此緩衝區目前的內容（例如由 values 建立的欄位）"""
+        return len(values) == self.length and np.may_share_memory(values, self._data)
+
+    def truncate(self, length):
+        """捨棄 length 之後的數據，保留容量"""
+        self.length = min(length, self.length)
+
+    def append(self, values):
+        """附加數據，回傳附加後的 values"""
+        values = np.asarray(values)
+        end = self.length + len(values)
+        dtype = np.result_type(self._data.dtype, values.dtype)
+        if end > len(self._data) or dtype != self._data.dtype:
+            grown = np.empty(max(2 * end, len(self._data)), dtype=dtype)
+            grown[:self.length] = self._data[:self.length]
+            self._data = grown
+        self._data[self.length:end] = values
+        self.length = end
+        return self.values
+
+
+class FrameBuffers:
+    """以 AppendBuffer 保存 DataFrame 的各欄位，附加數據時不重新複製整個 DataFrame
+
+    append 回傳的 DataFrame 各欄位都是緩衝區的視圖，下次附加時只寫入新增的
+    筆數。欄位不是由緩衝區提供時（第一次附加、之後才載入或被整欄取代），
+    才在附加時複製一次到新的緩衝區。
+    """
+    def __init__(self):
+        self.buffers = {}
+
+    def append(self, frame, new_rows, exclude=()):
+        """回傳 frame 加上 new_rows 的 DataFrame，欄位與順序同 frame
+
+        exclude 中的欄位（例如之後會重新計算的衍生通道）不保留；
+        new_rows 缺少的欄位以 NaN（文字欄位為 None）補齊。
+        """
+        buffers = {}
+        for name in frame.columns:
+            if name in exclude:
+                continue
+            buffer = self.buffers.get(name)
+            current = frame[name].to_numpy()
+            if buffer is None or not buffer.holds(current):
+                buffer = AppendBuffer(current)
+            if name in new_rows.columns:
+                values = new_rows[name].to_numpy()
+            elif buffer.values.dtype.kind in 'fiub':
+                values = np.full(len(new_rows), np.nan)
+            else:
+                values = np.full(len(new_rows), None, dtype=object)
+            buffer.append(values)
+            buffers[name] = buffer
+        self.buffers = buffers
+        return pd.DataFrame({name: self._column(buffer) for name, buffer in buffers.items()}, copy=False)
+
+    @staticmethod
+    def _column(buffer):
+        values = buffer.values
+        if values.dtype == object:
+            # 不讓 pandas 推測為字串型別，否則會複製整個欄位
+            return pd.Series(values, dtype=object, copy=False)
+        return values
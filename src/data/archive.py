@@ -0,0 +1,264 @@
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from data.timestamps import format_time_ms, parse_time_ms
+
+ARCHIVE_SUFFIX = '.rimsa'
+ARCHIVE_FILE_FILTER = "RIMS 封存檔 (*.rimsa)"
+ARCHIVE_VERSION = 1
+BLOCK_ROWS = 65536
+
+_MAGIC = b'RIMSARC1'
+# 檔尾：索引的位置與長度
+_TRAILER = struct.Struct('<QQ8s')
+# 經緯度以 1e-7 度的整數儲存（約 1 公分）
+_COORDINATE_SCALE = 10 ** 7
+_COORDINATE_COLUMNS = ('Longitude', 'Latitude')
+_INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_SUFFIX)
+
+
+def _narrow_int(low, high):
+    """能容納 [low, high] 的最小整數型別"""
+    for dtype in _INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    raise OverflowError(f"數值超出範圍: {low} ~ {high}")
+
+
+def _encode_column(name, values):
+    """決定欄位的編碼方式，回傳 (欄位描述, 編碼前的陣列)
+
+    Time 轉為毫秒、經緯度轉為 1e-7 度的整數，兩者以區塊內差值儲存；
+    整數欄位使用最小的整數型別；其他數值欄位保留 float64；其餘為文字。
+    """
+    if name == 'Time':
+        ms = parse_time_ms(values)
+        if len(ms) and np.isfinite(ms).all():
+            return {'name': name, 'encoding': 'delta', 'scale': 1, 'restore': 'time'}, np.round(ms).astype(np.int64)
+    elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        array = values.to_numpy()
+        restore = array.dtype.str
+        if name in _COORDINATE_COLUMNS and np.isfinite(array).all():
+            fixed = np.round(array.astype(float) * _COORDINATE_SCALE).astype(np.int64)
+            return {'name': name, 'encoding': 'delta', 'scale': _COORDINATE_SCALE, 'restore': restore}, fixed
+        if array.dtype.kind in 'iu':
+            integral = True
+        else:
+            integral = bool(np.isfinite(array).all() and (array == np.round(array)).all()
+                            and (np.abs(array) < 2 ** 62).all())
+        if integral and len(array):
+            array = array.astype(np.int64)
+            dtype = _narrow_int(array.min(), array.max())
+            return {'name': name, 'encoding': 'int', 'dtype': np.dtype(dtype).str, 'restore': restore}, array
+        return {'name': name, 'encoding': 'float', 'dtype': '<f8', 'restore': '<f8'}, array.astype('<f8')
+    return {'name': name, 'encoding': 'text'}, values.astype(str).to_numpy(dtype=object)
+
+
+def _delta_dtype(encoded, block_rows):
+    """區塊內相鄰差值使用的整數型別（每個區塊第一筆的值另存於索引）"""
+    steps = np.diff(encoded)
+    if len(steps):
+        # 區塊邊界的差值不會被儲存
+        steps[block_rows - 1::block_rows] = 0
+    if not len(steps):
+        return np.int8
+    return _narrow_int(steps.min(), steps.max())
+
+
+def write_archive(path, frame, laps=None, start_point=None, block_rows=BLOCK_ROWS, level=6):
+    """將數據寫入封存檔
+
+    每個欄位按 block_rows 筆分塊，各自以 zlib 壓縮，索引中記錄每個區塊的
+    位置與最小/最大值，讀取時只需解壓用到的區塊。laps 與 start_point 的
+    格式與快取相同。回傳封存檔的索引。
+    """
+    columns = []
+    encoded_columns = []
+    for name in frame.columns:
+        info, encoded = _encode_column(name, frame[name])
+        if info['encoding'] == 'delta':
+            info['dtype'] = np.dtype(_delta_dtype(encoded, block_rows)).str
+        info['blocks'] = []
+        columns.append(info)
+        encoded_columns.append(encoded)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        for info, encoded in zip(columns, encoded_columns):
+            for block_start in range(0, len(frame), block_rows):
+                chunk = encoded[block_start:block_start + block_rows]
+                block = {'offset': f.tell()}
+                if info['encoding'] == 'text':
+                    payload = '\n'.join(chunk).encode('utf-8')
+                else:
+                    if info['encoding'] == 'delta':
+                        block['base'] = int(chunk[0])
+                        payload = np.diff(chunk, prepend=chunk[0]).astype(info['dtype']).tobytes()
+                    else:
+                        payload = chunk.astype(info['dtype']).tobytes()
+                    # 區塊統計值使用還原後的單位
+                    finite = chunk[np.isfinite(chunk)] if chunk.dtype.kind == 'f' else chunk
+                    if len(finite):
+                        scale = info.get('scale', 1)
+                        low, high = finite.min().item(), finite.max().item()
+                        block['min'] = low / scale if scale != 1 else low
+                        block['max'] = high / scale if scale != 1 else high
+                data = zlib.compress(payload, level)
+                f.write(data)
+                block['length'] = len(data)
+                info['blocks'].append(block)
+
+        meta = {
+            'version': ARCHIVE_VERSION,
+            'rows': len(frame),
+            'block_rows': block_rows,
+            'columns': columns,
+            'laps': laps,
+            'start_point': start_point,
+        }
+        index = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+        index_offset = f.tell()
+        f.write(index)
+        f.write(_TRAILER.pack(index_offset, len(index), _MAGIC))
+    os.replace(tmp_path, path)
+    return meta
+
+
+class ArchiveReader:
+    """封存檔的隨機存取讀取
+
+    開啟時只讀取檔尾的索引；依列範圍或時間範圍讀取時，
+    只解壓涵蓋該範圍的區塊。
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"不是 RIMS 封存檔: {path}")
+            f.seek(-_TRAILER.size, os.SEEK_END)
+            index_offset, index_length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"封存檔不完整: {path}")
+            f.seek(index_offset)
+            self.meta = json.loads(f.read(index_length).decode('utf-8'))
+        if self.meta.get('version') != ARCHIVE_VERSION:
+            raise ValueError(f"不支援的封存檔版本: {self.meta.get('version')}")
+        self.rows = self.meta['rows']
+        self.block_rows = self.meta['block_rows']
+        self._columns = {column['name']: column for column in self.meta['columns']}
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    @property
+    def laps(self):
+        return self.meta.get('laps')
+
+    def _decode_block(self, f, info, block_number):
+        block = info['blocks'][block_number]
+        f.seek(block['offset'])
+        payload = zlib.decompress(f.read(block['length']))
+        if info['encoding'] == 'text':
+            return np.array(payload.decode('utf-8').split('\n'), dtype=object)
+        values = np.frombuffer(payload, dtype=info['dtype'])
+        if info['encoding'] == 'delta':
+            values = block['base'] + np.cumsum(values, dtype=np.int64)
+        return values
+
+    def _finish_column(self, info, values):
+        """將編碼後的數值還原成原本的型別"""
+        if info['encoding'] == 'delta':
+            if info['restore'] == 'time':
+                return np.asarray(format_time_ms(values), dtype=object)
+            values = values / info['scale']
+        if info['encoding'] == 'text':
+            return values
+        return values.astype(info['restore'])
+
+    def _select(self, columns):
+        if columns is None:
+            return self.columns
+        if callable(columns):
+            return [name for name in self._columns if columns(name)]
+        return [name for name in columns if name in self._columns]
+
+    def read_rows(self, start=0, stop=None, columns=None):
+        """讀取 [start, stop) 列，回傳以原始列號為索引的 DataFrame"""
+        stop = self.rows if stop is None else min(stop, self.rows)
+        start = max(0, min(start, stop))
+        names = self._select(columns)
+        first_block = start // self.block_rows
+        last_block = (stop - 1) // self.block_rows if stop > start else first_block - 1
+        trim = start - first_block * self.block_rows
+
+        data = {}
+        with open(self.path, 'rb') as f:
+            for name in names:
+                info = self._columns[name]
+                parts = [self._decode_block(f, info, number) for number in range(first_block, last_block + 1)]
+                if parts:
+                    values = np.concatenate(parts)
+                else:
+                    values = np.empty(0, dtype=object if info['encoding'] == 'text' else info['dtype'])
+                data[name] = self._finish_column(info, values[trim:trim + stop - start])
+        return pd.DataFrame(data, index=pd.RangeIndex(start, stop))
+
+    def read(self, columns=None):
+        """讀取全部數據"""
+        frame = self.read_rows(0, self.rows, columns)
+        return frame.reset_index(drop=True)
+
+    def row_range_for_time(self, start_ms=None, end_ms=None):
+        """找出 Time 落在 [start_ms, end_ms] 的列範圍 (start, stop)
+
+        時間以 parse_time_ms 的毫秒表示。先以各區塊的最小/最大值排除
+        不相交的區塊，只解壓邊界上的區塊。
+        """
+        info = self._columns.get('Time')
+        if info is None or info['encoding'] != 'delta':
+            raise ValueError("封存檔沒有可索引的時間欄位")
+        start_ms = -np.inf if start_ms is None else start_ms
+        end_ms = np.inf if end_ms is None else end_ms
+        candidates = [number for number, block in enumerate(info['blocks'])
+                      if block['max'] >= start_ms and block['min'] <= end_ms]
+        if not candidates:
+            return 0, 0
+        with open(self.path, 'rb') as f:
+            first = candidates[0]
+            values = self._decode_block(f, info, first)
+            start = first * self.block_rows + int(np.argmax(values >= start_ms))
+            last = candidates[-1]
+            if last != first:
+                values = self._decode_block(f, info, last)
+            inside = np.flatnonzero(values <= end_ms)
+            stop = last * self.block_rows + (int(inside[-1]) + 1 if len(inside) else 0)
+        return start, max(start, stop)
+
+    def read_time_window(self, start_ms=None, end_ms=None, columns=None):
+        """讀取時間範圍內的數據（時間需為遞增）"""
+        start, stop = self.row_range_for_time(start_ms, end_ms)
+        return self.read_rows(start, stop, columns)
+
+    def read_lap(self, range_number, columns=None):
+        """讀取封存時記錄的指定單圈"""
+        for lap in self.laps or []:
+            if lap['range_number'] == range_number:
+                return self.read_rows(lap['start_index'], lap['end_index'] + 1, columns)
+        raise KeyError(f"封存檔中沒有 Run{range_number}")
+
+
+def read_archive(path, usecols=None):
+    """讀取整個封存檔，usecols 的用法與 read_log 相同"""
+    return ArchiveReader(path).read(usecols)
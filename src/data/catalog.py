@@ -0,0 +1,249 @@
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from data.app_paths import app_data_path
+from data.lap_detector import GATE_TOLERANCE
+from data.session_cache import SessionCache, ingest_file
+from data.session_merge import file_start_time
+
+# 目錄中記錄最小/最大/平均值的欄位
+CATALOG_CHANNELS = ('G Speed', 'R Scale 1', 'R Scale 2')
+
+# 尋找換行位置時每次讀取的位元組數
+SCAN_BYTES = 4 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    recorded_at TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    rows INTEGER,
+    duration REAL,
+    gate_x REAL,
+    gate_y REAL,
+    lap_count INTEGER,
+    best_lap REAL,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS laps (
+    id INTEGER PRIMARY KEY,
+    log_id INTEGER NOT NULL REFERENCES logs(id) ON DELETE CASCADE,
+    range_number INTEGER NOT NULL,
+    start_index INTEGER,
+    end_index INTEGER,
+    start_time_ms REAL,
+    end_time_ms REAL,
+    duration REAL,
+    duration_str TEXT,
+    data_count INTEGER,
+    start_offset INTEGER,
+    end_offset INTEGER
+);
+CREATE TABLE IF NOT EXISTS channel_stats (
+    log_id INTEGER NOT NULL REFERENCES logs(id) ON DELETE CASCADE,
+    lap_id INTEGER REFERENCES laps(id) ON DELETE CASCADE,
+    channel TEXT NOT NULL,
+    min REAL,
+    max REAL,
+    mean REAL
+);
+CREATE INDEX IF NOT EXISTS logs_recorded_at ON logs(recorded_at);
+CREATE INDEX IF NOT EXISTS logs_gate ON logs(gate_x, gate_y);
+CREATE INDEX IF NOT EXISTS laps_log ON laps(log_id);
+CREATE INDEX IF NOT EXISTS laps_duration ON laps(duration);
+CREATE INDEX IF NOT EXISTS channel_stats_log ON channel_stats(log_id);
+CREATE INDEX IF NOT EXISTS channel_stats_lap ON channel_stats(lap_id, channel);
+"""
+
+
+def _channel_stats(frame, start=0, stop=None):
+    """計算各欄位在 [start, stop) 的最小/最大/平均值"""
+    stats = {}
+    for channel in CATALOG_CHANNELS:
+        if channel not in frame.columns:
+            continue
+        values = frame[channel].to_numpy(dtype=float)[start:stop]
+        values = values[np.isfinite(values)]
+        if len(values):
+            stats[channel] = (float(values.min()), float(values.max()), float(values.mean()))
+    return stats
+
+
+def _row_offsets(path, indices):
+    """數據列在 CSV 檔案中的起始位元組位置，非 CSV 檔案時回傳 None"""
+    if not path.lower().endswith('.csv'):
+        return None
+    # 第 i 筆數據從第 i + 1 個換行之後開始（第一行是標題）；
+    # 分段讀取檔案，只記下需要的換行位置，不把整個檔案載入記憶體
+    wanted = np.asarray(indices, dtype=np.int64) + 1
+    order = np.argsort(wanted)
+    result = [None] * len(wanted)
+    position = 0
+    newlines = 0
+    next_wanted = 0
+    with open(path, 'rb') as f:
+        while next_wanted < len(order):
+            block = f.read(SCAN_BYTES)
+            if not block:
+                break
+            found = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n'))
+            while next_wanted < len(order) and wanted[order[next_wanted]] <= newlines + len(found):
+                k = order[next_wanted]
+                result[k] = position + int(found[wanted[k] - newlines - 1]) + 1
+                next_wanted += 1
+            newlines += len(found)
+            position += len(block)
+    return result
+
+
+def summarize_log(path, frame, time_ms, laps=None, start_point=None):
+    """整理記錄檔與單圈的目錄資料"""
+    stat = os.stat(path)
+    recorded_at, _ = file_start_time(path)
+    valid_ms = time_ms[np.isfinite(time_ms)] if time_ms is not None else np.empty(0)
+    record = {
+        'path': os.path.abspath(path),
+        'name': os.path.basename(path),
+        'recorded_at': recorded_at.isoformat(sep=' ') if recorded_at else None,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'rows': len(frame),
+        'duration': float(valid_ms[-1] - valid_ms[0]) / 1000.0 if len(valid_ms) else None,
+        'gate': (start_point['x'], start_point['y']) if start_point else None,
+        'channels': _channel_stats(frame),
+        'laps': [],
+    }
+
+    laps = laps or []
+    offsets = _row_offsets(path, [index for lap in laps for index in (lap['start_index'], lap['end_index'] + 1)])
+    for number, lap in enumerate(laps):
+        record['laps'].append(dict(
+            lap,
+            start_offset=offsets[2 * number] if offsets else None,
+            end_offset=offsets[2 * number + 1] if offsets else None,
+            channels=_channel_stats(frame, lap['start_index'], lap['end_index'] + 1),
+        ))
+    return record
+
+
+def index_file(path, cache_root=None, start_points_path=None):
+    """解析記錄檔到快取（已有有效快取時沿用），並整理目錄資料
+
+    供背景工作程序呼叫，回傳與 ingest_file 相同的摘要，另含 'catalog'。
+    """
+    cache = SessionCache(cache_root)
+    if not cache.is_fresh(path):
+        ingest_file(path, cache_root, start_points_path)
+    cached = cache.load(path)
+    if cached is None:
+        raise RuntimeError(f"解析期間檔案已變更: {path}")
+    frame, meta = cached
+    laps = meta.get('laps')
+    return {
+        'path': path,
+        'rows': len(frame),
+        'laps': None if laps is None else len(laps),
+        'catalog': summarize_log(path, frame, cache.load_time_ms(path), laps, meta.get('start_point')),
+    }
+
+
+class SessionCatalog:
+    """所有記錄檔與單圈的 SQLite 目錄
+
+    由監看資料夾的背景解析填入，每個記錄檔一筆，包含記錄日期、長度、
+    起點位置、各欄位統計值，以及各單圈的時間與在檔案中的位置。
+    只應在建立它的線程中使用。
+    """
+    def __init__(self, path=None):
+        self.path = path or app_data_path('catalog.sqlite')
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def is_current(self, path, size, mtime_ns):
+        """目錄中是否已有此檔案目前版本的資料"""
+        row = self.connection.execute(
+            'SELECT size, mtime_ns FROM logs WHERE path = ?', (os.path.abspath(path),)).fetchone()
+        return row is not None and row['size'] == size and row['mtime_ns'] == mtime_ns
+
+    def add(self, record):
+        """寫入 summarize_log 整理的資料，取代同一檔案的舊資料"""
+        gate_x, gate_y = record['gate'] if record['gate'] else (None, None)
+        durations = [lap['duration'] for lap in record['laps']]
+        with self.connection:
+            self.connection.execute('DELETE FROM logs WHERE path = ?', (record['path'],))
+            log_id = self.connection.execute(
+                'INSERT INTO logs (path, name, recorded_at, size, mtime_ns, rows, duration, gate_x, gate_y, '
+                'lap_count, best_lap, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (record['path'], record['name'], record['recorded_at'], record['size'], record['mtime_ns'],
+                 record['rows'], record['duration'], gate_x, gate_y,
+                 len(record['laps']), min(durations) if durations else None, time.time())).lastrowid
+            self._add_stats(log_id, None, record['channels'])
+            for lap in record['laps']:
+                lap_id = self.connection.execute(
+                    'INSERT INTO laps (log_id, range_number, start_index, end_index, start_time_ms, end_time_ms, '
+                    'duration, duration_str, data_count, start_offset, end_offset) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (log_id, lap['range_number'], lap['start_index'], lap['end_index'], lap['start_time_ms'],
+                     lap['end_time_ms'], lap['duration'], lap['duration_str'], lap['data_count'],
+                     lap['start_offset'], lap['end_offset'])).lastrowid
+                self._add_stats(log_id, lap_id, lap['channels'])
+        return log_id
+
+    def _add_stats(self, log_id, lap_id, channels):
+        self.connection.executemany(
+            'INSERT INTO channel_stats (log_id, lap_id, channel, min, max, mean) VALUES (?, ?, ?, ?, ?, ?)',
+            [(log_id, lap_id, channel, *values) for channel, values in channels.items()])
+
+    def remove(self, path):
+        with self.connection:
+            self.connection.execute('DELETE FROM logs WHERE path = ?', (os.path.abspath(path),))
+
+    @property
+    def log_count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM logs').fetchone()[0]
+
+    def search_laps(self, date_from=None, date_to=None, gate=None, tolerance=GATE_TOLERANCE,
+                    min_speed=None, limit=200):
+        """依條件搜尋單圈，依單圈時間由快到慢排列
+
+        date_from/date_to 為 'YYYY-MM-DD' 字串（含當天），gate 為起點 (x, y)，
+        只列出起點在容許範圍內的記錄檔；min_speed 為最高速度的下限。
+        """
+        conditions = []
+        parameters = []
+        if date_from:
+            conditions.append('logs.recorded_at >= ?')
+            parameters.append(date_from)
+        if date_to:
+            conditions.append('logs.recorded_at < ?')
+            parameters.append(date_to + '~')  # 讓當天任何時間都小於上限
+        if gate is not None:
+            conditions.append('logs.gate_x BETWEEN ? AND ? AND logs.gate_y BETWEEN ? AND ?')
+            parameters += [gate[0] - tolerance, gate[0] + tolerance, gate[1] - tolerance, gate[1] + tolerance]
+        if min_speed is not None:
+            conditions.append('speed.max >= ?')
+            parameters.append(min_speed)
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        query = f"""
+            SELECT logs.path, logs.name, logs.recorded_at, laps.range_number, laps.duration,
+                   laps.duration_str, laps.start_index, laps.end_index, laps.start_offset, laps.end_offset,
+                   speed.max AS max_speed, speed.mean AS mean_speed
+            FROM laps
+            JOIN logs ON logs.id = laps.log_id
+            LEFT JOIN channel_stats AS speed ON speed.lap_id = laps.id AND speed.channel = 'G Speed'
+            {where}
+            ORDER BY laps.duration
+            LIMIT ?
+        """
+        return [dict(row) for row in self.connection.execute(query, parameters + [limit])]
@@ -0,0 +1,84 @@
+import gzip
+import zipfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+from data.archive import is_archive, read_archive
+
+COMPRESSED_SUFFIXES = ('.csv.gz', '.csv.zst', '.zip')
+# 檔案選擇對話框使用的過濾字串
+LOG_FILE_FILTER = "RIMS 記錄檔 (*.csv *.csv.gz *.csv.zst *.zip *.rimsa);;CSV 文件 (*.csv);;所有文件 (*.*)"
+
+
+def is_compressed(path):
+    return path.lower().endswith(COMPRESSED_SUFFIXES)
+
+
+@contextmanager
+def open_log_stream(path):
+    """以串流方式開啟壓縮的記錄檔，回傳解壓後的二進位資料流"""
+    lower = path.lower()
+    if lower.endswith('.gz'):
+        with gzip.open(path, 'rb') as stream:
+            yield stream
+    elif lower.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("讀取 .zst 檔案需要安裝 zstandard 套件")
+        with open(path, 'rb') as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as stream:
+                yield stream
+    elif lower.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            members = [name for name in archive.namelist() if name.lower().endswith('.csv')]
+            if not members:
+                raise ValueError(f"壓縮檔中沒有 CSV 文件: {path}")
+            with archive.open(members[0]) as stream:
+                yield stream
+    else:
+        with open(path, 'rb') as stream:
+            yield stream
+
+
+def _column_selector(usecols):
+    """pandas 的 usecols 參數，檔案中不存在的欄位會被忽略"""
+    if usecols is None or callable(usecols):
+        return usecols
+    wanted = set(usecols)
+    return lambda name: name in wanted
+
+
+def iter_log_chunks(path, usecols=None, chunksize=200000):
+    """逐段讀取記錄檔（可為壓縮檔），每次產生最多 chunksize 筆的 DataFrame"""
+    if is_archive(path):
+        yield read_archive(path, usecols)
+        return
+    with open_log_stream(path) as stream:
+        yield from pd.read_csv(stream, usecols=_column_selector(usecols), chunksize=chunksize)
+
+
+def read_log(path, usecols=None, chunksize=200000):
+    """讀取記錄檔（可為壓縮檔或封存檔），usecols 的用法與 CsvTailFollower 相同
+
+    直接由檔案分塊解析（壓縮檔邊解壓邊解析），不建立暫存檔，也不先讀入
+    整個檔案或解壓後的文字。各段只保留其欄位（每個欄位是獨立的陣列），
+    最後逐欄串接並隨即釋放該欄的各段，不會同時保留所有段與串接後的副本；
+    記憶體峰值約為解析後的數據加上一段解析中的數據與一個欄位。
+    """
+    if is_archive(path):
+        return read_archive(path, usecols)
+
+    parts = {}
+    chunk = None
+    for chunk in iter_log_chunks(path, usecols, chunksize):
+        for name in chunk.columns:
+            parts.setdefault(name, []).append(chunk[name])
+    if chunk is None or all(len(columns) == 1 for columns in parts.values()):
+        return chunk
+    del chunk
+    data = {}
+    for name in list(parts):
+        data[name] = pd.concat(parts.pop(name), ignore_index=True)
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+from data.channel_expressions import ChannelExpression
+from data.raw_decoders import decoders
+from data.timestamps import parse_time_ms
+
+# 衍生通道：名稱 -> (來源欄位或衍生通道, 換算係數, 單位)
+# 數值為 係數 × d(來源)/dt，時間取自 Time 欄位（秒），不是數據索引
+DERIVED_CHANNELS = {
+    'Acceleration': ('G Speed', 1 / 3.6, 'm/s²'),   # km/h -> m/s 後對時間微分
+    'Jerk': ('Acceleration', 1.0, 'm/s³'),
+    'R Scale 1 Slope': ('R Scale 1', 1.0, '/s'),
+    'R Scale 2 Slope': ('R Scale 2', 1.0, '/s'),
+}
+# 平滑視窗的選項（秒），0 為不平滑
+SMOOTHING_CHOICES = (0.0, 0.5, 1.0, 2.0)
+
+
+def add_rate_channel(column, unit='/s'):
+    """為任一欄位加入對時間的變化率通道，回傳通道名稱"""
+    name = f'{column} Slope'
+    DERIVED_CHANNELS.setdefault(name, (column, 1.0, unit))
+    return name
+
+
+def channel_title(name):
+    """圖表標題，衍生通道與解碼通道附上單位"""
+    definition = DERIVED_CHANNELS.get(name)
+    if definition:
+        return f'{name} ({definition[2]})'
+    decoder = decoders().get(name)
+    return f'{name} ({decoder.unit})' if decoder and decoder.unit else name
+
+
+def time_gradient(values, time_s):
+    """依時間計算變化率，時間間隔不固定時仍正確
+
+    中間各點以前後兩點的差分、兩端以單側差分計算；時間相同、倒退或為 NaN
+    的位置結果為 NaN。
+    """
+    values = np.asarray(values, dtype=float)
+    time_s = np.asarray(time_s, dtype=float)
+    result = np.full(len(values), np.nan)
+    if len(values) < 2:
+        return result
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dt = time_s[2:] - time_s[:-2]
+        result[1:-1] = np.where(dt > 0, (values[2:] - values[:-2]) / dt, np.nan)
+        for index, (a, b) in ((0, (0, 1)), (-1, (-2, -1))):
+            dt_edge = time_s[b] - time_s[a]
+            result[index] = (values[b] - values[a]) / dt_edge if dt_edge > 0 else np.nan
+    return result
+
+
+def smooth(values, time_s, window_s):
+    """以 window_s 秒的置中移動平均平滑，視窗筆數由中位取樣間隔換算"""
+    if not window_s or len(values) < 3:
+        return np.asarray(values, dtype=float)
+    steps = np.diff(time_s)
+    steps = steps[np.isfinite(steps) & (steps > 0)]
+    if not len(steps):
+        return np.asarray(values, dtype=float)
+    window = max(1, int(round(window_s / np.median(steps))))
+    if window < 2:
+        return np.asarray(values, dtype=float)
+    return pd.Series(values, dtype=float).rolling(window, center=True, min_periods=1).mean().to_numpy()
+
+
+class DerivedChannels:
+    """衍生通道的計算與快取
+
+    每個 session（載入的數據）一份。結果依 (通道, 平滑視窗) 保存，運算式通道依
+    (運算式, 平滑視窗) 保存；數據換成其他 DataFrame 或筆數改變（例如追蹤檔案
+    新增數據）時整個快取失效。apply 將結果寫入 DataFrame 的欄位，圖表即可如
+    一般欄位繪製。
+
+    原始欄位的解碼通道（raw_decoders）不受平滑影響；設定 session 為
+    (SessionCache, 記錄檔路徑) 時，解碼結果另外保存在該記錄檔的快取中。
+    """
+    def __init__(self, smoothing_s=0.0):
+        self.smoothing_s = smoothing_s
+        # 使用者定義的運算式通道：名稱（即運算式文字）-> ChannelExpression
+        self.expressions = {}
+        # 數據來自單一且有快取的記錄檔時為 (SessionCache, 路徑)
+        self.session = None
+        self._data = None
+        self._rows = 0
+        self._time_s = None
+        self._values = {}
+
+    def is_derived(self, name):
+        return name in DERIVED_CHANNELS or name in self.expressions or name in decoders()
+
+    def names(self):
+        return list(DERIVED_CHANNELS) + list(decoders()) + list(self.expressions)
+
+    def add_expression(self, text, columns):
+        """加入運算式通道，columns 為可引用的數據欄位，回傳通道名稱
+
+        運算式可引用數據欄位與其他衍生通道；Time 代表時間（秒）。
+        無法解析時拋出 ExpressionError。
+        """
+        expression = ChannelExpression(text, list(columns) + self.names())
+        if expression.text in expression.columns:
+            # 只有一個欄位名稱，直接使用該欄位即可
+            return expression.text
+        self.expressions.setdefault(expression.text, expression)
+        return expression.text
+
+    def remove_expression(self, name):
+        """移除運算式通道及其快取的結果"""
+        expression = self.expressions.pop(name, None)
+        if expression is not None:
+            self._values = {key: value for key, value in self._values.items() if key[0] != name}
+
+    def _check(self, data):
+        """數據不同時清除快取"""
+        if data is not self._data or len(data) != self._rows:
+            self._data = data
+            self._rows = len(data)
+            self._time_s = None
+            self._values = {}
+
+    def time_seconds(self, data):
+        """數據的時間（秒），已處理跨越午夜"""
+        self._check(data)
+        if self._time_s is None:
+            if 'Time' not in data.columns:
+                raise ValueError("數據缺少 Time 欄位，無法計算衍生通道")
+            self._time_s = parse_time_ms(data['Time']) / 1000.0
+        return self._time_s
+
+    def _column(self, data, name):
+        """運算式引用的欄位或通道的數值"""
+        if name == 'Time':
+            return self.time_seconds(data)
+        if self.is_derived(name):
+            return self.values(data, name)
+        if name not in data.columns:
+            raise KeyError(f"數據缺少欄位 {name}")
+        return data[name].to_numpy(dtype=float)
+
+    def values(self, data, name):
+        """計算（或取出快取的）衍生通道"""
+        self._check(data)
+        # 解碼通道不經平滑
+        key = (name, None if name in decoders() else self.smoothing_s)
+        if key in self._values:
+            return self._values[key]
+        if name in self.expressions:
+            result = self.expressions[name].evaluate(lambda column: self._column(data, column), len(data))
+            self._values[key] = result
+            return result
+        if name in decoders():
+            result = self._decode(data, decoders()[name])
+            self._values[key] = result
+            return result
+        source, scale, _ = DERIVED_CHANNELS[name]
+        if self.is_derived(source):
+            source_values = self.values(data, source)
+        elif source in data.columns:
+            source_values = data[source].to_numpy(dtype=float)
+        else:
+            raise KeyError(f"數據缺少計算 {name} 所需的欄位 {source}")
+        time_s = self.time_seconds(data)
+        result = time_gradient(smooth(source_values, time_s, self.smoothing_s), time_s) * scale
+        self._values[key] = result
+        return result
+
+    def _decode(self, data, decoder):
+        """解碼原始欄位，優先使用記錄檔快取中的結果"""
+        cache, path = self.session or (None, None)
+        if cache is not None:
+            cached = cache.load_decoded(path, decoder.name, decoder.key())
+            if cached is not None and len(cached) == len(data):
+                return cached
+        if decoder.source not in data.columns:
+            raise KeyError(f"數據缺少解碼 {decoder.name} 所需的欄位 {decoder.source}")
+        result = decoder.decode(data[decoder.source].to_numpy())
+        if cache is not None:
+            cache.store_decoded(path, decoder.name, decoder.key(), result)
+        return result
+
+    def sources(self, name):
+        """衍生通道最終需要的原始欄位"""
+        if name in self.expressions:
+            columns = []
+            for column in self.expressions[name].columns:
+                columns.extend(self.sources(column) if self.is_derived(column) else [column])
+            return list(dict.fromkeys(columns))
+        if name in decoders():
+            return [decoders()[name].source]
+        source = DERIVED_CHANNELS[name][0]
+        return self.sources(source) if self.is_derived(source) else [source]
+
+    def apply(self, data, names):
+        """將 names 中的衍生通道寫入 data 的欄位，回傳成功寫入的通道"""
+        applied = []
+        for name in names:
+            if not self.is_derived(name):
+                continue
+            try:
+                data[name] = self.values(data, name)
+                applied.append(name)
+            except (KeyError, ValueError) as e:
+                print(f"計算衍生通道時出錯: {str(e)}")
+        return applied
+
+    def derived_columns(self, data):
+        """data 中由衍生通道寫入的欄位"""
+        return [name for name in data.columns if self.is_derived(name)]
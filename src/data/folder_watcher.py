@@ -0,0 +1,128 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from data.catalog import index_file
+from data.session_cache import SessionCache
+
+# RIMS 記錄器產生的檔名：RIMS_<日期>_<時間>_<序號>.csv（或封存的壓縮檔）
+RIMS_FILE_PATTERN = re.compile(r'^RIMS_\d{8}_\d{6}_\d+\.(csv|csv\.gz|csv\.zst|zip)$', re.IGNORECASE)
+
+
+class FolderWatcher(QObject):
+    """監看資料夾，將新的 RIMS 記錄檔在背景預先解析到快取
+
+    檔案大小在兩次掃描間不再改變才視為寫入完成，之後交給工作程序池解析，
+    有符合的已存起點時一併計算單圈。已有有效快取的檔案不會重複處理。
+    指定 catalog 時同時將結果寫入記錄檔目錄，快取有效但尚未列入目錄的
+    檔案也會處理（沿用快取，不重新解析）。
+    """
+    file_ingested = pyqtSignal(str, object)
+    error = pyqtSignal(str, str)
+
+    def __init__(self, folder, cache=None, max_workers=None, scan_interval=2000, catalog=None, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.cache = cache or SessionCache()
+        self.catalog = catalog
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._executor = None
+        self._sizes = {}        # 路徑 -> 上次掃描時的 (大小, 修改時間)
+        self._submitted = set()
+        self._failed = {}       # 解析失敗的路徑 -> 當時的 (大小, 修改時間)
+        self._done = {}         # 已處理完成的路徑 -> 當時的 (大小, 修改時間)
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._schedule_scan)
+        self._timer = QTimer(self)
+        self._timer.setInterval(scan_interval)
+        self._timer.timeout.connect(self.scan)
+        # 信號由工作線程發出，排入主線程後才寫入目錄
+        self.file_ingested.connect(self._record)
+
+    def start(self):
+        """開始監看，並處理資料夾中尚未快取的檔案"""
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._watcher.addPath(self.folder)
+        self._timer.start()
+        self.scan()
+
+    def stop(self):
+        """停止監看，不等待進行中的工作"""
+        self._timer.stop()
+        if self._watcher.directories():
+            self._watcher.removePaths(self._watcher.directories())
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def pending_count(self):
+        return len(self._submitted)
+
+    def _schedule_scan(self, _path=None):
+        """資料夾變動時提早掃描"""
+        QTimer.singleShot(200, self.scan)
+
+    def scan(self):
+        """掃描資料夾，將寫入完成且尚未快取的檔案送出解析"""
+        if self._executor is None:
+            return
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError as e:
+            self.error.emit(self.folder, str(e))
+            return
+
+        for entry in entries:
+            if not entry.is_file() or not RIMS_FILE_PATTERN.match(entry.name):
+                continue
+            path = entry.path
+            if path in self._submitted:
+                continue
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self._sizes.get(path)
+            self._sizes[path] = signature
+            if previous != signature:
+                # 第一次看到或仍在寫入中，下次掃描再確認
+                continue
+            if self._failed.get(path) == signature or self._done.get(path) == signature:
+                continue
+            if self.cache.is_fresh(path) and (self.catalog is None or self.catalog.is_current(path, *signature)):
+                self._done[path] = signature
+                continue
+            self._submit(path)
+
+    def _submit(self, path):
+        self._submitted.add(path)
+        print(f"背景解析: {path}")
+        future = self._executor.submit(index_file, path, self.cache.root)
+        # 回調在工作線程執行，信號會排入主線程處理
+        future.add_done_callback(lambda f, p=path: self._on_done(p, f))
+
+    def _on_done(self, path, future):
+        self._submitted.discard(path)
+        if future.cancelled():
+            return
+        try:
+            summary = future.result()
+        except Exception as e:
+            print(f"背景解析 {path} 時出錯: {str(e)}")
+            self._failed[path] = self._sizes.get(path)
+            self.error.emit(path, str(e))
+            return
+        self._done[path] = self._sizes.get(path)
+        self.file_ingested.emit(path, summary)
+
+    def _record(self, path, summary):
+        """將解析結果寫入記錄檔目錄"""
+        if self.catalog is None:
+            return
+        try:
+            self.catalog.add(summary['catalog'])
+        except Exception as e:
+            print(f"寫入記錄檔目錄時出錯: {str(e)}")
+            self.error.emit(path, str(e))
@@ -0,0 +1,129 @@
+import numpy as np
+
+# 與起點座標的容許誤差（經緯度）
+GATE_TOLERANCE = 0.00015
+# 兩次通過起點至少間隔的秒數，避免在起點附近重複計圈
+MIN_LAP_SECONDS = 5
+
+
+def format_duration(seconds):
+    """將秒數格式化為 HH:MM:SS"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+def laps_within_files(laps, file_boundaries):
+    """去除跨越檔案分界的單圈並依序重新編號
+
+    合併多個檔案時，跨越分界的單圈包含記錄中斷的時間，不列入。
+    file_boundaries 為 merge_sessions 回傳的檔案邊界。
+    """
+    file_starts = [boundary['start_index'] for boundary in file_boundaries[1:]]
+    kept = []
+    for lap in laps:
+        start, end = lap['start_index'], lap['end_index']
+        if any(start < file_start <= end for file_start in file_starts):
+            print(f"\n略過跨越檔案分界的範圍: 索引 {start} - {end}")
+            continue
+        kept.append(dict(lap, range_number=len(kept) + 1))
+    return kept
+
+
+class LapDetector:
+    """串流式單圈偵測器
+
+    保存「是否仍在起點範圍內」、上一次計圈的索引與時間等狀態，
+    每次只處理新進的一批資料。批次內先以向量運算找出落在起點範圍內的
+    樣本，只對這些樣本逐一套用狀態機，結果與一次處理整段資料相同。
+    """
+    def __init__(self, start_x, start_y, start_index, start_time_ms,
+                 tolerance=GATE_TOLERANCE, min_lap_seconds=MIN_LAP_SECONDS):
+        self.start_x = float(start_x)
+        self.start_y = float(start_y)
+        self.tolerance = tolerance
+        self.min_lap_ms = min_lap_seconds * 1000.0
+        self.next_index = int(start_index) + 1  # 下一筆要處理的樣本索引
+        self.last_match_index = int(start_index)
+        self.last_match_time = float(np.round(start_time_ms))
+        self.in_range = False
+        self.current_range = 1
+        self.laps = []
+
+    @classmethod
+    def from_laps(cls, start_x, start_y, start_index, start_time_ms, laps, x, y, **kwargs):
+        """以已偵測的單圈（例如來自快取）重建偵測器，接續處理 x、y 之後新增的樣本
+
+        x、y 為偵測 laps 時處理過的全部樣本，用來還原最後一筆是否仍停留在起點範圍內。
+        """
+        detector = cls(start_x, start_y, start_index, start_time_ms, **kwargs)
+        detector.next_index = max(len(x), detector.next_index)
+        if laps:
+            last = laps[-1]
+            detector.laps = list(laps)
+            detector.current_range = last['range_number'] + 1
+            detector.last_match_index = last['end_index']
+            detector.last_match_time = float(last['end_time_ms'])
+            # 計圈之後的樣本都還在起點範圍內時，尚未離開範圍
+            tail_x = np.asarray(x[last['end_index']:], dtype=float)
+            tail_y = np.asarray(y[last['end_index']:], dtype=float)
+            detector.in_range = bool(np.all((np.abs(tail_x - detector.start_x) <= detector.tolerance) &
+                                            (np.abs(tail_y - detector.start_y) <= detector.tolerance)))
+        return detector
+
+    def feed(self, x, y, time_ms, first_index=None):
+        """處理一批樣本，回傳這批資料中完成的單圈
+
+        first_index 為這批資料第一筆的索引，預設接續上一批；
+        早於 next_index 的樣本會被略過。
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        time_ms = np.round(np.asarray(time_ms, dtype=float))
+        if first_index is None:
+            first_index = self.next_index
+        skip = self.next_index - first_index
+        if skip < 0:
+            raise ValueError(f"資料不連續：預期索引 {self.next_index}，收到 {first_index}")
+        if skip >= len(x):
+            return []
+        x, y, time_ms = x[skip:], y[skip:], time_ms[skip:]
+        base = self.next_index
+
+        match = (np.abs(x - self.start_x) <= self.tolerance) & (np.abs(y - self.start_y) <= self.tolerance)
+
+        new_laps = []
+        for offset in np.flatnonzero(match):
+            # 前一筆不在起點範圍內時，離開範圍的狀態已經生效
+            if offset > 0 and not match[offset - 1]:
+                self.in_range = False
+            if self.in_range:
+                continue
+            duration_ms = time_ms[offset] - self.last_match_time
+            if not duration_ms >= self.min_lap_ms:  # 時間無效（NaN）時同樣略過
+                continue
+            index = base + int(offset)
+            duration = duration_ms / 1000.0
+            lap = {
+                'range_number': self.current_range,
+                'start_index': self.last_match_index,
+                'end_index': index,
+                'start_time_ms': self.last_match_time,
+                'end_time_ms': float(time_ms[offset]),
+                'duration': duration,
+                'duration_str': format_duration(duration),
+                'data_count': index - self.last_match_index + 1,
+            }
+            new_laps.append(lap)
+            self.current_range += 1
+            self.last_match_index = index
+            self.last_match_time = float(time_ms[offset])
+            self.in_range = True
+
+        # 批次最後一筆不在範圍內時，狀態回到範圍外（下一批據此判斷）
+        if not match[-1]:
+            self.in_range = False
+        self.next_index = base + len(x)
+        self.laps.extend(new_laps)
+        return new_laps
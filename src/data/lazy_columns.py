@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from data.archive import ArchiveReader, is_archive
+from data.compressed import open_log_stream, read_log
+
+# 圖表、軌跡與單圈分析需要的欄位，載入時優先讀取
+PRIMARY_COLUMNS = ['Time', 'G Speed', 'R Scale 1', 'R Scale 2', 'Longitude', 'Latitude', 'X', 'Y']
+
+
+def fit_length(values, length):
+    """將之後載入的欄位對齊目前數據的筆數（不足補 NaN，多餘截斷）"""
+    values = np.asarray(values)
+    if len(values) >= length:
+        return values[:length]
+    if values.dtype.kind in 'fiub':
+        padding = np.full(length - len(values), np.nan)
+        return np.concatenate([values.astype(float), padding])
+    padding = np.full(length - len(values), None, dtype=object)
+    return np.concatenate([values.astype(object), padding])
+
+
+class ColumnLoader:
+    """在第一次需要時才讀取尚未載入的欄位
+
+    依序讀取 paths 中的記錄檔（有有效快取時只讀快取中的這些欄位），
+    多個檔案時依相同順序串接。已載入（loaded）或讀取過的欄位不再讀取。
+    """
+    def __init__(self, paths, loaded=(), cache=None):
+        self.paths = list(paths)
+        self.loaded = set(loaded)
+        self.cache = cache
+        self._available = None
+
+    def _file_columns(self, path):
+        meta = self.cache.load_meta(path) if self.cache is not None else None
+        if meta is not None:
+            return [column['name'] for column in meta['columns']]
+        if is_archive(path):
+            return ArchiveReader(path).columns
+        with open_log_stream(path) as stream:
+            return list(pd.read_csv(stream, nrows=0).columns)
+
+    def available_columns(self):
+        """記錄檔中所有的欄位（只讀取標題）"""
+        if self._available is None:
+            names = []
+            for path in self.paths:
+                names.extend(self._file_columns(path))
+            self._available = list(dict.fromkeys(names))
+        return self._available
+
+    def pending_columns(self):
+        """記錄檔中尚未載入的欄位"""
+        return [name for name in self.available_columns() if name not in self.loaded]
+
+    def _read(self, path, names):
+        meta = self.cache.load_meta(path) if self.cache is not None else None
+        if meta is not None:
+            cached = self.cache.load(path, names, mmap=True)
+            if cached is not None:
+                return cached[0]
+        return read_log(path, usecols=names)
+
+    def load(self, names):
+        """讀取 names 中尚未載入的欄位，回傳 {欄位: 陣列}"""
+        names = [name for name in dict.fromkeys(names) if name in self.pending_columns()]
+        if not names:
+            return {}
+        frames = [self._read(path, names) for path in self.paths]
+        merged = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        self.loaded.update(names)
+        result = {name: merged[name].to_numpy() for name in names if name in merged.columns}
+        print(f"載入欄位: {', '.join(result) or '無'}")
+        return result
+
+
+class ColumnLoadWorker(QThread):
+    """在背景執行 ColumnLoader.load，讀取記錄檔時不阻塞介面"""
+    loaded = pyqtSignal(object)  # {欄位: 陣列}
+    error = pyqtSignal(str)
+
+    def __init__(self, loader, names, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.names = list(names)
+
+    def run(self):
+        try:
+            self.loaded.emit(self.loader.load(self.names))
+        except Exception as e:
+            self.error.emit(str(e))
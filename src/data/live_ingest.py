@@ -0,0 +1,340 @@
+import socket
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from data.timestamps import DAY_MS, format_time_ms, time_string_to_ms
+
+# RIMS 記錄器輸出的欄位順序
+RIMS_COLUMNS = ['Time', 'R Scale 1', 'R Scale 2', 'G Speed', 'SV',
+                'Longitude', 'Latitude', 'raw1', 'raw2', 'raw3', 'raw4']
+
+
+class RimsLineParser:
+    """將 RIMS CSV 文字列解析為數值列（Time 轉為毫秒）"""
+    def __init__(self, columns=None):
+        self.columns = list(columns or RIMS_COLUMNS)
+        self._day_offset = 0.0
+        self._last_ms = None
+
+    def _time_ms(self, text):
+        """解析時間並處理跨越午夜"""
+        ms = time_string_to_ms(text) + self._day_offset
+        if self._last_ms is not None and ms < self._last_ms - DAY_MS / 2:
+            self._day_offset += DAY_MS
+            ms += DAY_MS
+        self._last_ms = ms
+        return ms
+
+    def parse(self, lines):
+        """解析多行文字，回傳 (筆數, 欄位數) 的陣列；不完整或錯誤的行會被略過"""
+        rows = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            fields = line.split(',')
+            if fields[0].strip() == 'Time':
+                # 標題列：更新欄位順序
+                self.columns = [field.strip() for field in fields]
+                continue
+            if len(fields) != len(self.columns):
+                continue
+            try:
+                rows.append([self._time_ms(value) if name == 'Time' else float(value)
+                             for name, value in zip(self.columns, fields)])
+            except ValueError:
+                continue
+        return np.array(rows, dtype=float).reshape(-1, len(self.columns))
+
+
+class TelemetryRingBuffer:
+    """固定大小的 NumPy 環形緩衝區
+
+    寫入線程與 GUI 線程共用，所有存取都經過鎖。total_count 是累計寫入
+    的筆數，可作為每一列的全域序號，讓讀取端只取新增的資料。
+    """
+    def __init__(self, capacity=200000, columns=None):
+        self.capacity = int(capacity)
+        self.columns = list(columns or RIMS_COLUMNS)
+        self._col_index = {name: i for i, name in enumerate(self.columns)}
+        self._data = np.full((self.capacity, len(self.columns)), np.nan)
+        self._lock = threading.Lock()
+        self.total_count = 0
+
+    def __len__(self):
+        return min(self.total_count, self.capacity)
+
+    @property
+    def first_sequence(self):
+        """緩衝區中最舊一筆的全域序號"""
+        return self.total_count - len(self)
+
+    def append_rows(self, rows, columns=None):
+        """寫入多筆資料，欄位順序不同時依名稱對應，缺少的欄位填 NaN"""
+        rows = np.asarray(rows, dtype=float)
+        if rows.ndim != 2 or len(rows) == 0:
+            return
+        if columns is not None and list(columns) != self.columns:
+            mapped = np.full((len(rows), len(self.columns)), np.nan)
+            for j, name in enumerate(columns):
+                if name in self._col_index:
+                    mapped[:, self._col_index[name]] = rows[:, j]
+            rows = mapped
+
+        with self._lock:
+            skipped = max(len(rows) - self.capacity, 0)
+            if skipped:
+                rows = rows[skipped:]
+                self.total_count += skipped
+            start = self.total_count % self.capacity
+            first = min(len(rows), self.capacity - start)
+            self._data[start:start + first] = rows[:first]
+            self._data[:len(rows) - first] = rows[first:]
+            self.total_count += len(rows)
+
+    def _columns_of(self, block, columns):
+        names = self.columns if columns is None else columns
+        return {name: block[:, self._col_index[name]] for name in names if name in self._col_index}
+
+    def snapshot(self, columns=None):
+        """依時間順序回傳目前緩衝區內容的複本 {欄位: 陣列}"""
+        with self._lock:
+            count = len(self)
+            end = self.total_count % self.capacity
+            if self.total_count <= self.capacity:
+                block = self._data[:count].copy()
+            else:
+                block = np.concatenate([self._data[end:], self._data[:end]])
+        return self._columns_of(block, columns)
+
+    def read_since(self, sequence, columns=None):
+        """回傳序號 sequence 之後寫入的資料
+
+        回傳 (資料, 第一筆的序號, 新的序號)；若讀取太慢導致資料已被覆蓋，
+        第一筆的序號會大於 sequence。
+        """
+        with self._lock:
+            total = self.total_count
+            first = max(sequence, total - self.capacity)
+            positions = np.arange(first, total) % self.capacity
+            block = self._data[positions]
+        return self._columns_of(block, columns), first, total
+
+    def to_dataframe(self):
+        """轉換為與 load_csv 相同格式的 DataFrame（Time 為字串）"""
+        columns = self.snapshot()
+        frame = pd.DataFrame(columns)
+        if 'Time' in frame.columns:
+            frame['Time'] = format_time_ms(frame['Time'].to_numpy())
+        return frame
+
+
+class LineSource:
+    """逐行資料來源的基底類別"""
+    def __init__(self):
+        self._pending = b''
+
+    def open(self):
+        """開啟來源"""
+
+    def close(self):
+        """關閉來源"""
+
+    def read_lines(self, timeout=0.1):
+        """讀取目前可用的完整文字行，沒有資料時最多等待 timeout 秒"""
+        raise NotImplementedError
+
+    def _split_complete_lines(self, chunk):
+        """只回傳完整的行，最後不完整的部分留待下次"""
+        data = self._pending + chunk
+        parts = data.split(b'\n')
+        self._pending = parts.pop()
+        return [part.decode('utf-8', errors='replace') for part in parts]
+
+
+class UdpSource(LineSource):
+    """從 UDP 封包接收 RIMS 資料列"""
+    def __init__(self, host='0.0.0.0', port=5005):
+        super().__init__()
+        self.host = host
+        self.port = int(port)
+        self._socket = None
+
+    def open(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((self.host, self.port))
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def read_lines(self, timeout=0.1):
+        self._socket.settimeout(timeout)
+        try:
+            chunk = self._socket.recv(65535)
+        except socket.timeout:
+            return []
+        # 每個封包視為完整的資料，補上換行以送出最後一行
+        return self._split_complete_lines(chunk if chunk.endswith(b'\n') else chunk + b'\n')
+
+
+class SerialSource(LineSource):
+    """從序列埠讀取 RIMS 資料列（需要 pyserial）"""
+    def __init__(self, port, baudrate=115200):
+        super().__init__()
+        self.port = port
+        self.baudrate = int(baudrate)
+        self._serial = None
+
+    def open(self):
+        try:
+            import serial
+        except ImportError:
+            raise RuntimeError("使用序列埠需要安裝 pyserial 套件")
+        self._serial = serial.Serial(self.port, self.baudrate, timeout=0.1)
+
+    def close(self):
+        if self._serial is not None:
+            self._serial.close()
+            self._serial = None
+
+    def read_lines(self, timeout=0.1):
+        self._serial.timeout = timeout
+        chunk = self._serial.read(max(self._serial.in_waiting, 1))
+        return self._split_complete_lines(chunk) if chunk else []
+
+
+class FileTailSource(LineSource):
+    """讀取持續寫入中的檔案，只回傳新增的完整行"""
+    def __init__(self, path, from_start=True):
+        super().__init__()
+        self.path = path
+        self.from_start = from_start
+        self._file = None
+
+    def open(self):
+        self._file = open(self.path, 'rb')
+        if not self.from_start:
+            self._file.seek(0, 2)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read_lines(self, timeout=0.1):
+        chunk = self._file.read()
+        if not chunk:
+            time.sleep(timeout)
+            return []
+        return self._split_complete_lines(chunk)
+
+
+class CsvReplaySource(LineSource):
+    """依記錄時間重播 RIMS CSV，在沒有記錄器時模擬現場資料"""
+    def __init__(self, path, speed=1.0):
+        super().__init__()
+        self.path = path
+        self.speed = float(speed)
+        self._lines = []
+        self._times = []
+        self._position = 0
+        self._started = None
+
+    def open(self):
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            self._lines = f.read().splitlines()
+        self._times = []
+        for line in self._lines:
+            try:
+                self._times.append(time_string_to_ms(line.split(',', 1)[0]))
+            except ValueError:
+                # 標題列或無法解析的行立即送出
+                self._times.append(self._times[-1] if self._times else None)
+        first = next((t for t in self._times if t is not None), 0.0)
+        self._times = [first if t is None else t for t in self._times]
+        self._position = 0
+        self._started = time.perf_counter()
+
+    def read_lines(self, timeout=0.1):
+        if self._position >= len(self._lines):
+            time.sleep(timeout)
+            return []
+        due = self._times[0] + (time.perf_counter() - self._started) * 1000.0 * self.speed
+        end = self._position
+        while end < len(self._lines) and self._times[end] <= due:
+            end += 1
+        if end == self._position:
+            wait = (self._times[end] - due) / 1000.0 / self.speed
+            time.sleep(min(max(wait, 0.0), timeout))
+            return []
+        lines = self._lines[self._position:end]
+        self._position = end
+        return lines
+
+
+def open_source(spec):
+    """依設定字串建立資料來源
+
+    udp://主機:埠、serial://埠?baud=速率、replay://檔案?speed=倍速，
+    其他字串視為持續寫入中的檔案路徑（可加 file:// 前綴）。
+    """
+    spec = spec.strip()
+
+    def split_query(text):
+        target, _, query = text.partition('?')
+        options = dict(pair.split('=', 1) for pair in query.split('&') if '=' in pair)
+        return target, options
+
+    if spec.startswith('udp://'):
+        host, _, port = spec[len('udp://'):].rpartition(':')
+        return UdpSource(host or '0.0.0.0', int(port or 5005))
+    if spec.startswith('serial://'):
+        port, options = split_query(spec[len('serial://'):])
+        return SerialSource(port, int(options.get('baud', 115200)))
+    if spec.startswith('replay://'):
+        path, options = split_query(spec[len('replay://'):])
+        return CsvReplaySource(path, float(options.get('speed', 1.0)))
+    if spec.startswith('file://'):
+        spec = spec[len('file://'):]
+    return FileTailSource(spec)
+
+
+class LiveIngestWorker(QThread):
+    """即時資料接收線程"""
+    rows_received = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    def __init__(self, source, ring_buffer):
+        super().__init__()
+        self.source = source
+        self.ring_buffer = ring_buffer
+        self.parser = RimsLineParser(ring_buffer.columns)
+
+    def run(self):
+        """持續讀取來源並寫入環形緩衝區"""
+        try:
+            self.source.open()
+            while not self.isInterruptionRequested():
+                lines = self.source.read_lines()
+                if not lines:
+                    continue
+                rows = self.parser.parse(lines)
+                if len(rows):
+                    self.ring_buffer.append_rows(rows, self.parser.columns)
+                    self.rows_received.emit(len(rows))
+        except Exception as e:
+            print(f"即時資料接收錯誤: {str(e)}")
+            self.error.emit(str(e))
+        finally:
+            self.source.close()
+
+    def stop(self):
+        """要求線程結束並等待"""
+        self.requestInterruption()
+        self.wait(2000)
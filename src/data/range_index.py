@@ -0,0 +1,159 @@
+import numpy as np
+
+from data.append_buffer import AppendBuffer
+
+
+def block_min_max(values, block_size=64):
+    """每 block_size 筆一個區塊的最小/最大值（忽略 NaN，最後一個區塊可不滿）"""
+    values = np.asarray(values)
+    n = len(values)
+    n_blocks = (n + block_size - 1) // block_size
+    if not n:
+        return np.empty(0), np.empty(0)
+    padded = np.full(n_blocks * block_size, np.nan)
+    padded[:n] = values
+    blocks = padded.reshape(n_blocks, block_size)
+    with np.errstate(invalid='ignore'):
+        return np.fmin.reduce(blocks, axis=1), np.fmax.reduce(blocks, axis=1)
+
+
+def coarsen_blocks(block_min, block_max, factor):
+    """將相鄰 factor 個區塊的最小/最大值合併為一個區塊"""
+    if factor == 1:
+        return block_min, block_max
+    n_blocks = (len(block_min) + factor - 1) // factor
+    merged = []
+    for values, reduce in ((block_min, np.fmin.reduce), (block_max, np.fmax.reduce)):
+        padded = np.full(n_blocks * factor, np.nan)
+        padded[:len(values)] = values
+        with np.errstate(invalid='ignore'):
+            merged.append(reduce(padded.reshape(n_blocks, factor), axis=1))
+    return tuple(merged)
+
+
+def block_size_for(length, min_size=64, max_blocks=65536):
+    """區塊數不超過 max_blocks 的最小區塊大小（min_size 乘以 2 的次方）
+
+    稀疏表的大小約為區塊數乘以層數，數據很長時加大區塊以控制記憶體用量。
+    """
+    block_size = min_size
+    while length > block_size * max_blocks:
+        block_size *= 2
+    return block_size
+
+
+class RangeMinMaxIndex:
+    """區間最小/最大值索引
+
+    將資料切成固定大小的區塊，對區塊的最小/最大值建立稀疏表。
+    查詢時只需比較兩端不完整區塊（最多 2 * block_size 筆）與
+    稀疏表中的兩個重疊區間，與查詢長度無關，縮放時不必掃描資料。
+
+    values 可為 np.memmap；已有預先計算的區塊最小/最大值（例如來自快取）
+    時以 block_min/block_max 傳入，建立索引時不讀取數據。整數數據不轉換
+    型別，避免複製整個欄位。數據在尾端增加時以 extend 更新，不必重建。
+    """
+    def __init__(self, values, block_size=64, block_min=None, block_max=None):
+        values = np.asarray(values)
+        self.values = values if values.dtype.kind in 'fiu' else values.astype(float)
+        self.block_size = block_size
+        n = len(self.values)
+        self.n_blocks = (n + block_size - 1) // block_size
+
+        # 每個區塊的最小/最大值（忽略 NaN）
+        if block_min is None or block_max is None:
+            block_min, block_max = block_min_max(self.values, block_size)
+        block_min = np.asarray(block_min, dtype=float)
+        block_max = np.asarray(block_max, dtype=float)
+
+        # 稀疏表：第 k 層儲存從每個區塊開始、長度 2^k 個區塊的最小/最大值
+        self.min_table = [block_min]
+        self.max_table = [block_max]
+        width = 1
+        while width * 2 <= self.n_blocks:
+            prev_min = self.min_table[-1]
+            prev_max = self.max_table[-1]
+            self.min_table.append(np.fmin(prev_min[:-width], prev_min[width:]))
+            self.max_table.append(np.fmax(prev_max[:-width], prev_max[width:]))
+            width *= 2
+        # 第一次 extend 時才改以 AppendBuffer 保存各層
+        self._levels = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def extend(self, values):
+        """數據在尾端增加後更新索引，values 為包含新增部分的完整數據
+
+        只重新計算原本最後一個（可能不滿的）區塊之後的區塊統計，以及稀疏表
+        各層中涵蓋這些區塊的項目，成本與新增的筆數成正比，與數據長度無關。
+        區塊大小維持不變。
+        """
+        values = np.asarray(values)
+        values = values if values.dtype.kind in 'fiu' else values.astype(float)
+        bs = self.block_size
+        first = len(self.values) // bs
+        self.values = values
+        self.n_blocks = (len(values) + bs - 1) // bs
+        if self._levels is None:
+            self._levels = [(AppendBuffer(lows), AppendBuffer(highs))
+                            for lows, highs in zip(self.min_table, self.max_table)]
+
+        self._set_level(0, first, *block_min_max(values[first * bs:], bs))
+        level = 0
+        width = 1
+        while width * 2 <= self.n_blocks:
+            level += 1
+            prev_min = self.min_table[level - 1]
+            prev_max = self.max_table[level - 1]
+            # 第 level 層從 i 開始的項目涵蓋區塊 i..i+2*width-1
+            start = max(first - 2 * width + 1, 0)
+            end = len(prev_min) - width
+            self._set_level(level, start,
+                            np.fmin(prev_min[start:end], prev_min[start + width:end + width]),
+                            np.fmax(prev_max[start:end], prev_max[start + width:end + width]))
+            width *= 2
+
+    def _set_level(self, level, start, lows, highs):
+        """以新的值取代稀疏表第 level 層從 start 開始的項目"""
+        if level == len(self._levels):
+            self._levels.append((AppendBuffer(np.empty(0)), AppendBuffer(np.empty(0))))
+            self.min_table.append(None)
+            self.max_table.append(None)
+        low_buffer, high_buffer = self._levels[level]
+        low_buffer.truncate(start)
+        high_buffer.truncate(start)
+        self.min_table[level] = low_buffer.append(lows)
+        self.max_table[level] = high_buffer.append(highs)
+
+    def _block_query(self, first, last):
+        """查詢完整區塊 first..last（含）的最小/最大值"""
+        k = (last - first + 1).bit_length() - 1
+        right = last - (1 << k) + 1
+        return (np.fmin(self.min_table[k][first], self.min_table[k][right]),
+                np.fmax(self.max_table[k][first], self.max_table[k][right]))
+
+    def query(self, start, end):
+        """回傳 values[start:end + 1] 的 (最小值, 最大值)，無有效資料時為 NaN"""
+        start = max(int(start), 0)
+        end = min(int(end), len(self.values) - 1)
+        if start > end:
+            return np.nan, np.nan
+
+        bs = self.block_size
+        first_block = (start + bs - 1) // bs   # 第一個完整區塊
+        last_block = (end + 1) // bs - 1       # 最後一個完整區塊
+        if first_block > last_block:
+            # 查詢範圍不含完整區塊，直接比較原始資料
+            segment = self.values[start:end + 1]
+            with np.errstate(invalid='ignore'):
+                return np.fmin.reduce(segment), np.fmax.reduce(segment)
+
+        lo, hi = self._block_query(first_block, last_block)
+        head = self.values[start:first_block * bs]
+        tail = self.values[(last_block + 1) * bs:end + 1]
+        for part in (head, tail):
+            if len(part):
+                lo = np.fmin(lo, np.fmin.reduce(part))
+                hi = np.fmax(hi, np.fmax.reduce(part))
+        return lo, hi
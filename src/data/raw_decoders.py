@@ -0,0 +1,119 @@
+import hashlib
+import json
+
+import numpy as np
+
+from data.app_paths import app_data_path
+
+# 使用者自訂解碼器的設定檔（應用程式資料目錄），格式為 RawDecoder.to_dict 的清單
+DECODERS_FILE = 'decoders.json'
+# RIMS 的 raw1..raw4 為 24 位元 ADC 讀值
+ADC_BITS = 24
+
+
+class RawDecoder:
+    """將原始整數欄位解碼為工程單位的通道
+
+    依序取 source 欄位的整數值：右移 shift 位元、取低 bits 位元（signed 時
+    視為二補數）、再換算為 數值 × scale + offset。全部以陣列運算完成，
+    來源為 NaN（缺值或追蹤時補齊的筆數）的位置結果為 NaN。
+    """
+    FIELDS = ('name', 'source', 'unit', 'shift', 'bits', 'signed', 'scale', 'offset')
+
+    def __init__(self, name, source, unit='', shift=0, bits=None, signed=False, scale=1.0, offset=0.0):
+        if bits is not None and not 0 < bits <= 63:
+            raise ValueError(f"解碼器 {name} 的位元數必須介於 1 到 63")
+        if not 0 <= shift < 63:
+            raise ValueError(f"解碼器 {name} 的位移必須介於 0 到 62")
+        self.name = name
+        self.source = source
+        self.unit = unit
+        self.shift = int(shift)
+        self.bits = None if bits is None else int(bits)
+        self.signed = bool(signed)
+        self.scale = float(scale)
+        self.offset = float(offset)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, values):
+        unknown = set(values) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"解碼器設定有未知的項目: {', '.join(sorted(unknown))}")
+        return cls(**values)
+
+    def key(self):
+        """解碼器設定的摘要，設定改變時快取的結果即失效"""
+        text = json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+    def decode(self, raw):
+        """解碼整個欄位，回傳 float 陣列"""
+        raw = np.asarray(raw)
+        if raw.dtype.kind in 'iu':
+            valid = None
+            values = raw.astype(np.int64, copy=False)
+        else:
+            raw = raw.astype(float, copy=False)
+            valid = np.isfinite(raw)
+            values = np.where(valid, raw, 0).astype(np.int64)
+        if self.shift:
+            values = values >> self.shift
+        if self.bits is not None:
+            values = values & ((1 << self.bits) - 1)
+            if self.signed:
+                values = np.where(values >= 1 << (self.bits - 1), values - (1 << self.bits), values)
+        result = values * self.scale + self.offset
+        if valid is not None:
+            result[~valid] = np.nan
+        return result
+
+
+# 已登錄的解碼器：通道名稱 -> RawDecoder
+DECODERS = {}
+_user_loaded = False
+
+
+def register_decoder(decoder):
+    """登錄解碼器，同名時取代原有的設定"""
+    DECODERS[decoder.name] = decoder
+    return decoder
+
+
+def load_user_decoders(path=None):
+    """讀取使用者自訂的解碼器，設定有誤的項目略過"""
+    path = path or app_data_path(DECODERS_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        print(f"讀取解碼器設定時出錯: {str(e)}")
+        return []
+    decoders = []
+    for entry in entries if isinstance(entries, list) else []:
+        try:
+            decoders.append(RawDecoder.from_dict(entry))
+        except (TypeError, ValueError) as e:
+            print(f"略過解碼器設定 {entry!r}: {str(e)}")
+    return decoders
+
+
+def decoders():
+    """已登錄的解碼器，第一次呼叫時讀入使用者自訂的解碼器"""
+    global _user_loaded
+    if not _user_loaded:
+        _user_loaded = True
+        for decoder in load_user_decoders():
+            register_decoder(decoder)
+    return DECODERS
+
+
+# 預設將 raw1..raw4 視為 24 位元二補數的 ADC 讀值，換算為滿刻度百分比；
+# 感測器的實際換算係數可在 decoders.json 中以相同名稱覆寫或另外新增
+for _number in range(1, 5):
+    register_decoder(RawDecoder(f'raw{_number} ADC', f'raw{_number}', '%FS', bits=ADC_BITS, signed=True,
+                                scale=100.0 / (1 << (ADC_BITS - 1))))
@@ -0,0 +1,383 @@
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import numpy as np
+import pandas as pd
+
+from data.app_paths import app_data_dir
+from data.compressed import iter_log_chunks, read_log
+from data.lap_detector import LapDetector, laps_within_files
+from data.range_index import block_min_max
+from data.start_points import StartPointStore
+from data.timestamps import DAY_MS, ms_to_datetime, parse_time_ms
+from data.track_simplify import simplification_tolerances, track_importance
+
+CACHE_VERSION = 4
+# 區塊最小/最大值的區塊大小（與 RangeMinMaxIndex 的預設相同）
+BLOCK_SIZE = 64
+# 串流寫入與計算衍生資料時每段的筆數
+CHUNK_ROWS = BLOCK_SIZE * 4096
+# 超過此大小的記錄檔在開啟前先串流解析到快取，再以記憶體映射讀取
+LARGE_LOG_BYTES = 256 * 1024 * 1024
+
+
+class ColumnTypeChanged(ValueError):
+    """串流寫入時欄位的型別與第一段不同（例如後段出現缺值或較長的文字）"""
+
+
+class _ColumnWriter:
+    """將一個欄位逐段寫入 .npy 檔，關閉時補上實際筆數"""
+    def __init__(self, path, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        header = self._header(0)
+        self.header_size = len(header)
+        self.file = open(path, 'wb')
+        self.file.write(header)
+
+    def _header(self, rows):
+        buffer = io.BytesIO()
+        np.lib.format.write_array_header_1_0(buffer, {
+            'descr': np.lib.format.dtype_to_descr(self.dtype),
+            'fortran_order': False,
+            'shape': (rows,),
+        })
+        return buffer.getvalue()
+
+    def append(self, values):
+        values = np.asarray(values)
+        if values.dtype != self.dtype and not np.can_cast(values.dtype, self.dtype, 'safe'):
+            raise ColumnTypeChanged(f"{os.path.basename(self.path)}: {values.dtype} -> {self.dtype}")
+        self.file.write(np.ascontiguousarray(values, dtype=self.dtype).tobytes())
+        self.rows += len(values)
+
+    def close(self):
+        header = self._header(self.rows)
+        if len(header) != self.header_size:
+            raise ValueError(f"無法更新 {self.path} 的標頭")
+        self.file.seek(0)
+        self.file.write(header)
+        self.file.close()
+
+
+def _column_array(values):
+    """將 DataFrame 欄位轉換為寫入快取的陣列，回傳 (種類, 陣列)"""
+    if pd.api.types.is_numeric_dtype(values):
+        return 'numeric', values.to_numpy()
+    return 'text', values.astype(str).to_numpy(dtype=str)
+
+
+class SessionCache:
+    """已解析記錄檔的二進位快取
+
+    每個記錄檔對應一個目錄，每個欄位存成一個 .npy 檔，另以 meta.json
+    記錄來源檔案的大小與修改時間、欄位清單，以及預先計算的單圈。
+    來源檔案改變後快取即失效。
+
+    欄位逐段寫入，不需將整個記錄檔載入記憶體；讀取時可用記憶體映射
+    （mmap=True），數值欄位成為 np.memmap，只有用到的部分會被讀入。
+    另外保存數值欄位每 BLOCK_SIZE 筆的最小/最大值（主圖表抽樣與Y軸
+    範圍索引）、軌跡的簡化重要度，以及 datetime 型別的時間欄位。
+    """
+    def __init__(self, root=None):
+        self.root = root or app_data_dir('cache')
+        os.makedirs(self.root, exist_ok=True)
+
+    def entry_dir(self, path):
+        """記錄檔對應的快取目錄"""
+        path = os.path.abspath(path)
+        digest = hashlib.sha1(os.path.normcase(path).encode('utf-8')).hexdigest()[:12]
+        stem = os.path.basename(path).split('.')[0]
+        return os.path.join(self.root, f"{stem}_{digest}")
+
+    @staticmethod
+    def _source_info(path):
+        stat = os.stat(path)
+        return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    @staticmethod
+    def _column_file(name):
+        return re.sub(r'[^0-9A-Za-z_.-]', '_', name) + '.npy'
+
+    def load_meta(self, path):
+        """讀取有效的快取資訊，沒有快取或已失效時回傳 None"""
+        meta_path = os.path.join(self.entry_dir(path), 'meta.json')
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            source = self._source_info(path)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != CACHE_VERSION:
+            return None
+        if meta['source']['size'] != source['size'] or meta['source']['mtime_ns'] != source['mtime_ns']:
+            return None
+        return meta
+
+    def is_fresh(self, path):
+        return self.load_meta(path) is not None
+
+    def load(self, path, columns=None, mmap=False):
+        """從快取載入記錄檔，回傳 (DataFrame, meta)；沒有有效快取時回傳 None
+
+        mmap 為 True 時數值欄位以唯讀的記憶體映射讀取，Time 欄位改用
+        datetime（與單圈分析後的型別相同），避免建立大量字串。
+        """
+        meta = self.load_meta(path)
+        if meta is None:
+            return None
+        entry = self.entry_dir(path)
+        # 沒有數據時無法建立記憶體映射
+        mmap_mode = 'r' if mmap and meta['rows'] else None
+        data = {}
+        try:
+            for column in meta['columns']:
+                if columns is not None and column['name'] not in columns:
+                    continue
+                if column['kind'] == 'text':
+                    if mmap_mode and column['name'] == 'Time':
+                        values = np.load(os.path.join(entry, 'time_dt.npy'), mmap_mode=mmap_mode)
+                    else:
+                        values = np.load(os.path.join(entry, column['file'])).astype(object)
+                else:
+                    values = np.load(os.path.join(entry, column['file']), mmap_mode=mmap_mode)
+                data[column['name']] = values
+        except (OSError, ValueError) as e:
+            print(f"讀取快取時出錯: {str(e)}")
+            return None
+        return pd.DataFrame(data, copy=False), meta
+
+    def load_time_ms(self, path):
+        """讀取快取中已解析為毫秒的時間欄位"""
+        meta = self.load_meta(path)
+        if meta is None:
+            return None
+        mmap_mode = 'r' if meta['rows'] else None
+        return np.load(os.path.join(self.entry_dir(path), 'time_ms.npy'), mmap_mode=mmap_mode)
+
+    def load_blocks(self, path):
+        """讀取數值欄位的區塊最小/最大值，回傳 {欄位: (最小值, 最大值, 區塊大小)}"""
+        meta = self.load_meta(path)
+        if meta is None:
+            return {}
+        entry = self.entry_dir(path)
+        stats = {}
+        for column in meta['columns']:
+            if column.get('blocks'):
+                blocks = np.load(os.path.join(entry, column['blocks']))
+                stats[column['name']] = (blocks[0], blocks[1], meta['block_size'])
+        return stats
+
+    def load_track_importance(self, path):
+        """讀取軌跡的簡化重要度，回傳 (X欄位, Y欄位, 重要度) 或 None"""
+        meta = self.load_meta(path)
+        if meta is None or not meta.get('track'):
+            return None
+        track = meta['track']
+        importance = np.load(os.path.join(self.entry_dir(path), track['file']))
+        return track['x'], track['y'], importance
+
+    def _decoded_path(self, path, name, key):
+        stem = self._column_file(name)[:-len('.npy')]
+        return os.path.join(self.entry_dir(path), f'decoded_{stem}_{key}.npy')
+
+    def load_decoded(self, path, name, key):
+        """讀取快取中解碼後的通道，key 為解碼器設定的摘要；沒有或已失效時回傳 None"""
+        meta = self.load_meta(path)
+        if meta is None:
+            return None
+        try:
+            values = np.load(self._decoded_path(path, name, key), mmap_mode='r' if meta['rows'] else None)
+        except (OSError, ValueError):
+            return None
+        return values if len(values) == meta['rows'] else None
+
+    def store_decoded(self, path, name, key, values):
+        """將解碼後的通道寫入快取（重新解析記錄檔時隨快取目錄一併清除）"""
+        meta = self.load_meta(path)
+        if meta is None or len(values) != meta['rows']:
+            return False
+        file_path = self._decoded_path(path, name, key)
+        try:
+            with open(file_path + '.tmp', 'wb') as f:
+                np.save(f, np.asarray(values))
+            os.replace(file_path + '.tmp', file_path)
+        except OSError as e:
+            print(f"寫入解碼快取時出錯: {str(e)}")
+            return False
+        return True
+
+    def set_laps(self, path, laps, start_point):
+        """更新快取中預先計算的單圈"""
+        meta_path = os.path.join(self.entry_dir(path), 'meta.json')
+        meta = self.load_meta(path)
+        if meta is None:
+            return
+        meta['laps'] = laps
+        meta['start_point'] = start_point
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def store(self, path, frame, laps=None, start_point=None):
+        """將解析後的 DataFrame 寫入快取"""
+        return self.store_chunks(path, [frame], laps, start_point)
+
+    def store_chunks(self, path, chunks, laps=None, start_point=None):
+        """將逐段解析的 DataFrame 依序寫入快取，記憶體用量只與每段大小有關
+
+        各段的欄位需一致，型別與第一段不相容時拋出 ColumnTypeChanged。
+        """
+        source = self._source_info(path)
+        entry = self.entry_dir(path)
+        tmp_entry = entry + '.tmp'
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+        os.makedirs(tmp_entry)
+
+        columns = []
+        writers = []
+        time_writer = None
+        day_offset = 0.0
+        last_ms = None
+        try:
+            for chunk in chunks:
+                if not writers:
+                    for name in chunk.columns:
+                        kind, array = _column_array(chunk[name])
+                        file_name = self._column_file(name)
+                        columns.append({'name': name, 'file': file_name, 'kind': kind})
+                        writers.append(_ColumnWriter(os.path.join(tmp_entry, file_name), array.dtype))
+                    if 'Time' in chunk.columns:
+                        time_writer = _ColumnWriter(os.path.join(tmp_entry, 'time_ms.npy'), np.float64)
+                for writer, name in zip(writers, chunk.columns):
+                    writer.append(_column_array(chunk[name])[1])
+                if time_writer is not None:
+                    # 各段內已處理跨越午夜，段與段之間接續累加
+                    ms = parse_time_ms(chunk['Time']) + day_offset
+                    valid = np.flatnonzero(np.isfinite(ms))
+                    if len(valid) and last_ms is not None and ms[valid[0]] < last_ms - DAY_MS / 2:
+                        ms += DAY_MS
+                        day_offset += DAY_MS
+                    if len(valid):
+                        last_ms = ms[valid[-1]]
+                    time_writer.append(ms)
+        except BaseException:
+            for writer in writers + [time_writer]:
+                if writer is not None:
+                    writer.file.close()
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            raise
+        for writer in writers + [time_writer]:
+            if writer is not None:
+                writer.close()
+        rows = writers[0].rows if writers else 0
+
+        meta = {
+            'version': CACHE_VERSION,
+            'source': source,
+            # 解析時包含沒有換行結尾的最後一行，追蹤時由此接續（CsvTailFollower.resume）
+            'parsed_bytes': source['size'] if path.lower().endswith('.csv') else None,
+            'rows': rows,
+            'columns': columns,
+            'block_size': BLOCK_SIZE,
+            'track': None,
+            'laps': laps,
+            'start_point': start_point,
+        }
+        if rows:
+            self._store_derived(tmp_entry, meta)
+        with open(os.path.join(tmp_entry, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp_entry, entry)
+        return meta
+
+    def _store_derived(self, entry, meta):
+        """由已寫入的欄位計算區塊統計、datetime 時間與軌跡簡化重要度"""
+        rows = meta['rows']
+        names = {}
+        for column in meta['columns']:
+            if column['kind'] != 'numeric':
+                continue
+            values = np.load(os.path.join(entry, column['file']), mmap_mode='r')
+            names[column['name']] = values
+            if values.dtype.kind not in 'fiub':
+                continue
+            parts = [block_min_max(values[start:start + CHUNK_ROWS], BLOCK_SIZE)
+                     for start in range(0, rows, CHUNK_ROWS)]
+            column['blocks'] = column['file'][:-len('.npy')] + '.blocks.npy'
+            np.save(os.path.join(entry, column['blocks']),
+                    np.vstack([np.concatenate([part[0] for part in parts]),
+                               np.concatenate([part[1] for part in parts])]))
+
+        time_path = os.path.join(entry, 'time_ms.npy')
+        if os.path.exists(time_path):
+            # 日期與 time_to_datetime 相同為 BASE_DATE，與由 CSV 載入的數據一致
+            time_ms = np.load(time_path, mmap_mode='r')
+            writer = _ColumnWriter(os.path.join(entry, 'time_dt.npy'), 'datetime64[ms]')
+            for start in range(0, rows, CHUNK_ROWS):
+                writer.append(ms_to_datetime(time_ms[start:start + CHUNK_ROWS]))
+            writer.close()
+
+        if 'Longitude' in names and 'Latitude' in names:
+            x = np.asarray(names['Longitude'], dtype=float)
+            y = np.asarray(names['Latitude'], dtype=float)
+            importance = track_importance(x, y, simplification_tolerances(x, y)[-1])
+            np.save(os.path.join(entry, 'track_importance.npy'), importance)
+            meta['track'] = {'x': 'Longitude', 'y': 'Latitude', 'file': 'track_importance.npy'}
+
+
+def detect_laps(frame, start_index, time_ms=None, file_boundaries=()):
+    """以指定起點偵測單圈，回傳可寫入 JSON 的單圈列表
+
+    time_ms 為已解析的時間（例如快取中的 time_ms.npy），數據分段處理，
+    記憶體映射的數據不會一次全部讀入。合併的數據傳入 file_boundaries，
+    與單圈分析相同地去除跨越檔案分界的單圈。
+    """
+    x_col = 'X' if 'X' in frame.columns else 'Longitude'
+    y_col = 'Y' if 'Y' in frame.columns else 'Latitude'
+    x_values = frame[x_col].to_numpy(dtype=float)
+    y_values = frame[y_col].to_numpy(dtype=float)
+    if time_ms is None:
+        time_ms = parse_time_ms(frame['Time'])
+    detector = LapDetector(x_values[start_index], y_values[start_index],
+                           start_index, time_ms[start_index])
+    for chunk_start in range(start_index + 1, len(frame), CHUNK_ROWS):
+        chunk_end = min(chunk_start + CHUNK_ROWS, len(frame))
+        detector.feed(x_values[chunk_start:chunk_end], y_values[chunk_start:chunk_end],
+                      time_ms[chunk_start:chunk_end], chunk_start)
+    return [{key: (value.item() if isinstance(value, np.generic) else value)
+             for key, value in lap.items()} for lap in laps_within_files(detector.laps, file_boundaries)]
+
+
+def ingest_file(path, cache_root=None, start_points_path=None):
+    """解析記錄檔並寫入快取，有符合的已存起點時一併計算單圈
+
+    記錄檔逐段解析寫入快取，之後以記憶體映射讀取快取計算單圈，
+    大型記錄檔也不需整個載入記憶體。供背景工作程序呼叫，回傳處理結果摘要。
+    """
+    cache = SessionCache(cache_root)
+    try:
+        cache.store_chunks(path, iter_log_chunks(path, chunksize=CHUNK_ROWS))
+    except ColumnTypeChanged as e:
+        # 後段的型別改變時改為整個讀取，由 pandas 統一型別
+        print(f"欄位型別不一致，改為整個讀取: {str(e)}")
+        cache.store(path, read_log(path))
+    frame, meta = cache.load(path, mmap=True)
+
+    laps = None
+    start_point = None
+    if {'Longitude', 'Latitude', 'Time'} <= set(frame.columns):
+        matched = StartPointStore(start_points_path).match(frame['Longitude'], frame['Latitude'])
+        if matched is not None:
+            point, start_index = matched
+            laps = detect_laps(frame, start_index, cache.load_time_ms(path))
+            start_point = {'x': point['x'], 'y': point['y'], 'index': start_index}
+            cache.set_laps(path, laps, start_point)
+
+    return {'path': path, 'rows': len(frame), 'laps': None if laps is None else len(laps)}
@@ -0,0 +1,90 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data.archive import is_archive
+from data.compressed import read_log
+from data.session_cache import SessionCache
+from data.timestamps import parse_time_ms
+
+# 檔名中的記錄開始時間：RIMS_<日期>_<時間>_<序號>
+_FILE_TIME_PATTERN = re.compile(r'RIMS_(\d{8})_(\d{6})_(\d+)', re.IGNORECASE)
+
+
+def file_start_time(path):
+    """從檔名取得記錄開始時間與序號，無法解析時回傳 (None, None)"""
+    match = _FILE_TIME_PATTERN.search(os.path.basename(path))
+    if not match:
+        return None, None
+    try:
+        start = datetime.strptime(match.group(1) + match.group(2), '%Y%m%d%H%M%S')
+    except ValueError:
+        return None, None
+    return start, int(match.group(3))
+
+
+def parse_log_file(path, cache_root=None, columns=None):
+    """讀取單一記錄檔，有有效快取時直接使用
+
+    沒有快取時解析所有欄位並寫入快取（其餘欄位之後可直接由快取讀取），
+    再只回傳 columns 中的欄位（None 時為全部）。供工作程序呼叫。
+    """
+    cache = SessionCache(cache_root)
+    cached = cache.load(path, columns)
+    if cached is not None:
+        return cached[0]
+    if is_archive(path):
+        # 封存檔本身即可快速讀取，不另建快取
+        return read_log(path, usecols=columns)
+    frame = read_log(path)
+    try:
+        cache.store(path, frame)
+    except OSError as e:
+        print(f"寫入快取時出錯: {str(e)}")
+    if columns is not None:
+        frame = frame[[name for name in columns if name in frame.columns]]
+    return frame
+
+
+def load_log_files(paths, cache_root=None, columns=None, max_workers=None):
+    """以工作程序池同時解析多個記錄檔，回傳與 paths 同順序的 DataFrame 列表"""
+    if len(paths) == 1:
+        return [parse_log_file(paths[0], cache_root, columns)]
+    max_workers = max_workers or max(1, min(len(paths), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(parse_log_file, paths, [cache_root] * len(paths),
+                                 [columns] * len(paths)))
+
+
+def merge_sessions(paths, frames):
+    """將多個記錄檔依時間順序合併為單一數據
+
+    以檔名中的開始時間排序（無法解析時改用第一筆的 Time），回傳
+    (合併後的 DataFrame, 檔案邊界列表)，邊界包含檔名與在合併數據中的起訖索引。
+    """
+    def sort_key(item):
+        path, frame = item
+        start, sequence = file_start_time(path)
+        first_ms = parse_time_ms(frame['Time'].iloc[:1])[0] if 'Time' in frame and len(frame) else np.nan
+        if start is None:
+            return (1, datetime.min, np.nan_to_num(first_ms), path)
+        return (0, start, sequence, path)
+
+    ordered = sorted(zip(paths, frames), key=sort_key)
+    boundaries = []
+    offset = 0
+    for path, frame in ordered:
+        boundaries.append({
+            'path': path,
+            'name': os.path.basename(path),
+            'start_index': offset,
+            'end_index': offset + len(frame) - 1,
+        })
+        offset += len(frame)
+
+    merged = pd.concat([frame for _, frame in ordered], ignore_index=True)
+    return merged, boundaries
@@ -0,0 +1,65 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from data.app_paths import app_data_path
+from data.lap_detector import GATE_TOLERANCE
+
+
+class StartPointStore:
+    """已儲存的起點位置
+
+    每個起點只記錄經緯度。判斷檔案屬於哪個賽道時，檢查軌跡是否
+    通過起點的容許範圍，多個起點符合時使用最近儲存的。
+    """
+    def __init__(self, path=None):
+        self.path = path or app_data_path('start_points.json')
+        self.points = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"讀取起點設定時出錯: {str(e)}")
+            return []
+
+    def save(self, x, y, tolerance=GATE_TOLERANCE):
+        """儲存起點，與既有起點重疊時更新該起點"""
+        x, y = float(x), float(y)
+        self.points = [p for p in self.points
+                       if abs(p['x'] - x) > tolerance or abs(p['y'] - y) > tolerance]
+        self.points.append({'x': x, 'y': y, 'saved_at': time.time()})
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.points, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def match(self, x_values, y_values, tolerance=GATE_TOLERANCE, chunk_rows=1000000):
+        """找出軌跡通過的起點，回傳 (起點, 最接近的數據索引) 或 None
+
+        數據分段比較，記憶體映射的長時間記錄不會一次全部讀入。
+        """
+        x_values = np.asarray(x_values, dtype=float)
+        y_values = np.asarray(y_values, dtype=float)
+        if not len(x_values):
+            return None
+        for point in sorted(self.points, key=lambda p: p.get('saved_at', 0), reverse=True):
+            best = None
+            for start in range(0, len(x_values), chunk_rows):
+                dx = np.abs(x_values[start:start + chunk_rows] - point['x'])
+                dy = np.abs(y_values[start:start + chunk_rows] - point['y'])
+                inside = (dx <= tolerance) & (dy <= tolerance)
+                if inside.any():
+                    # 與在軌跡圖上點選起點相同，取距離最近的數據點
+                    distances = np.where(inside, dx ** 2 + dy ** 2, np.inf)
+                    nearest = int(np.argmin(distances))
+                    if best is None or distances[nearest] < best[0]:
+                        best = (distances[nearest], start + nearest)
+            if best is not None:
+                return point, best[1]
+        return None
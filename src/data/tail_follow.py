@@ -0,0 +1,119 @@
+import io
+import os
+
+import pandas as pd
+
+
+class CsvTailFollower:
+    """追蹤持續寫入中的 CSV 檔案
+
+    記住已解析到的位元組位置，每次只讀取新增且以換行結尾的完整行，
+    最後一行若仍在寫入中則留待下次讀取。usecols（欄位列表或判斷函式）
+    指定時只解析這些欄位，columns 仍記錄檔案中的所有欄位。
+    一次載入整個檔案時使用 read_all，最後一行沒有換行也會讀取；
+    載入後立即追蹤時以 complete_lines_only 保留該行，與 poll 相同。
+    """
+    def __init__(self, path, usecols=None):
+        self.path = path
+        self.usecols = usecols
+        self.offset = 0
+        self.columns = None
+        self.truncated = False
+        # 上次讀到的最後一行沒有換行（read_all 已解析），下次 poll 需略過該行其餘的內容
+        self._unterminated = False
+
+    def read_all(self, complete_lines_only=False):
+        """讀取整個檔案（含標題），回傳 DataFrame
+
+        直接由檔案串流解析，不先把整個檔案讀入記憶體。沒有換行結尾的最後一行
+        預設也會讀取（已寫完但缺少換行的檔案）；complete_lines_only 時視為
+        仍在寫入中，留待 poll 讀取。之後 poll 從讀取到的位置接續，若已讀取的
+        最後一行其實仍在寫入中，該筆數據可能不完整。
+        """
+        self.offset = 0
+        self.columns = None
+        self.truncated = False
+        self._unterminated = False
+        if os.path.getsize(self.path) == 0:
+            return self._empty()
+        with open(self.path, 'rb') as f:
+            self.columns = list(pd.read_csv(f, nrows=0).columns)
+            f.seek(0)
+            data = pd.read_csv(f, usecols=self._usecols())
+            # 解析器讀到檔案結尾，之後寫入的數據由 poll 讀取
+            self.offset = f.tell()
+            f.seek(self.offset - 1)
+            self._unterminated = f.read(1) != b'\n'
+            if self._unterminated and complete_lines_only and len(data):
+                data = data.iloc[:-1]
+                self.offset = self._line_start(f, self.offset)
+                self._unterminated = False
+        return data
+
+    @staticmethod
+    def _line_start(f, end, block_size=65536):
+        """end 之前最後一個換行之後的位置（由檔案結尾往回讀取）"""
+        position = end
+        while position > 0:
+            start = max(position - block_size, 0)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+        return 0
+
+    def resume(self, offset, columns):
+        """從 offset 接續追蹤（例如快取已解析到的位置），columns 為檔案中的所有欄位"""
+        self.offset = offset
+        self.columns = list(columns)
+        self.truncated = False
+        self._unterminated = False
+        if offset:
+            with open(self.path, 'rb') as f:
+                f.seek(offset - 1)
+                self._unterminated = f.read(1) != b'\n'
+
+    def poll(self):
+        """讀取上次位置之後新增的完整行，沒有新資料時回傳空的 DataFrame"""
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            # 檔案被截斷或重新建立，已讀取的資料不再有效
+            self.truncated = True
+            return self._empty()
+        if size == self.offset:
+            return self._empty()
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return self._empty()
+        start = 0
+        if self._unterminated:
+            start = chunk.find(b'\n') + 1
+            if start > 1:
+                print("載入時最後一行仍在寫入中，略過該行其餘的內容")
+            self._unterminated = False
+        chunk = chunk[start:end]
+        self.offset += end
+        if not chunk:
+            return self._empty()
+
+        if self.columns is None:
+            self.columns = list(pd.read_csv(io.BytesIO(chunk), nrows=0).columns)
+            return pd.read_csv(io.BytesIO(chunk), usecols=self._usecols())
+        return pd.read_csv(io.BytesIO(chunk), header=None, names=self.columns, usecols=self._usecols())
+
+    def _usecols(self):
+        """pandas 的 usecols 參數，檔案中不存在的欄位會被忽略"""
+        if self.usecols is None or callable(self.usecols):
+            return self.usecols
+        wanted = set(self.usecols)
+        return lambda name: name in wanted
+
+    def _empty(self):
+        selected = self._usecols()
+        columns = [name for name in self.columns or [] if selected is None or selected(name)]
+        return pd.DataFrame(columns=columns)
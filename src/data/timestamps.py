@@ -0,0 +1,135 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+DAY_MS = 24 * 3600 * 1000.0
+# Time 欄位只有當日時間，轉為 datetime 時固定使用此日期，同一記錄檔
+# 不論由 CSV 或快取載入、在哪一天開啟，得到的時間都相同
+BASE_DATE = date(1970, 1, 1)
+
+
+def parse_time_ms(time_values):
+    """將 RIMS 的 Time 欄位（HH:MM:SS.fff 或 datetime）轉換為毫秒
+
+    回傳當日毫秒數的 float64 陣列，記錄跨越午夜時自動累加一天，
+    無法解析的值為 NaN。
+    """
+    series = pd.Series(time_values)
+    if series.empty:
+        return np.empty(0)
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # analyze_ranges 會把 Time 欄位轉成 datetime，只取當日時間部分
+        ms = ((series - series.dt.normalize()) / pd.Timedelta(milliseconds=1)).to_numpy(dtype=float)
+    elif (ms := _parse_fixed_width(series)) is not None:
+        pass
+    else:
+        parts = series.astype(str).str.split(':', expand=True)
+        if parts.shape[1] < 3:
+            return np.full(len(series), np.nan)
+        hours = pd.to_numeric(parts[0], errors='coerce')
+        minutes = pd.to_numeric(parts[1], errors='coerce')
+        seconds = pd.to_numeric(parts[2], errors='coerce')
+        ms = ((hours * 3600 + minutes * 60 + seconds) * 1000.0).to_numpy(dtype=float)
+
+    return unwrap_midnight(ms)
+
+
+def ms_to_datetime(ms):
+    """將毫秒陣列轉換為以 BASE_DATE 為日期的 datetime64[ms]，NaN 為 NaT"""
+    ms = np.asarray(ms, dtype=float)
+    finite = np.isfinite(ms)
+    stamps = np.full(len(ms), np.datetime64('NaT'), dtype='datetime64[ms]')
+    stamps[finite] = np.datetime64(BASE_DATE, 'ms') + np.round(ms[finite]).astype(np.int64).astype('timedelta64[ms]')
+    return stamps
+
+
+def datetime_to_ms(stamps):
+    """ms_to_datetime 的反向轉換：相對 BASE_DATE 的毫秒數（含跨越午夜的天數），NaT 為 NaN"""
+    stamps = np.asarray(stamps, dtype='datetime64[ms]')
+    ms = (stamps - np.datetime64(BASE_DATE, 'ms')).astype(np.int64).astype(float)
+    ms[np.isnat(stamps)] = np.nan
+    return ms
+
+
+def continue_time_ms(ms, last_ms):
+    """以之前數據最後的有效時間 last_ms 為起點，接續處理新數據的跨越午夜
+
+    parse_time_ms 只能在同一段數據內判斷跨越午夜，追蹤檔案逐段讀入時
+    以此讓新數據的時間與之前的數據連續。
+    """
+    ms = np.asarray(ms, dtype=float)
+    if last_ms is None or not np.isfinite(last_ms):
+        return ms
+    days = np.floor(last_ms / DAY_MS) * DAY_MS
+    return unwrap_midnight(np.concatenate([[last_ms - days], ms]))[1:] + days
+
+
+def time_to_datetime(time_values):
+    """將 Time 欄位轉換為 datetime64[ms] 陣列，已是 datetime 時直接回傳
+
+    以 parse_time_ms 向量化解析，不需像 pd.to_datetime 逐筆推測格式。
+    日期為 BASE_DATE，跨越午夜的時間為隔天，無法解析的值為 NaT。
+    """
+    if pd.api.types.is_datetime64_any_dtype(time_values):
+        return time_values
+    return ms_to_datetime(parse_time_ms(time_values))
+
+
+def _parse_fixed_width(series):
+    """所有值都是 HH:MM:SS.fff 時直接以字元運算解析，否則回傳 None"""
+    text = series.to_numpy(dtype=str)
+    if text.dtype.itemsize != 12 * 4:
+        return None
+    chars = text.view(np.uint32).reshape(len(text), 12)
+    if not ((chars[:, [2, 5]] == ord(':')).all() and (chars[:, 8] == ord('.')).all()):
+        return None
+    digits = chars[:, [0, 1, 3, 4, 6, 7, 9, 10, 11]].astype(np.int64) - ord('0')
+    if ((digits < 0) | (digits > 9)).any():
+        return None
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 2] * 10 + digits[:, 3]
+    seconds = digits[:, 4] * 10 + digits[:, 5]
+    millis = digits[:, 6] * 100 + digits[:, 7] * 10 + digits[:, 8]
+    return ((hours * 3600 + minutes * 60 + seconds) * 1000 + millis).astype(float)
+
+
+def time_string_to_ms(text):
+    """將單一 HH:MM:SS.fff 字串轉換為當日毫秒數"""
+    hours, minutes, seconds = text.strip().split(':')
+    return (int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 1000.0
+
+
+def format_time_ms(ms):
+    """將毫秒陣列轉換回 RIMS 的 HH:MM:SS.fff 字串"""
+    ms = np.asarray(ms, dtype=float)
+    finite = np.isfinite(ms)
+    total = np.round(np.where(finite, ms, 0)).astype(np.int64) % int(DAY_MS)
+    seconds, millis = np.divmod(total, 1000)
+    minutes, seconds = np.divmod(seconds, 60)
+    hours, minutes = np.divmod(minutes, 60)
+
+    # 直接組出固定寬度的 ASCII 字元，避免逐筆格式化
+    chars = np.empty((len(ms), 12), dtype=np.uint8)
+    chars[:, [2, 5]] = ord(':')
+    chars[:, 8] = ord('.')
+    for column, (value, width) in zip((0, 3, 6, 9), ((hours, 2), (minutes, 2), (seconds, 2), (millis, 3))):
+        for position in range(width):
+            chars[:, column + position] = ord('0') + value // 10 ** (width - 1 - position) % 10
+    result = chars.view('S12').ravel().astype(str).astype(object)
+    result[~finite] = ''
+    return result.tolist()
+
+
+def unwrap_midnight(ms):
+    """時間倒退超過半天時視為跨越午夜，之後的時間加上一天"""
+    ms = np.asarray(ms, dtype=float)
+    valid = np.flatnonzero(np.isfinite(ms))
+    if len(valid) < 2:
+        return ms
+    steps = np.diff(ms[valid])
+    wraps = np.concatenate([[0], np.cumsum(steps < -DAY_MS / 2)])
+    result = ms.copy()
+    result[valid] += wraps * DAY_MS
+    return result
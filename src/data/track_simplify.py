@@ -0,0 +1,94 @@
+import numpy as np
+
+
+def douglas_peucker_importance(x, y, min_tolerance):
+    """計算每個點在 Douglas-Peucker 簡化中被保留的最大容差
+
+    回傳陣列中 importance[i] >= tol 的點即為容差 tol 下的簡化折線，
+    因此只需執行一次簡化即可產生所有縮放層級。
+    """
+    n = len(x)
+    importance = np.zeros(n)
+    if n == 0:
+        return importance
+    importance[0] = np.inf
+    importance[-1] = np.inf
+
+    # 逐層同時分割所有未完成的區間，每一層只需一次向量化運算
+    bounds = np.array([0, n - 1])
+    active = np.array([True])
+    while active.any():
+        starts = bounds[:-1][active]
+        ends = bounds[1:][active]
+        lengths = ends - starts - 1
+        has_interior = lengths > 0
+        starts, ends, lengths = starts[has_interior], ends[has_interior], lengths[has_interior]
+        if len(starts) == 0:
+            break
+
+        # 展開各區間的內部點索引
+        group = np.repeat(np.arange(len(starts)), lengths)
+        offsets = np.cumsum(lengths) - lengths
+        idx = starts[group] + 1 + (np.arange(lengths.sum()) - offsets[group])
+
+        dx = (x[ends] - x[starts])[group]
+        dy = (y[ends] - y[starts])[group]
+        rel_x = x[idx] - x[starts][group]
+        rel_y = y[idx] - y[starts][group]
+        seg_len = np.hypot(dx, dy)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dist = np.where(seg_len > 0,
+                            np.abs(dy * rel_x - dx * rel_y) / seg_len,
+                            # 起終點重合（例如繞圈回到原點）時改用到起點的距離
+                            np.hypot(rel_x, rel_y))
+        dist = np.nan_to_num(dist, nan=-1.0)
+
+        # 每個區間取距離最大的第一個點作為分割點
+        group_max = np.maximum.reduceat(dist, offsets)
+        max_pos = np.flatnonzero(dist == group_max[group])
+        max_group = group[max_pos]
+        first = np.ones(len(max_pos), dtype=bool)
+        first[1:] = max_group[1:] != max_group[:-1]
+        split = idx[max_pos[first]]
+
+        do_split = group_max >= min_tolerance
+        # 子節點的容差不可超過父節點，確保各層級互相包含
+        parent = np.minimum(importance[starts], importance[ends])
+        new_points = split[do_split]
+        importance[new_points] = np.minimum(group_max[do_split], parent[do_split])
+
+        # 分割點必為區間內部點，不會與既有斷點重複
+        bounds = np.sort(np.concatenate([bounds, new_points]))
+        is_new = np.zeros(len(bounds), dtype=bool)
+        is_new[np.searchsorted(bounds, new_points)] = True
+        active = is_new[:-1] | is_new[1:]
+
+    return importance
+
+
+def track_extent(x, y):
+    """計算有效座標的範圍 (x 最小, x 最大, y 最小, y 最大)"""
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.any():
+        return (0.0, 1.0, 0.0, 1.0)
+    return (x[finite].min(), x[finite].max(), y[finite].min(), y[finite].max())
+
+
+def simplification_tolerances(x, y, levels=8):
+    """依軌跡範圍決定各縮放層級的簡化容差（由粗到細）"""
+    extent = track_extent(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    span = max(extent[1] - extent[0], extent[3] - extent[2]) or 1.0
+    # 約為全幅 1/2048 至 1/(2048 * 2^(levels-1))
+    return span / (2.0 ** np.arange(11, 11 + levels))
+
+
+def track_importance(x, y, min_tolerance):
+    """計算軌跡各點的簡化重要度"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # GPS 更新頻率低於記錄頻率，連續重複的座標不影響形狀，先行排除
+    moved = np.ones(len(x), dtype=bool)
+    moved[1:-1] = (np.diff(x[:-1]) != 0) | (np.diff(y[:-1]) != 0)
+    importance = np.zeros(len(x))
+    importance[moved] = douglas_peucker_importance(x[moved], y[moved], min_tolerance)
+    return importance
@@ -1,35 +1,72 @@
 import sys
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtGui import QFont
-from ui.map_viewer import MapViewer
-import matplotlib
-import warnings
+import multiprocessing
+from PyQt5.QtWidgets import QApplication, QSplashScreen
+from PyQt5.QtGui import QFont, QPixmap, QColor
+from PyQt5.QtCore import Qt, QTimer
+from perf import tracing
+from perf.startup import prefetch_modules, report_requested, startup_timer
+
+# matplotlib、pandas 與主窗口在顯示啟動畫面後才載入，
+# 背景解析的工作程序匯入此模組時也不需載入這些模組。
+# 主窗口模組與其使用的 data、plot 模組在模組層級匯入 pandas 與 matplotlib，
+# 主窗口仍在這些模組載入完成後才出現，載入期間由啟動畫面顯示進度
 
 def setup_matplotlib():
     """設置 Matplotlib 的配置"""
-    # 關閉字體相關警告
-    warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib")
-    
-    # 設置中文字體
-    matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
-    matplotlib.rcParams['axes.unicode_minus'] = False
-    
+    import matplotlib
+    from plot.fonts import configure_matplotlib_fonts
+
+    # 設置中文字體（解析結果會快取，之後啟動不需再搜尋），回傳字體名稱
+    family = configure_matplotlib_fonts()
+
     # 設置 DPI 和後端
     matplotlib.use('Qt5Agg')
     matplotlib.rcParams['figure.dpi'] = 100
+    return family
+
+def show_splash(app):
+    """在載入其他模組前先顯示啟動畫面"""
+    pixmap = QPixmap(360, 120)
+    pixmap.fill(QColor('#2b2b2b'))
+    splash = QSplashScreen(pixmap)
+    splash.showMessage("RouteMap 載入中...", Qt.AlignCenter, QColor('white'))
+    splash.show()
+    app.processEvents()
+    return splash
 
 def main():
-    # 在創建任何 matplotlib 圖表之前設置配置
-    setup_matplotlib()
-    app = QApplication(sys.argv)
-    # 設置全局字體，支持中文顯示
-    font = QFont("Microsoft YaHei", 9)  # 使用微軟雅黑字體，大小為9
-    # 處理圖片的路徑，確保打包後能夠正常顯示
-
-    app.setFont(font)
-    viewer = MapViewer()
-    viewer.show()
+    # 設定 ROUTEMAP_TRACE 環境變數時記錄各項處理的耗時
+    tracing.enable_from_environment()
+    with startup_timer.phase('Qt'):
+        app = QApplication(sys.argv)
+        splash = show_splash(app)
+
+    # pandas 在背景載入，同時主線程載入 matplotlib 與 Qt 後端
+    prefetch_modules(['pandas'])
+    with startup_timer.phase('matplotlib'):
+        # 在創建任何 matplotlib 圖表之前設置配置
+        family = setup_matplotlib()
+        # 設置全局字體，與圖表使用相同的中文字體，大小為9
+        app.setFont(QFont(family or "Microsoft YaHei", 9))
+    with startup_timer.phase('Qt5Agg 後端'):
+        import matplotlib.backends.backend_qt5agg  # noqa: F401
+    with startup_timer.phase('主窗口模組'):
+        from ui.map_viewer import MapViewer
+    with startup_timer.phase('建立主窗口'):
+        viewer = MapViewer()
+    with startup_timer.phase('顯示主窗口'):
+        viewer.show()
+        splash.finish(viewer)
+
+    def finish_startup():
+        startup_timer.finish()
+        if report_requested():
+            print(startup_timer.report())
+    # 事件迴圈開始並完成第一次繪製後才算啟動完成
+    QTimer.singleShot(0, finish_startup)
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 打包後的執行檔啟動背景解析的工作程序時需要
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+
+from perf import tracing
+from perf.metrics import Measurement, counters, peak_rss
+from perf.synthetic_log import generate_log
+
+BENCHMARK_VERSION = 1
+DEFAULT_ROWS = [10000, 100000, 1000000]
+# 完整測試的筆數（5000 萬筆的記錄檔約 3.5 GB）
+FULL_ROWS = [10000, 100000, 1000000, 10000000, 50000000]
+NEAREST_POINT_CALLS = 200
+
+
+def prepare_qt(backend='Agg'):
+    """建立離屏的 QApplication 並設定 matplotlib 後端，供 PlotManager 與 MapViewer 使用"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import matplotlib
+    matplotlib.use(backend)
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+def run_size(log_info, cache_root, nearest_calls=NEAREST_POINT_CALLS, verbose=False, trace_path=None):
+    """在單一記錄檔上執行所有量測，回傳結果
+
+    於獨立的工作程序中執行，使每個數據量的記憶體峰值互不影響。
+    流程與 MapViewer 相同：載入（大型檔案先解析到快取再以記憶體映射讀取）、
+    建立並渲染主圖表、分析單圈、點擊軌跡圖找最近點、繪製選取的Run。
+    指定 trace_path 時輸出追蹤資料。
+    """
+    app = prepare_qt()
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from data.compressed import read_log
+    from data.lazy_columns import PRIMARY_COLUMNS
+    from data.session_cache import LARGE_LOG_BYTES, SessionCache, ingest_file
+    from plot.plot_manager import PlotManager
+
+    path = log_info['path']
+    rows = log_info['rows']
+    phases = {}
+    if trace_path:
+        tracing.enable()
+    output = sys.stdout if verbose else open(os.devnull, 'w', encoding='utf-8')
+    try:
+        with redirect_stdout(output):
+            # 背景解析（資料夾監看與大型檔案開啟前）寫入快取
+            start_points_path = os.path.join(cache_root, 'start_points.json')
+            with Measurement('ingest') as m:
+                ingest_file(path, cache_root, start_points_path)
+            phases['ingest'] = m.as_dict(rows)
+
+            # 開啟檔案時的讀取方式與 MapViewer.load_files 相同
+            cache = SessionCache(cache_root)
+            mapped = log_info['bytes'] >= LARGE_LOG_BYTES
+            block_stats = {}
+            with Measurement('load') as m:
+                if mapped:
+                    data, _ = cache.load(path, PRIMARY_COLUMNS, mmap=True)
+                    block_stats = cache.load_blocks(path)
+                else:
+                    data = read_log(path, usecols=PRIMARY_COLUMNS)
+            phases['load'] = dict(m.as_dict(rows), mode='mmap' if mapped else 'csv')
+
+            figure = Figure(figsize=(10, 6))
+            FigureCanvasAgg(figure)
+            plot_manager = PlotManager(figure)
+            plot_manager.data_list = [data]
+            plot_manager.block_stats = block_stats
+            with Measurement('create_plots') as m:
+                plot_manager.create_plots()
+            phases['create_plots'] = m.as_dict(rows)
+            with Measurement('render') as m:
+                figure.canvas.draw()
+            phases['render'] = m.as_dict(rows)
+            plot_manager.redraw_scheduler.discard(figure.canvas)
+
+            with Measurement('analyze_ranges') as m:
+                ranges = plot_manager.analyze_ranges(log_info['start_index'])
+            phases['analyze_ranges'] = dict(m.as_dict(rows), laps=len(ranges),
+                                            expected_laps=log_info['expected_laps'])
+
+            # 在軌跡附近隨機點擊
+            x_values = data['Longitude'].to_numpy(dtype=float)
+            y_values = data['Latitude'].to_numpy(dtype=float)
+            rng = np.random.default_rng(0)
+            picks = rng.integers(0, rows, nearest_calls)
+            durations = []
+            with Measurement('find_nearest_point') as m:
+                for pick in picks:
+                    started = time.perf_counter()
+                    plot_manager.find_nearest_point(x_values[pick] + 1e-5, y_values[pick] - 1e-5)
+                    durations.append(time.perf_counter() - started)
+            phases['find_nearest_point'] = dict(
+                m.as_dict(rows * nearest_calls), calls=nearest_calls,
+                mean_seconds=float(np.mean(durations)), p95_seconds=float(np.percentile(durations, 95)))
+
+            # 勾選前兩個Run後切換單圈
+            checked_items = [
+                {'id': lap['range_number'],
+                 'description': f"start_index:{lap['start_index']},end_index:{lap['end_index']}"}
+                for lap in ranges[:2]
+            ]
+            if checked_items:
+                selected_axes = figure.axes[:3]
+                track_figure = Figure(figsize=(8, 4))
+                FigureCanvasAgg(track_figure)
+                track_ax = track_figure.add_subplot(111)
+                selected_rows = sum(lap['data_count'] for lap in ranges[:2])
+                with Measurement('plot_selected_ranges') as m:
+                    plot_manager.plot_selected_ranges(checked_items, data, selected_axes, figure.canvas,
+                                                      track_ax, track_figure.canvas)
+                    figure.canvas.draw()
+                    track_figure.canvas.draw()
+                phases['plot_selected_ranges'] = dict(m.as_dict(selected_rows), runs=len(checked_items))
+            plot_manager.redraw_scheduler.discard(figure.canvas)
+            app.processEvents()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if trace_path:
+        tracing.export_chrome_trace(trace_path)
+
+    return {
+        'rows': rows,
+        'file_bytes': log_info['bytes'],
+        'peak_rss': peak_rss(),
+        'phases': phases,
+        # 與效能監看面板相同的耗時記錄
+        'counters': counters.snapshot(),
+    }
+
+
+def _environment():
+    import matplotlib
+    import pandas as pd
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def run_benchmarks(row_counts, work_dir, nearest_calls=NEAREST_POINT_CALLS, keep_logs=True, verbose=False,
+                   trace_dir=None):
+    """依序對每個數據量產生記錄檔並量測，回傳可寫成 JSON 的結果
+
+    記錄檔以筆數命名保存在 work_dir 中，重複執行時直接沿用。
+    指定 trace_dir 時，每個數據量的追蹤資料另存為 Chrome 追蹤格式。
+    """
+    results = []
+    for rows in row_counts:
+        log_info = prepare_log(rows, work_dir)
+        print(f"量測 {rows} 筆...")
+        trace_path = os.path.join(trace_dir, f'benchmark_{rows}.trace.json') if trace_dir else None
+        results.append(run_in_worker(run_size, log_info, work_dir, nearest_calls, verbose, trace_path))
+        _print_result(results[-1])
+        if not keep_logs:
+            discard_log(log_info)
+    return make_report(results)
+
+
+def prepare_log(rows, work_dir):
+    """取得 rows 筆的測試記錄檔，work_dir 中已有相同筆數的記錄檔時直接沿用"""
+    path = os.path.join(work_dir, f'RIMS_synthetic_{rows}.csv')
+    info_path = path + '.json'
+    if os.path.exists(path) and os.path.exists(info_path):
+        with open(info_path, 'r', encoding='utf-8') as f:
+            log_info = json.load(f)
+        if log_info.get('bytes') == os.path.getsize(path):
+            return log_info
+
+    print(f"產生 {rows} 筆的記錄檔...")
+    started = time.perf_counter()
+    log_info = generate_log(path, rows)
+    print(f"  完成，耗時 {time.perf_counter() - started:.1f} 秒")
+    with open(info_path, 'w', encoding='utf-8') as f:
+        json.dump(log_info, f)
+    return log_info
+
+
+def discard_log(log_info):
+    os.remove(log_info['path'])
+    os.remove(log_info['path'] + '.json')
+
+
+def run_in_worker(function, log_info, work_dir, *args):
+    """在獨立的工作程序中執行 function(log_info, cache_root, *args)
+
+    每次使用新的快取目錄，結束後刪除。
+    """
+    cache_root = tempfile.mkdtemp(dir=work_dir, prefix='cache-')
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            return executor.submit(function, log_info, cache_root, *args).result()
+    finally:
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+
+def make_report(results):
+    return {
+        'version': BENCHMARK_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'results': results,
+    }
+
+
+def _print_result(result):
+    peak = result['peak_rss']
+    print(f"  {result['rows']} 筆，程序記憶體峰值 {peak / 1024 / 1024:.0f} MB" if peak else f"  {result['rows']} 筆")
+    for name, phase in result['phases'].items():
+        line = f"    {name:<22}{phase['seconds'] * 1000:>10.1f} ms"
+        if phase.get('rows_per_second'):
+            line += f"{phase['rows_per_second']:>16,.0f} 筆/秒"
+        if phase.get('rss_peak'):
+            line += f"{phase['rss_peak'] / 1024 / 1024:>10.0f} MB"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量測載入、分析與繪圖在不同數據量下的效能")
+    parser.add_argument('--rows', type=int, nargs='+', default=None,
+                        help=f"數據筆數，預設 {DEFAULT_ROWS}")
+    parser.add_argument('--full', action='store_true', help=f"使用完整的數據量 {FULL_ROWS}")
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'routemap-benchmark'),
+                        help="存放產生的記錄檔與快取的目錄")
+    parser.add_argument('--output', default='benchmark_results.json', help="結果的 JSON 檔案")
+    parser.add_argument('--nearest-calls', type=int, default=NEAREST_POINT_CALLS,
+                        help="find_nearest_point 的呼叫次數")
+    parser.add_argument('--discard-logs', action='store_true', help="量測後刪除產生的記錄檔")
+    parser.add_argument('--verbose', action='store_true', help="顯示被量測程式的輸出")
+    parser.add_argument('--trace-dir', default=None, help="輸出 Chrome 追蹤格式資料的目錄")
+    args = parser.parse_args()
+
+    row_counts = args.rows or (FULL_ROWS if args.full else DEFAULT_ROWS)
+    os.makedirs(args.work_dir, exist_ok=True)
+    if args.trace_dir:
+        os.makedirs(args.trace_dir, exist_ok=True)
+    report = run_benchmarks(row_counts, args.work_dir, args.nearest_calls, keep_logs=not args.discard_logs,
+                            verbose=args.verbose, trace_dir=args.trace_dir)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import functools
+import os
+import sys
+import threading
+import time
+
+
+def current_rss():
+    """目前程序使用的實體記憶體（位元組），無法取得時回傳 None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """程序啟動以來的最高實體記憶體（位元組），無法取得時回傳 None"""
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        # Windows 提供峰值，其他平台改用 resource
+        if hasattr(info, 'peak_wset'):
+            return info.peak_wset
+    except ImportError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以位元組為單位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Counters:
+    """各項處理最近一次與累計的耗時
+
+    程式中的重繪、單圈分析與最近點查詢會記錄到共用的 counters，
+    效能監看面板與效能測試讀取同一份資料。
+    """
+    def __init__(self):
+        self._stats = {}
+
+    def record(self, name, seconds):
+        stat = self._stats.get(name)
+        if stat is None:
+            stat = self._stats[name] = {'count': 0, 'total': 0.0, 'last': 0.0, 'max': 0.0}
+        stat['count'] += 1
+        stat['total'] += seconds
+        stat['last'] = seconds
+        stat['max'] = max(stat['max'], seconds)
+
+    def get(self, name):
+        """取得單項統計（含平均值），沒有記錄時回傳 None"""
+        stat = self._stats.get(name)
+        if stat is None:
+            return None
+        return dict(stat, mean=stat['total'] / stat['count'])
+
+    def last(self, name):
+        stat = self._stats.get(name)
+        return None if stat is None else stat['last']
+
+    def snapshot(self):
+        return {name: self.get(name) for name in list(self._stats)}
+
+    def reset(self):
+        self._stats.clear()
+
+
+counters = Counters()
+
+
+def timed(name):
+    """將函式每次執行的耗時記錄到 counters 的裝飾器"""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                counters.record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+class Measurement:
+    """量測一段程式的耗時與期間的記憶體峰值
+
+    以 with 區塊使用；期間由背景線程每隔 interval 秒取樣一次實體記憶體，
+    峰值為取樣到的最大值（很短的尖峰可能取樣不到）。
+    """
+    def __init__(self, name, interval=0.005):
+        self.name = name
+        self.interval = interval
+        self.seconds = None
+        self.rss_before = None
+        self.rss_after = None
+        self.rss_peak = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        self.rss_before = current_rss()
+        self.rss_peak = self.rss_before
+        if self.rss_before is not None:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._started
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.rss_after = current_rss()
+        if self.rss_after is not None:
+            self.rss_peak = max(self.rss_peak, self.rss_after)
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and rss > self.rss_peak:
+                self.rss_peak = rss
+
+    def as_dict(self, rows=None):
+        """轉換為可寫入 JSON 的結果，提供 rows 時一併計算每秒處理筆數"""
+        result = {
+            'seconds': self.seconds,
+            'rss_before': self.rss_before,
+            'rss_after': self.rss_after,
+            'rss_peak': self.rss_peak,
+        }
+        if rows is not None:
+            result['rows'] = rows
+            result['rows_per_second'] = rows / self.seconds if self.seconds else None
+        return result
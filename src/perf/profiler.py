@@ -0,0 +1,99 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+from contextlib import contextmanager
+from datetime import datetime
+
+from data.app_paths import app_data_dir
+
+# 文字摘要中列出的函式數
+SUMMARY_LINES = 40
+
+
+class ActionProfiler:
+    """逐項操作的 cProfile 效能分析
+
+    啟用後，每次執行標記過的操作（載入、設定起點、切換單圈、點擊）都以
+    cProfile 記錄，結束時在 directory 寫入「時間_操作.prof」與同名的
+    文字摘要（依累計時間排序）。同一時間只分析最外層的操作，
+    背景線程中的處理不會被記錄。
+    """
+    def __init__(self, directory=None):
+        self._directory = directory
+        self.active = False
+        self.written = []
+        # 每項操作結束前呼叫（例如立即執行排程的重繪，使分析包含渲染）
+        self.finish_callback = None
+        self._running = False
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            self._directory = app_data_dir('profiles')
+        return self._directory
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def toggle(self):
+        """切換啟用狀態，回傳切換後是否啟用"""
+        self.active = not self.active
+        return self.active
+
+    @contextmanager
+    def action(self, name):
+        """分析 with 區塊中的操作，未啟用或已在分析其他操作時直接執行"""
+        if not self.active or self._running:
+            yield
+            return
+        self._running = True
+        started = datetime.now()
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+            if self.finish_callback is not None:
+                self.finish_callback()
+        finally:
+            profile.disable()
+            self._running = False
+            self._write(profile, name, started)
+
+    def _write(self, profile, name, started):
+        base = os.path.join(self.directory, f"{started:%Y%m%d-%H%M%S-%f}_{name}")
+        try:
+            profile.dump_stats(base + '.prof')
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                f.write(summary.getvalue())
+            self.written.append(base + '.prof')
+            print(f"已寫入效能分析: {base}.prof")
+        except OSError as e:
+            print(f"寫入效能分析時出錯: {str(e)}")
+
+
+action_profiler = ActionProfiler()
+
+
+def profiled(name):
+    """以 action_profiler 分析整個函式的裝飾器
+
+    name 可為字串，或以函式的參數決定名稱的函式。包裝後的函式接受任意參數，
+    不可用於會多傳參數的 Qt 槽函式，這類函式請改用 action_profiler.action。
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not action_profiler.active:
+                return function(*args, **kwargs)
+            label = name(*args, **kwargs) if callable(name) else name
+            with action_profiler.action(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
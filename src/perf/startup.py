@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from perf import tracing
+from perf.metrics import counters
+
+# 設定此環境變數（任意非空值）時，窗口出現後輸出啟動時間報告
+REPORT_ENV = 'ROUTEMAP_STARTUP_REPORT'
+
+# 模組載入時即開始計時，盡量接近程式啟動的時間
+_STARTED = time.perf_counter()
+
+
+class StartupTimer:
+    """記錄啟動各階段的耗時與載入的模組數
+
+    每個階段同時記錄到 counters（名稱為「startup:階段」）與追蹤資料，
+    背景線程中的階段（例如預先載入 pandas）與主線程的階段重疊，
+    報告中分開列出。
+    """
+    def __init__(self, started=None):
+        self.started = _STARTED if started is None else started
+        self.phases = []
+        self.finished = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """以 with 區塊記錄一個啟動階段"""
+        background = threading.current_thread() is not threading.main_thread()
+        modules = len(sys.modules)
+        began = time.perf_counter()
+        with tracing.span(f'startup:{name}', 'startup'):
+            try:
+                yield
+            finally:
+                elapsed = time.perf_counter() - began
+                counters.record(f'startup:{name}', elapsed)
+                with self._lock:
+                    self.phases.append({
+                        'name': name,
+                        'offset': began - self.started,
+                        'seconds': elapsed,
+                        # 背景階段與主線程同時載入模組，數量僅供參考
+                        'modules': len(sys.modules) - modules,
+                        'background': background,
+                    })
+
+    def finish(self):
+        """標記窗口已顯示，回傳從啟動到此時的秒數"""
+        if self.finished is None:
+            self.finished = time.perf_counter() - self.started
+            counters.record('startup', self.finished)
+            tracing.instant('startup_finished', 'startup', seconds=self.finished)
+        return self.finished
+
+    def report(self):
+        """啟動時間報告的文字"""
+        lines = ["啟動時間報告"]
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p['offset'])
+        for phase in phases:
+            where = "（背景）" if phase['background'] else ""
+            lines.append(f"  {phase['name'] + where:<22}{phase['offset'] * 1000:>8.0f} ms 起"
+                         f"{phase['seconds'] * 1000:>8.0f} ms  {phase['modules']:>5} 個模組")
+        if self.finished is not None:
+            lines.append(f"  {'窗口顯示':<20}{self.finished * 1000:>8.0f} ms")
+        lines.append(f"  已載入模組 {len(sys.modules)} 個；"
+                     f"詳細的模組載入時間可用 python -X importtime main.py 取得")
+        return "\n".join(lines)
+
+
+startup_timer = StartupTimer()
+
+
+def report_requested():
+    return bool(os.environ.get(REPORT_ENV))
+
+
+def prefetch_modules(names, timer=startup_timer):
+    """在背景線程中預先載入模組，回傳線程
+
+    載入的工作大多受 GIL 限制，主要節省的是冷啟動時讀取檔案的等待；
+    主線程之後再 import 同一模組時會等背景線程載入完成。
+    """
+    def run():
+        for name in names:
+            try:
+                with timer.phase(name):
+                    __import__(name)
+            except Exception as e:
+                # 主線程 import 時會再次遇到並回報同樣的錯誤
+                print(f"預先載入 {name} 時出錯: {str(e)}")
+
+    thread = threading.Thread(target=run, name='module-prefetch', daemon=True)
+    thread.start()
+    return thread
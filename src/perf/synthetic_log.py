@@ -0,0 +1,109 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data.timestamps import DAY_MS, format_time_ms
+
+LOG_COLUMNS = ['Time', 'R Scale 1', 'R Scale 2', 'G Speed', 'SV',
+               'Longitude', 'Latitude', 'raw1', 'raw2', 'raw3', 'raw4']
+# 起點（範例記錄檔中的停車位置）與賽道的長短半軸（度）
+GATE = (120.6862869, 24.3187466)
+TRACK_RADIUS = (0.004, 0.0025)
+SAMPLE_INTERVAL_MS = 100
+# 每圈的筆數（約 90 秒）與開始前停在起點的筆數
+LAP_ROWS = 900
+IDLE_ROWS = 300
+START_TIME_MS = (14 * 3600 + 8 * 60 + 45) * 1000 + 856
+CHUNK_ROWS = 500000
+
+
+def _track_position(rows):
+    """第 rows 筆數據在環狀賽道上的經緯度，rows 為陣列"""
+    lap_position = np.clip(rows - IDLE_ROWS, 0, None) / LAP_ROWS
+    fraction = lap_position % 1.0
+    # 彎道減速：角度不等速前進，但仍單調遞增
+    angle = 2 * np.pi * fraction + 0.3 * np.sin(2 * np.pi * fraction)
+    x = GATE[0] - TRACK_RADIUS[0] + TRACK_RADIUS[0] * np.cos(angle)
+    y = GATE[1] + TRACK_RADIUS[1] * np.sin(angle)
+    return x, y, fraction
+
+
+def synthesize_rows(start, stop, seed=0):
+    """產生第 [start, stop) 筆的 RIMS 格式數據
+
+    同一個 seed 與起始位置產生的數據固定，分段產生的結果與一次產生相同
+    （只要每段的起始位置相同）。
+    """
+    rng = np.random.default_rng([seed, start])
+    rows = np.arange(start, stop)
+    count = len(rows)
+
+    # 時間間隔約 100 毫秒，加上不超過 ±20 毫秒的抖動，仍保持遞增
+    time_ms = START_TIME_MS + rows * SAMPLE_INTERVAL_MS + rng.integers(-20, 20, count)
+    x, y, fraction = _track_position(rows)
+    previous_x, previous_y, _ = _track_position(rows - 1)
+    # 以相鄰兩點的距離換算速度（km/h）
+    meters = np.hypot((x - previous_x) * 111320 * np.cos(np.radians(GATE[1])), (y - previous_y) * 110540)
+    speed = meters / (SAMPLE_INTERVAL_MS / 1000.0) * 3.6
+    moving = rows >= IDLE_ROWS
+    noise = rng.normal(0, 2e-6, (2, count)) * moving
+
+    scale1 = 75 + 15 * np.sin(2 * np.pi * fraction * 3) + rng.normal(0, 2, count)
+    scale2 = 52 + 10 * np.cos(2 * np.pi * fraction * 2) + rng.normal(0, 2, count)
+    return pd.DataFrame({
+        'Time': format_time_ms(time_ms % DAY_MS),
+        'R Scale 1': np.clip(np.round(scale1), 0, 100).astype(np.int64),
+        'R Scale 2': np.clip(np.round(scale2), 0, 100).astype(np.int64),
+        'G Speed': np.round(speed * moving + rng.normal(0, 1, count) * moving).clip(0).astype(np.int64),
+        'SV': rng.integers(10, 22, count),
+        'Longitude': np.round(x + noise[0], 7),
+        'Latitude': np.round(y + noise[1], 7),
+        'raw1': (2900000 + scale1 * 4000 + rng.normal(0, 20000, count)).astype(np.int64),
+        'raw2': np.zeros(count, dtype=np.int64),
+        'raw3': (1200000 + scale2 * 2000 + rng.normal(0, 20000, count)).astype(np.int64),
+        'raw4': np.zeros(count, dtype=np.int64),
+    }, columns=LOG_COLUMNS)
+
+
+def expected_laps(rows):
+    """rows 筆數據中以 start_index 為起點可偵測到的完整圈數"""
+    return max(0, (rows - 1 - IDLE_ROWS) // LAP_ROWS)
+
+
+def generate_log(path, rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """產生 rows 筆的 RIMS 格式 CSV 記錄檔，分段寫入不需整個放在記憶體中
+
+    數據為繞行環狀賽道，先在起點停留 IDLE_ROWS 筆，之後每 LAP_ROWS 筆一圈。
+    回傳記錄檔資訊，其中 start_index 為開始繞圈時位於起點的索引。
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', newline='') as f:
+        for start in range(0, rows, chunk_rows) or [0]:
+            chunk = synthesize_rows(start, min(start + chunk_rows, rows), seed)
+            chunk.to_csv(f, index=False, header=start == 0, float_format='%.7f', lineterminator='\r\n')
+    os.replace(tmp_path, path)
+    return {
+        'path': path,
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'seed': seed,
+        'start_index': IDLE_ROWS if rows > IDLE_ROWS else 0,
+        'expected_laps': expected_laps(rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產生 RIMS 格式的測試記錄檔")
+    parser.add_argument('path', help="輸出的 CSV 檔案")
+    parser.add_argument('--rows', type=int, default=100000, help="數據筆數")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    info = generate_log(args.path, args.rows, args.seed)
+    print(f"已產生 {info['rows']} 筆數據（{info['bytes'] / 1024 / 1024:.1f} MB），"
+          f"起點索引 {info['start_index']}，預計 {info['expected_laps']} 圈")
+
+
+if __name__ == "__main__":
+    main()
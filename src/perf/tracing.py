@@ -0,0 +1,171 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# 設定此環境變數為檔案路徑時，啟動即開始追蹤，結束時輸出到該檔案
+TRACE_ENV = 'ROUTEMAP_TRACE'
+# 最多保留的事件數，超過時捨棄最舊的事件
+MAX_EVENTS = 1000000
+
+_enabled = False
+_events = deque(maxlen=MAX_EVENTS)
+_thread_names = {}
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    """開始記錄追蹤事件"""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def clear():
+    _events.clear()
+    _thread_names.clear()
+
+
+def _now_us():
+    return time.perf_counter_ns() / 1000.0
+
+
+def _thread_id():
+    thread = threading.current_thread()
+    _thread_names.setdefault(thread.ident, thread.name)
+    return thread.ident
+
+
+class _NullSpan:
+    """停用追蹤時使用的空區段，不記錄任何資料"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.started = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = repr(exc)
+        _events.append({
+            'name': self.name,
+            'cat': self.category,
+            'ph': 'X',
+            'ts': self.started,
+            'dur': _now_us() - self.started,
+            'pid': os.getpid(),
+            'tid': _thread_id(),
+            'args': self.args,
+        })
+        return False
+
+    def set(self, **args):
+        """在區段結束前補上參數（例如處理的筆數）"""
+        self.args.update(args)
+
+
+def span(name, category='app', **args):
+    """以 with 區塊標記一段處理，停用時幾乎沒有額外成本
+
+        with tracing.span('analyze_ranges', 'compute', rows=len(data)) as s:
+            ...
+            s.set(laps=len(laps))
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def traced(name=None, category='app'):
+    """將整個函式標記為一個區段的裝飾器
+
+    包裝後的函式接受任意參數，不可用於會多傳參數的 Qt 槽函式
+    （例如連接到 clicked 的無參數方法），這類函式請改用 span。
+    """
+    def decorate(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(label, category, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instant(name, category='app', **args):
+    """記錄一個時間點事件（取代除錯用的 print）"""
+    if not _enabled:
+        return
+    _events.append({
+        'name': name,
+        'cat': category,
+        'ph': 'i',
+        's': 't',
+        'ts': _now_us(),
+        'pid': os.getpid(),
+        'tid': _thread_id(),
+        'args': args,
+    })
+
+
+def events():
+    """目前記錄的事件（複本）"""
+    return list(_events)
+
+
+def export_chrome_trace(path):
+    """輸出為 Chrome 追蹤格式（可在 chrome://tracing 或 Perfetto 開啟），回傳事件數"""
+    recorded = list(_events)
+    metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': ident, 'args': {'name': name}}
+                for ident, name in list(_thread_names.items())]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': metadata + recorded, 'displayTimeUnit': 'ms'}, f,
+                  ensure_ascii=False, default=str)
+    return len(recorded)
+
+
+def enable_from_environment():
+    """環境變數 ROUTEMAP_TRACE 指定了輸出檔案時開始追蹤，程式結束時輸出"""
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return False
+    enable()
+
+    def export():
+        try:
+            count = export_chrome_trace(path)
+            print(f"已輸出 {count} 個追蹤事件到 {path}")
+        except OSError as e:
+            print(f"輸出追蹤資料時出錯: {str(e)}")
+    atexit.register(export)
+    return True
@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from perf import tracing
+from perf.metrics import counters
+from perf.benchmark import DEFAULT_ROWS, FULL_ROWS, discard_log, make_report, prepare_log, prepare_qt, run_in_worker
+
+DEFAULT_REPEATS = 50
+# 切換單圈會重建整個圖表，次數較少
+SWITCH_LAP_REPEATS = 10
+PERCENTILES = (50, 95, 99)
+
+
+def _summarize(latencies, draws):
+    """整理一組延遲（秒）為毫秒的百分位數"""
+    ms = np.asarray(latencies) * 1000.0
+    summary = {'count': len(ms), 'draws': draws}
+    if len(ms):
+        summary.update({f'p{p}_ms': float(np.percentile(ms, p)) for p in PERCENTILES})
+        summary.update(mean_ms=float(ms.mean()), max_ms=float(ms.max()))
+    return summary
+
+
+class _InteractionDriver:
+    """對離屏的 MapViewer 送出滑鼠事件，量測到畫面重繪完成的時間"""
+    def __init__(self, app, viewer):
+        self.app = app
+        self.viewer = viewer
+        self.scheduler = viewer.redraw_scheduler
+        self.results = {}
+
+    def settle(self):
+        """處理事件直到排程的重繪全部完成"""
+        for _ in range(1000):
+            self.app.processEvents()
+            if not self.scheduler.is_pending():
+                break
+        else:
+            self.scheduler.flush()
+        # 讓畫布完成重繪後的繪製事件
+        self.app.processEvents()
+
+    def measure(self, name, actions):
+        """依序執行 actions 中的每個動作，記錄各自從送出到重繪完成的時間"""
+        self.settle()
+        latencies = []
+        draws = self.scheduler.draw_count
+        for action in actions:
+            started = time.perf_counter()
+            action()
+            self.settle()
+            latencies.append(time.perf_counter() - started)
+        self.results[name] = _summarize(latencies, self.scheduler.draw_count - draws)
+
+    @staticmethod
+    def _dispatch(canvas, ax, name, xdata, ydata, **kwargs):
+        from matplotlib.backend_bases import MouseEvent
+        x, y = ax.transData.transform((xdata, ydata))
+        event = MouseEvent(name, canvas, x, y, **kwargs)
+        canvas.callbacks.process(name, event)
+
+    def click(self, canvas, ax, xdata, ydata):
+        return lambda: self._dispatch(canvas, ax, 'button_press_event', xdata, ydata, button=1)
+
+    def scroll(self, canvas, ax, xdata, ydata, button):
+        return lambda: self._dispatch(canvas, ax, 'scroll_event', xdata, ydata, button=button, step=1)
+
+
+def _main_plot_actions(driver, rng, repeats):
+    """在主圖表上隨機點擊，以及以滑鼠位置為中心先放大再縮小"""
+    viewer = driver.viewer
+    ax = viewer.plot_manager.axes['speed']
+    x_min, x_max = ax.get_xlim()
+    y_center = sum(ax.get_ylim()) / 2
+    clicks = [driver.click(viewer.canvas, ax, x, y_center) for x in rng.uniform(x_min, x_max, repeats)]
+    x_center = rng.uniform(x_min, x_max)
+    half = repeats // 2
+    scrolls = [driver.scroll(viewer.canvas, ax, x_center, y_center, 'up' if i < half else 'down')
+               for i in range(repeats)]
+    return clicks, scrolls
+
+
+def run_size(log_info, cache_root, repeats=DEFAULT_REPEATS, verbose=False, trace_path=None):
+    """在單一記錄檔上以腳本操作 MapViewer，回傳各操作的延遲統計
+
+    於獨立的工作程序中執行；應用程式資料目錄改到 cache_root，
+    不影響使用者的快取與起點設定。指定 trace_path 時輸出追蹤資料。
+    """
+    app = prepare_qt('Qt5Agg')
+    from data import app_paths
+    app_paths.APP_DATA_DIR = cache_root
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtWidgets import QMessageBox
+    from ui.map_viewer import MapViewer
+
+    # 訊息框會等待使用者操作，改為記錄訊息內容
+    messages = []
+
+    def record_message(parent, title, text, *args, **kwargs):
+        messages.append(f"{title}: {text}")
+        return QMessageBox.Ok
+    for name in ('information', 'warning', 'critical'):
+        setattr(QMessageBox, name, staticmethod(record_message))
+
+    if trace_path:
+        tracing.enable()
+    rng = np.random.default_rng(0)
+    output = sys.stdout if verbose else open(os.devnull, 'w', encoding='utf-8')
+    try:
+        with redirect_stdout(output):
+            viewer = MapViewer()
+            viewer.resize(1600, 1000)
+            viewer.show()
+            driver = _InteractionDriver(app, viewer)
+
+            started = time.perf_counter()
+            viewer.load_files([log_info['path']])
+            # 量測完整載入的工作階段：等待其餘欄位在背景載入完成
+            if viewer.column_loader is not None:
+                loaded = []
+                viewer.request_columns(viewer.column_loader.pending_columns(), loaded.append)
+                while not loaded:
+                    app.processEvents()
+                    time.sleep(0.001)
+            driver.settle()
+            load_seconds = time.perf_counter() - started
+
+            # 總覽模式：點擊軌跡圖、主圖表與縮放
+            data = viewer.full_data
+            picks = rng.integers(0, len(data), repeats)
+            x_values = data['Longitude'].to_numpy(dtype=float)[picks] + 1e-5
+            y_values = data['Latitude'].to_numpy(dtype=float)[picks] - 1e-5
+            driver.measure('track_click', [driver.click(viewer.track_canvas, viewer.track_ax, x, y)
+                                           for x, y in zip(x_values, y_values)])
+            clicks, scrolls = _main_plot_actions(driver, rng, repeats)
+            driver.measure('plot_click', clicks)
+            driver.measure('scroll', scrolls)
+
+            # 設定起點並分析單圈
+            start_index = log_info['start_index']
+            driver.measure('set_start_point', [lambda: viewer.plot_manager.set_start_point(
+                start_index, viewer.track_ax, viewer.track_canvas)])
+
+            # 勾選/取消勾選Run，結束時只勾選前兩個
+            lap_count = viewer.check_list.count()
+            if lap_count:
+                def toggle(row):
+                    item = viewer.check_list.item(row)
+                    item.setCheckState(Qt.Unchecked if item.checkState() == Qt.Checked else Qt.Checked)
+                rows = [i % min(lap_count, 10) for i in range(repeats)]
+                driver.measure('item_changed', [lambda row=row: toggle(row) for row in rows])
+                for row in range(lap_count):
+                    wanted = Qt.Checked if row < 2 else Qt.Unchecked
+                    if viewer.check_list.item(row).checkState() != wanted:
+                        viewer.check_list.item(row).setCheckState(wanted)
+
+                driver.measure('switch_lap', [viewer.switch_lap] * min(repeats, SWITCH_LAP_REPEATS))
+
+                # 單圈模式的點擊與縮放
+                clicks, scrolls = _main_plot_actions(driver, rng, repeats)
+                driver.measure('plot_click_runs', clicks)
+                driver.measure('scroll_runs', scrolls)
+
+            viewer.close()
+            driver.settle()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if trace_path:
+        tracing.export_chrome_trace(trace_path)
+
+    return {
+        'rows': log_info['rows'],
+        'file_bytes': log_info['bytes'],
+        'load_seconds': load_seconds,
+        'laps': lap_count,
+        'interactions': driver.results,
+        # 與效能監看面板相同的耗時記錄（重繪、單圈分析、最近點查詢）
+        'counters': counters.snapshot(),
+        'messages': messages,
+    }
+
+
+def run_latency_benchmarks(row_counts, work_dir, repeats=DEFAULT_REPEATS, keep_logs=True, verbose=False,
+                           trace_dir=None):
+    """依序對每個數據量量測互動延遲，回傳可寫成 JSON 的結果
+
+    指定 trace_dir 時，每個數據量的追蹤資料另存為 Chrome 追蹤格式。
+    """
+    results = []
+    for rows in row_counts:
+        log_info = prepare_log(rows, work_dir)
+        print(f"量測 {rows} 筆的互動延遲...")
+        trace_path = os.path.join(trace_dir, f'ui_latency_{rows}.trace.json') if trace_dir else None
+        results.append(run_in_worker(run_size, log_info, work_dir, repeats, verbose, trace_path))
+        _print_result(results[-1])
+        if not keep_logs:
+            discard_log(log_info)
+    return make_report(results)
+
+
+def _print_result(result):
+    print(f"  {result['rows']} 筆，載入 {result['load_seconds']:.1f} 秒，{result['laps']} 圈")
+    for name, summary in result['interactions'].items():
+        if not summary['count']:
+            continue
+        print(f"    {name:<18}" + "".join(f"{f'p{p}':>6}{summary[f'p{p}_ms']:>9.1f} ms" for p in PERCENTILES)
+              + f"  (n={summary['count']}, 重繪 {summary['draws']} 次)")
+    for message in result['messages']:
+        print(f"    訊息 {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以離屏的 MapViewer 量測點擊、勾選、切換單圈與縮放的延遲")
+    parser.add_argument('--rows', type=int, nargs='+', default=None,
+                        help=f"數據筆數，預設 {DEFAULT_ROWS}")
+    parser.add_argument('--full', action='store_true', help=f"使用完整的數據量 {FULL_ROWS}")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="每種操作的次數")
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'routemap-benchmark'),
+                        help="存放產生的記錄檔與快取的目錄")
+    parser.add_argument('--output', default='ui_latency_results.json', help="結果的 JSON 檔案")
+    parser.add_argument('--discard-logs', action='store_true', help="量測後刪除產生的記錄檔")
+    parser.add_argument('--verbose', action='store_true', help="顯示被量測程式的輸出")
+    parser.add_argument('--trace-dir', default=None, help="輸出 Chrome 追蹤格式資料的目錄")
+    args = parser.parse_args()
+
+    row_counts = args.rows or (FULL_ROWS if args.full else DEFAULT_ROWS)
+    os.makedirs(args.work_dir, exist_ok=True)
+    if args.trace_dir:
+        os.makedirs(args.trace_dir, exist_ok=True)
+    report = run_latency_benchmarks(row_counts, args.work_dir, args.repeats, keep_logs=not args.discard_logs,
+                                    verbose=args.verbose, trace_dir=args.trace_dir)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
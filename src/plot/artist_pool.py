@@ -0,0 +1,108 @@
+from matplotlib.lines import Line2D
+
+
+class ArtistPool:
+    """數值標籤與游標的 artist 池
+
+    標籤與游標只建立一次，之後以 set_text / set_position / set_data
+    原地更新並以可見性切換，避免點擊時反覆建立文字造成版面計算開銷。
+    """
+    def __init__(self):
+        self._labels = {}   # (ax, group, key) -> Text
+        self._cursors = {}  # ax -> {'vline', 'hline', 'point'}
+
+    @staticmethod
+    def _alive(artist, ax):
+        """檢查 artist 是否仍屬於該軸（軸被清除後需重新建立）"""
+        return artist is not None and artist.axes is ax
+
+    def reset(self, axes=None):
+        """忘記指定軸（預設全部）的池化 artist，於圖表清除前呼叫"""
+        if axes is None:
+            self._labels = {}
+            self._cursors = {}
+            return
+        axes = set(axes)
+        self._labels = {k: v for k, v in self._labels.items() if k[0] not in axes}
+        self._cursors = {k: v for k, v in self._cursors.items() if k not in axes}
+
+    def label(self, ax, group, key, **text_kwargs):
+        """取得（必要時建立）標籤，樣式只在建立時套用"""
+        text = self._labels.get((ax, group, key))
+        if not self._alive(text, ax):
+            text = ax.text(0, 0, '', **text_kwargs)
+            text.set_visible(False)
+            self._labels[(ax, group, key)] = text
+        return text
+
+    def preallocate_labels(self, ax, group, keys, **text_kwargs):
+        """預先建立一組隱藏的標籤"""
+        for key in keys:
+            self.label(ax, group, key, **text_kwargs)
+
+    def show_label(self, ax, group, key, text, position, **text_kwargs):
+        """原地更新標籤內容與位置並顯示"""
+        label = self.label(ax, group, key, **text_kwargs)
+        if label.get_text() != text:
+            label.set_text(text)
+        label.set_position(position)
+        if not label.get_visible():
+            label.set_visible(True)
+        return label
+
+    def hide_labels(self, axes=None, groups=None, keep=()):
+        """隱藏標籤，可依軸與群組篩選，keep 中的 (ax, group, key) 保持顯示"""
+        axes = set(axes) if axes is not None else None
+        for (ax, group, key), label in self._labels.items():
+            if axes is not None and ax not in axes:
+                continue
+            if groups is not None and group not in groups:
+                continue
+            if (ax, group, key) in keep:
+                continue
+            if label.get_visible():
+                label.set_visible(False)
+
+    def cursor(self, ax, color='red'):
+        """取得（必要時建立）軸上的游標：垂直線、水平線與標記點"""
+        cursor = self._cursors.get(ax)
+        if cursor is not None and self._alive(cursor['vline'], ax):
+            return cursor
+
+        # 直接加入 artist 而不經 axvline/plot，避免影響軸的自動範圍
+        vline = Line2D([0, 0], [0, 1], transform=ax.get_xaxis_transform(),
+                       color=color, linestyle='--', alpha=0.5)
+        hline = Line2D([0, 1], [0, 0], transform=ax.get_yaxis_transform(),
+                       color=color, linestyle='--', alpha=0.5)
+        point = Line2D([0], [0], marker='o', linestyle='none',
+                       color=color, markersize=10, zorder=5)
+        cursor = {'vline': vline, 'hline': hline, 'point': point}
+        for artist in cursor.values():
+            artist.set_visible(False)
+            ax.add_artist(artist)
+        self._cursors[ax] = cursor
+        return cursor
+
+    def show_cursor(self, ax, x, y=None, vline=True, crosshair=False):
+        """移動游標到指定位置；y 為 None 時只顯示垂直線"""
+        cursor = self.cursor(ax)
+        cursor['vline'].set_xdata([x, x])
+        cursor['vline'].set_visible(vline)
+        if y is None:
+            cursor['point'].set_visible(False)
+            cursor['hline'].set_visible(False)
+            return cursor
+        cursor['point'].set_data([x], [y])
+        cursor['point'].set_visible(True)
+        cursor['hline'].set_ydata([y, y])
+        cursor['hline'].set_visible(crosshair)
+        return cursor
+
+    def hide_cursors(self, axes=None):
+        """隱藏游標，預設隱藏全部"""
+        for ax, cursor in self._cursors.items():
+            if axes is not None and ax not in axes:
+                continue
+            for artist in cursor.values():
+                if artist.get_visible():
+                    artist.set_visible(False)
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class DecimatedLine:
+    """以區間最小/最大值索引繪製長時間記錄的曲線
+
+    依目前X軸範圍挑選區塊大小，每個區塊只畫最小值與最大值兩點，
+    可見筆數不超過 max_points 時改畫原始數據。數據可為 np.memmap，
+    每次更新只讀取可見範圍或索引中的區塊統計。
+    """
+    def __init__(self, ax, values, range_index, max_points=4000, **line_kwargs):
+        self.ax = ax
+        self.max_points = max_points
+        self.raw_vertex_count = 0
+        self.drawn_vertex_count = 0
+        self.line, = ax.plot([], [], **line_kwargs)
+        self.set_values(values, range_index)
+        self._cid = ax.callbacks.connect('xlim_changed', self._on_view_changed)
+
+    def set_values(self, values, range_index):
+        """更換數據（例如追蹤檔案新增數據後），並更新數據範圍與顯示"""
+        self.values = values
+        self.range_index = range_index
+        if len(values):
+            y_min, y_max = range_index.query(0, len(values) - 1)
+            if np.isfinite(y_min) and np.isfinite(y_max):
+                self.ax.update_datalim([(0, y_min), (len(values) - 1, y_max)])
+        self.update_view()
+
+    def disconnect(self):
+        self.ax.callbacks.disconnect(self._cid)
+
+    def _on_view_changed(self, ax):
+        self.update_view()
+
+    def update_view(self):
+        """依目前X軸範圍更新折線資料"""
+        if self.line.axes is None:
+            self.disconnect()
+            return
+
+        n = len(self.values)
+        self.raw_vertex_count = n
+        x_min, x_max = sorted(self.ax.get_xlim())
+        if not n or not (np.isfinite(x_min) and np.isfinite(x_max)):
+            self.line.set_data([], [])
+            self.drawn_vertex_count = 0
+            return
+        start = int(np.clip(np.floor(x_min), 0, n - 1))
+        end = int(np.clip(np.ceil(x_max), 0, n - 1))
+
+        if end - start + 1 <= self.max_points:
+            x = np.arange(start, end + 1)
+            y = np.asarray(self.values[start:end + 1], dtype=float)
+        else:
+            x, y = self._envelope(start, end)
+        self.line.set_data(x, y)
+        self.drawn_vertex_count = len(x)
+
+    def _envelope(self, start, end):
+        """以稀疏表的層級組成每個區塊的最小/最大值折線"""
+        index = self.range_index
+        # 每個區塊包含 2^level 個索引區塊，使區塊數不超過 max_points / 2
+        blocks_per_bucket = (end - start + 1) / (self.max_points / 2) / index.block_size
+        level = int(np.ceil(np.log2(max(blocks_per_bucket, 1.0))))
+        level = min(level, len(index.min_table) - 1)
+        bucket = index.block_size << level
+
+        numbers = np.arange(start // bucket, end // bucket + 1)
+        first_blocks = numbers << level
+        lows = np.full(len(numbers), np.nan)
+        highs = np.full(len(numbers), np.nan)
+        # 尾端不足 2^level 個索引區塊的部分另行查詢
+        complete = first_blocks < len(index.min_table[level])
+        lows[complete] = index.min_table[level][first_blocks[complete]]
+        highs[complete] = index.max_table[level][first_blocks[complete]]
+        for position in np.flatnonzero(~complete):
+            lows[position], highs[position] = index.query(numbers[position] * bucket,
+                                                          (numbers[position] + 1) * bucket - 1)
+
+        x = np.repeat(numbers * bucket + bucket / 2, 2)
+        y = np.column_stack([lows, highs]).ravel()
+        return x, y
@@ -0,0 +1,121 @@
+import json
+import os
+
+import matplotlib
+
+from data.app_paths import app_data_path
+
+# 依偏好順序排列的中文字體（Windows、macOS、Linux 常見字體）
+CJK_FONT_CANDIDATES = [
+    'Microsoft JhengHei', 'Microsoft YaHei', 'PingFang TC', 'Heiti TC',
+    'Noto Sans CJK TC', 'Noto Sans TC', 'Source Han Sans TC',
+    'WenQuanYi Zen Hei', 'SimHei', 'Arial Unicode MS',
+]
+# 用來確認字體確實含有中文字形的字元（圖表標題與數值框中會出現）
+CJK_SAMPLE = '圈速軌跡'
+# matplotlib 內附的字體，找不到中文字體時仍可顯示數字與英文
+FALLBACK_FONT = 'DejaVu Sans'
+CACHE_FILE = 'fonts.json'
+
+# 尚未解析時為 None；解析後為字體名稱，找不到時為空字串
+_resolved = None
+_configured = False
+
+
+def _cache_path():
+    return app_data_path(CACHE_FILE)
+
+
+def _covers_cjk(path):
+    """字體檔是否含有 CJK_SAMPLE 的所有字形"""
+    from matplotlib.ft2font import FT2Font
+    try:
+        charmap = FT2Font(path).get_charmap()
+    except (OSError, RuntimeError, ValueError):
+        return False
+    return all(ord(char) in charmap for char in CJK_SAMPLE)
+
+
+def _load_cached(font_count):
+    """讀取上次解析的結果
+
+    matplotlib 版本或已安裝的字體數不同、或字體檔已不存在時回傳 None，重新解析。
+    """
+    try:
+        with open(_cache_path(), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('matplotlib') != matplotlib.__version__ or cached.get('fonts') != font_count:
+        return None
+    path = cached.get('path')
+    if path and not os.path.exists(path):
+        return None
+    return cached.get('family') or ''
+
+
+def _save(family, path, font_count):
+    try:
+        with open(_cache_path(), 'w', encoding='utf-8') as f:
+            json.dump({'family': family, 'path': path, 'fonts': font_count,
+                       'matplotlib': matplotlib.__version__}, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"儲存字體設定時出錯: {str(e)}")
+
+
+def _find_cjk_font(fonts):
+    """先依 CJK_FONT_CANDIDATES 的順序，再依名稱檢查其他已安裝字體，回傳 (名稱, 路徑)
+
+    matplotlib 內附的字體沒有中文字形（其中 Last Resort 對所有字元都只有替代方框），不列入。
+    """
+    bundled = os.path.normcase(os.path.abspath(matplotlib.get_data_path()))
+    by_name = {}
+    for font in fonts:
+        if os.path.normcase(os.path.abspath(font.fname)).startswith(bundled):
+            continue
+        by_name.setdefault(font.name, font.fname)
+    others = sorted(name for name in by_name if name not in CJK_FONT_CANDIDATES)
+    for name in [name for name in CJK_FONT_CANDIDATES if name in by_name] + others:
+        if _covers_cjk(by_name[name]):
+            return name, by_name[name]
+    return '', None
+
+
+def resolve_cjk_font():
+    """已安裝且含中文字形的字體名稱，找不到時回傳空字串
+
+    檢查字形需要開啟字體檔，結果保留在記憶體中並寫入應用程式資料目錄，
+    之後啟動只在字體有變動時才重新檢查。
+    """
+    global _resolved
+    if _resolved is not None:
+        return _resolved
+    from matplotlib import font_manager
+    fonts = font_manager.fontManager.ttflist
+    cached = _load_cached(len(fonts))
+    if cached is not None:
+        _resolved = cached
+        return _resolved
+
+    family, path = _find_cjk_font(fonts)
+    if not family:
+        print("找不到含中文字形的字體，圖表中的中文可能無法顯示")
+    _save(family, path, len(fonts))
+    _resolved = family
+    return _resolved
+
+
+def configure_matplotlib_fonts():
+    """將 matplotlib 的無襯線字體設為解析到的中文字體，回傳字體名稱
+
+    只在第一次呼叫時設定 rcParams，字體清單中只有實際存在的字體，
+    繪製文字時不會再逐一搜尋不存在的字體。
+    """
+    global _configured
+    family = resolve_cjk_font()
+    if not _configured:
+        matplotlib.rcParams['font.family'] = 'sans-serif'
+        matplotlib.rcParams['font.sans-serif'] = ([family] if family else []) + [FALLBACK_FONT]
+        matplotlib.rcParams['axes.unicode_minus'] = False
+        _configured = True
+    return family
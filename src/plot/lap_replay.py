@@ -0,0 +1,174 @@
+import time
+from collections import deque
+
+import numpy as np
+from matplotlib.lines import Line2D
+from PyQt5.QtCore import QObject, QTimer
+
+from data.timestamps import parse_time_ms
+
+
+class LapReplay(QObject):
+    """單圈回放
+
+    依解析後的時間戳以 QTimer 推進播放位置，在軌跡圖上移動標記點，
+    並同步主圖表各軸的游標。只以 blit 重繪移動中的 artist，
+    背景在畫布完整重繪時重新擷取。
+    """
+    FRAME_INTERVAL_MS = 16  # 約 60 fps
+
+    def __init__(self, data, start_index, end_index, track_ax, main_axes,
+                 x_offset=0, speed=1.0, finished_callback=None,
+                 redraw_scheduler=None, parent=None):
+        super().__init__(parent)
+        self.redraw_scheduler = redraw_scheduler
+        self.track_ax = track_ax
+        self.main_axes = [ax for ax in main_axes if ax is not None]
+        self.x_offset = x_offset
+        self.speed = float(speed)
+        self.finished_callback = finished_callback
+
+        x_col = 'X' if 'X' in data.columns else 'Longitude'
+        y_col = 'Y' if 'Y' in data.columns else 'Latitude'
+        rows = slice(start_index, end_index + 1)
+        self.start_index = start_index
+        self.x_data = data[x_col].to_numpy(dtype=float)[rows]
+        self.y_data = data[y_col].to_numpy(dtype=float)[rows]
+
+        # 以單圈起點為 0 的毫秒時間軸，缺值沿用前一筆以保持單調
+        times = parse_time_ms(data['Time'].iloc[rows])
+        if len(times) and np.isfinite(times).any():
+            times = np.where(np.isfinite(times), times, -np.inf)
+            times = np.maximum.accumulate(times)
+            times[~np.isfinite(times)] = times[np.isfinite(times)][0]
+            self.times_ms = times - times[0]
+        else:
+            # 沒有時間資料時假設 10 Hz
+            self.times_ms = np.arange(len(self.x_data)) * 100.0
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.FRAME_INTERVAL_MS)
+        self._timer.timeout.connect(self._on_frame)
+
+        self.position = 0            # 目前播放到的列（相對於單圈起點）
+        self._replay_ms = 0.0        # 目前播放時間
+        self._last_tick = None
+        self.frame_times = deque(maxlen=120)  # 最近幾幀完成的時間點（秒）
+
+        self._artists = {}           # canvas -> [artist]
+        self._backgrounds = {}       # canvas -> 擷取的背景
+        self._draw_cids = {}         # canvas -> draw_event 連接 id
+        self._create_artists()
+
+    def _create_artists(self):
+        """建立 animated 的標記點與游標（不參與一般重繪）"""
+        marker = Line2D([self.x_data[0]], [self.y_data[0]], marker='o', linestyle='none',
+                        color='orange', markeredgecolor='black', markersize=12,
+                        zorder=10, animated=True)
+        self.track_ax.add_artist(marker)
+        self.marker = marker
+        self._artists.setdefault(self.track_ax.figure.canvas, []).append(marker)
+
+        self.cursors = []
+        x = self.start_index + self.x_offset
+        for ax in self.main_axes:
+            cursor = Line2D([x, x], [0, 1], transform=ax.get_xaxis_transform(),
+                            color='orange', linewidth=1.5, zorder=10, animated=True)
+            ax.add_artist(cursor)
+            self.cursors.append(cursor)
+            self._artists.setdefault(ax.figure.canvas, []).append(cursor)
+
+    @property
+    def is_running(self):
+        """是否正在回放"""
+        return self._timer.isActive()
+
+    @property
+    def fps(self):
+        """以最近的幀間隔估算的實際幀率"""
+        if len(self.frame_times) < 2:
+            return 0.0
+        return (len(self.frame_times) - 1) / max(self.frame_times[-1] - self.frame_times[0], 1e-9)
+
+    def set_speed(self, speed):
+        """設定播放倍速（1 為實際速度）"""
+        self.speed = max(float(speed), 0.1)
+
+    def start(self):
+        """開始回放"""
+        if len(self.x_data) == 0:
+            return
+        for canvas in self._artists:
+            if canvas not in self._draw_cids:
+                self._draw_cids[canvas] = canvas.mpl_connect('draw_event', self._on_draw)
+            # 完整重繪一次以擷取不含移動 artist 的背景
+            canvas.draw()
+        self._last_tick = time.perf_counter()
+        self._timer.start()
+
+    def pause(self):
+        """暫停回放"""
+        self._timer.stop()
+
+    def stop(self):
+        """停止回放並移除移動中的 artist"""
+        self._timer.stop()
+        for canvas, cid in self._draw_cids.items():
+            canvas.mpl_disconnect(cid)
+        self._draw_cids = {}
+        self._backgrounds = {}
+        for canvas, artists in self._artists.items():
+            for artist in artists:
+                if artist.axes is not None:
+                    artist.remove()
+            if self.redraw_scheduler is not None:
+                self.redraw_scheduler.request(canvas)
+            else:
+                canvas.draw_idle()
+        self._artists = {}
+
+    def _on_draw(self, event):
+        """畫布完整重繪後重新擷取背景並畫上移動中的 artist"""
+        canvas = event.canvas
+        self._backgrounds[canvas] = canvas.copy_from_bbox(canvas.figure.bbox)
+        for artist in self._artists.get(canvas, []):
+            if artist.axes is not None:
+                artist.axes.draw_artist(artist)
+
+    def _on_frame(self):
+        """定時器觸發：依經過時間推進播放位置"""
+        now = time.perf_counter()
+        self._replay_ms += (now - self._last_tick) * 1000.0 * self.speed
+        self._last_tick = now
+
+        position = int(np.searchsorted(self.times_ms, self._replay_ms, side='right')) - 1
+        position = min(max(position, 0), len(self.times_ms) - 1)
+        if position != self.position:
+            self.seek(position)
+
+        if self._replay_ms >= self.times_ms[-1]:
+            self.stop()
+            if self.finished_callback:
+                self.finished_callback()
+
+    def seek(self, position):
+        """移動到單圈中的指定列並以 blit 更新畫面"""
+        self.position = position
+        self.marker.set_data([self.x_data[position]], [self.y_data[position]])
+        x = self.start_index + position + self.x_offset
+        for cursor in self.cursors:
+            cursor.set_xdata([x, x])
+        self._blit()
+
+    def _blit(self):
+        """還原背景、畫上移動中的 artist 並只更新該區域"""
+        for canvas, artists in self._artists.items():
+            background = self._backgrounds.get(canvas)
+            if background is None:
+                continue
+            canvas.restore_region(background)
+            for artist in artists:
+                if artist.axes is not None:
+                    artist.axes.draw_artist(artist)
+            canvas.blit(canvas.figure.bbox)
+        self.frame_times.append(time.perf_counter())
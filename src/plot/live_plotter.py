@@ -0,0 +1,139 @@
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer
+
+
+class LivePlotter(QObject):
+    """即時資料繪圖器
+
+    圖表只在開始時建立一次，之後以固定頻率從環形緩衝區讀取最新資料，
+    透過 set_data 原地更新曲線與軌跡，不必重新執行 create_plots。
+    X軸為自開始接收以來的數據點序號，主圖表顯示最近 window 筆資料。
+    """
+    def __init__(self, plot_manager, track_ax, ring_buffer, refresh_hz=10,
+                 window=3000, max_track_points=20000, parent=None):
+        super().__init__(parent)
+        self.plot_manager = plot_manager
+        self.track_ax = track_ax
+        self.ring_buffer = ring_buffer
+        self.window = int(window)
+        self.max_track_points = int(max_track_points)
+        self.lines = {}
+        self.track_line = None
+        self.head_marker = None
+        self.start_marker = None
+        self._last_sequence = -1
+        self.refresh_count = 0
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(int(1000 / refresh_hz), 1))
+        self._timer.timeout.connect(self.refresh)
+
+    def setup(self):
+        """建立即時模式的圖表（只執行一次）"""
+        pm = self.plot_manager
+        pm.clear_start_point()
+        pm._reset_pooled_artists()
+        pm.figure.clear()
+        gs = pm.figure.add_gridspec(3, 1, height_ratios=[1, 1, 1], hspace=0)
+        speed_ax = pm.figure.add_subplot(gs[0, 0])
+        pm.axes = {
+            'speed': speed_ax,
+            'r_scale1': pm.figure.add_subplot(gs[1, 0], sharex=speed_ax),
+            'r_scale2': pm.figure.add_subplot(gs[2, 0], sharex=speed_ax),
+        }
+        # 即時模式沒有範圍索引，縮放時不自動貼合Y軸
+        pm._autoscale_segments = {}
+        pm.range_indexes = {}
+
+        self.lines = {}
+        for ax_name, ax in pm.axes.items():
+            column = pm.AXIS_COLUMNS[ax_name]
+            ax.set_title(column, fontsize=10, fontfamily='sans-serif', loc='left', pad=10,
+                         bbox=dict(facecolor='black', edgecolor='none', pad=3.0, alpha=1.0),
+                         color='white')
+            self.lines[ax_name], = ax.plot([], [], color=pm.colors[0])
+            ax.tick_params(axis='both', labelsize=8)
+            ax.grid(True, alpha=0.3)
+        pm.figure.tight_layout()
+
+        self.track_ax.clear()
+        self.track_line, = self.track_ax.plot([], [], color='b', linestyle='-', linewidth=1.5, zorder=1)
+        self.head_marker, = self.track_ax.plot([], [], 'ro', markersize=8, zorder=5)
+        self.start_marker, = self.track_ax.plot([], [], color='green', marker='|', markersize=20,
+                                                markeredgewidth=2, linestyle='none', zorder=4)
+        self.track_ax.set_title("即時軌跡", fontsize=8)
+        self.track_ax.set_xlabel('經度', fontsize=10)
+        self.track_ax.set_ylabel('緯度', fontsize=10)
+        self.track_ax.grid(True)
+        self.track_ax.set_aspect('equal', adjustable='datalim')
+
+        self._last_sequence = -1
+        pm.redraw_scheduler.request(pm.figure.canvas)
+        pm.redraw_scheduler.request(self.track_ax)
+
+    def set_start_marker(self, x, y):
+        """在即時軌跡上標示起點"""
+        self.start_marker.set_data([x], [y])
+        self.plot_manager.redraw_scheduler.request(self.track_ax)
+
+    def start(self):
+        """開始定時更新"""
+        self._timer.start()
+
+    def stop(self):
+        """停止定時更新"""
+        self._timer.stop()
+
+    @property
+    def is_running(self):
+        return self._timer.isActive()
+
+    @staticmethod
+    def _padded_limits(values):
+        """計算帶 10% 邊距的範圍，無有效資料時回傳 None"""
+        with np.errstate(invalid='ignore'):
+            lo, hi = np.nanmin(values), np.nanmax(values)
+        if not np.isfinite(lo) or not np.isfinite(hi):
+            return None
+        margin = (hi - lo) * 0.1 or 1.0
+        return lo - margin, hi + margin
+
+    def refresh(self):
+        """從緩衝區取出最新資料並更新圖表"""
+        buffer = self.ring_buffer
+        total = buffer.total_count
+        if total == self._last_sequence or total == 0:
+            return
+        self._last_sequence = total
+
+        pm = self.plot_manager
+        columns = buffer.snapshot(list(pm.AXIS_COLUMNS.values()) + ['Longitude', 'Latitude'])
+        count = len(columns['Longitude'])
+        first_sequence = total - count
+
+        # 主圖表只更新視窗內的資料
+        start = max(count - self.window, 0)
+        x = np.arange(first_sequence + start, total)
+        for ax_name, line in self.lines.items():
+            values = columns[pm.AXIS_COLUMNS[ax_name]][start:]
+            line.set_data(x, values)
+            limits = self._padded_limits(values)
+            if limits is not None:
+                pm.axes[ax_name].set_ylim(limits)
+        pm.axes['speed'].set_xlim(x[0], max(x[0] + self.window, x[-1]))
+
+        # 軌跡以固定步長抽樣，避免點數隨時間無限增加
+        lon = columns['Longitude']
+        lat = columns['Latitude']
+        step = max(count // self.max_track_points, 1)
+        self.track_line.set_data(lon[::step], lat[::step])
+        self.head_marker.set_data([lon[-1]], [lat[-1]])
+        xlim = self._padded_limits(lon)
+        ylim = self._padded_limits(lat)
+        if xlim is not None and ylim is not None:
+            self.track_ax.set_xlim(xlim)
+            self.track_ax.set_ylim(ylim)
+
+        self.refresh_count += 1
+        pm.redraw_scheduler.request(pm.figure.canvas)
+        pm.redraw_scheduler.request(self.track_ax)
@@ -1,25 +1,63 @@
 from matplotlib.figure import Figure
 import numpy as np
-import matplotlib.pyplot as plt
-import warnings
-import matplotlib as mpl
+from matplotlib.ticker import FormatStrFormatter, MaxNLocator
 import pandas as pd
 from PyQt5.QtWidgets import QApplication, QProgressDialog
 from PyQt5.QtCore import Qt
+from plot.redraw_scheduler import RedrawScheduler
+from plot.artist_pool import ArtistPool
+from plot.decimated_line import DecimatedLine
+from plot.fonts import configure_matplotlib_fonts
+from data.range_index import RangeMinMaxIndex, block_size_for, coarsen_blocks
+from data.lap_detector import LapDetector, laps_within_files
+from data.timestamps import parse_time_ms, time_to_datetime
+from data.derived_channels import DerivedChannels, channel_title
+from perf import tracing
+from perf.metrics import timed
+from perf.profiler import profiled
+
+# 池化標籤的樣式（只在建立時套用）
+RUN_VALUE_LABEL_STYLE = dict(
+    horizontalalignment='right',
+    verticalalignment='top',
+    fontsize=7,
+    zorder=float('inf'),
+    bbox=dict(facecolor='white',
+              edgecolor='black',
+              alpha=0.8,
+              pad=0.2,
+              boxstyle='round,pad=0.3'))
+POINT_VALUE_LABEL_STYLE = dict(
+    bbox=dict(facecolor='white', edgecolor='none', alpha=0.8),
+    verticalalignment='bottom',
+    horizontalalignment='right')
+INDEX_LABEL_STYLE = dict(
+    bbox=dict(facecolor='white', edgecolor='none', alpha=0.8),
+    verticalalignment='top',
+    horizontalalignment='left')
+HIGHLIGHT_VALUE_LABEL_STYLE = dict(
+    fontsize=9,
+    bbox=dict(facecolor='white', edgecolor='none', alpha=0.7))
 
 class PlotManager:
     """圖表管理器"""
-    def __init__(self, figure):
+    # 主圖表各軸對應的數據列
+    AXIS_COLUMNS = {
+        'speed': 'G Speed',
+        'r_scale1': 'R Scale 1',
+        'r_scale2': 'R Scale 2'
+    }
+    # 筆數達到此值時主圖表改以區塊最小/最大值繪製
+    DECIMATE_ROWS = 1000000
+
+    def __init__(self, figure, redraw_scheduler=None):
         """初始化圖表管理器"""
-        # 關閉所有 matplotlib 的警告
-        warnings.filterwarnings("ignore", category=UserWarning)
-        
-        # 設置全局字體配置
-        mpl.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
-        mpl.rcParams['axes.unicode_minus'] = False
-        mpl.rcParams['font.family'] = 'sans-serif'
+        # 設置全局字體配置（只在第一次時解析中文字體並設定）
+        configure_matplotlib_fonts()
         
         self.figure = figure
+        # 所有重繪都經由排程器合併，每次互動每個畫布只渲染一次
+        self.redraw_scheduler = redraw_scheduler or RedrawScheduler()
         self.data_list = []
         self.axes = {}
         self.cached_plots = {
@@ -43,16 +81,67 @@ class PlotManager:
         # 設定標記線的長度（1cm）
         self.marker_size_cm = 1.0
         self.info_text = None
-        self.crosshair_lines = []  # 儲存十字虛線
-        self.value_texts = []  # 儲存所有數值文字對象
-        self.track_point = None
+        # 游標與數值標籤由 artist 池管理，點擊時原地更新
+        self.artist_pool = ArtistPool()
         self.range_update_callback = None  # 添加新的回調屬性
         self.range_highlights = {}  # 存儲範圍高亮對象
+        # 各通道的範圍最小/最大值索引，以及各軸自動貼合Y軸所需的資料區段
+        self.range_indexes = {}
+        self._autoscale_segments = {}
+        # 快取中預先計算的區塊最小/最大值 {欄位: (最小值, 最大值, 區塊大小)}
+        self.block_stats = {}
+        # 很長的記錄在總覽圖中使用的抽樣曲線 {軸名稱: DecimatedLine}
+        self.decimated_lines = {}
+        # 總覽圖中各軸的數據曲線，追蹤檔案時原地延伸
+        self.data_lines = {}
+        # 最近一次分析使用的單圈偵測器，新增數據時接續偵測
+        self.lap_detector = None
+        # 合併多個檔案時各檔案在數據中的範圍
+        self.file_boundaries = []
+        # 三個基本子圖之外額外顯示的通道（欄位或衍生通道名稱），依序放在下方
+        self.extra_channels = []
+        # 衍生通道（加速度、變化率等）的計算快取
+        self.derived_channels = DerivedChannels()
+
+    @property
+    def axis_columns(self):
+        """各軸對應的數據列，包含額外顯示的通道（軸名稱即為通道名稱）"""
+        columns = dict(self.AXIS_COLUMNS)
+        columns.update((name, name) for name in self.extra_channels)
+        return columns
+
+    def set_extra_channels(self, names):
+        """設定額外顯示的通道，之後建立的圖表生效"""
+        self.extra_channels = [name for name in dict.fromkeys(names)
+                               if name not in self.AXIS_COLUMNS and name not in self.AXIS_COLUMNS.values()]
+
+    def set_smoothing(self, window_s):
+        """設定衍生通道的平滑視窗（秒），之後建立的圖表生效"""
+        self.derived_channels.smoothing_s = window_s
+
+    def _apply_channels(self, data):
+        """將額外通道中的衍生通道寫入數據"""
+        for name in self.derived_channels.apply(data, self.extra_channels):
+            # 數值可能已改變（例如平滑視窗），範圍索引需重建
+            self.range_indexes.pop((id(data), name), None)
 
+    def refresh_plots(self):
+        """以目前的數據與通道重新建立總覽圖，保留已設定的起點"""
+        saved = None
+        if self.has_start_point_set:
+            saved = (self.start_point, self.start_point_data, self.lap_detector)
+        # 圖表清除後原有的Run高亮已不存在，由呼叫端重新加入
+        self.range_highlights = {}
+        self.create_plots()
+        if saved is not None:
+            self.start_point, self.start_point_data, self.lap_detector = saved
+            self.has_start_point_set = True
+            self._draw_start_point_line()
+
+    @tracing.traced('create_plots', 'render')
     def create_plots(self, highlight_index=None, highlight_range=None):
         """創建圖表，支持高亮顯示"""
         try:
-            print("\n=== 開始創建圖表 ===")
             if not self.data_list:
                 print("錯誤: 沒有數據")
                 return
@@ -68,36 +157,41 @@ class PlotManager:
             
             # 暫存起點資訊
             temp_start_point_data = self.start_point_data if self.has_start_point_set else None
+            temp_lap_detector = self.lap_detector if self.has_start_point_set else None
             
             # 清除所有標記
             if self.info_text is not None:
                 self.info_text.remove()
                 self.info_text = None
             
-            for line in self.crosshair_lines:
-                line.remove()
-            self.crosshair_lines = []
-            
-            for text_obj in self.value_texts:
-                text_obj.remove()
-            self.value_texts = []
+            # 池化的游標與標籤隨圖表一併清除
+            self._reset_pooled_artists()
             
             # 清除圖表但保持起點資訊
             self.figure.clear()
             
-            # 修改為3行1列的布局，只包含速度和R Scale圖表
-            gs = self.figure.add_gridspec(3, 1, 
-                                        height_ratios=[1, 1, 1],  # 將整體間距設為0，後續手動調整
+            # 衍生通道寫入數據後即可如一般欄位繪製
+            for data in self.data_list:
+                self._apply_channels(data)
+            
+            # 速度和R Scale圖表，加上額外顯示的通道，每個通道一列
+            rows = 3 + len(self.extra_channels)
+            gs = self.figure.add_gridspec(rows, 1, 
+                                        height_ratios=[1] * rows,  # 將整體間距設為0，後續手動調整
                                         hspace=0)
             
-            # 調整圖表順序，將速度圖放在最上方
+            # 調整圖表順序，將速度圖放在最上方（三個子圖共用X軸）
+            speed_ax = self.figure.add_subplot(gs[0, 0])
             self.axes = {
-                'speed': self.figure.add_subplot(gs[0, 0]),     # 速度圖放在最上方
-                'r_scale1': self.figure.add_subplot(gs[1, 0]),  # R Scale 1 放在中間
-                'r_scale2': self.figure.add_subplot(gs[2, 0]),  # R Scale 2 放在最下方
+                'speed': speed_ax,     # 速度圖放在最上方
+                'r_scale1': self.figure.add_subplot(gs[1, 0], sharex=speed_ax),  # R Scale 1 放在中間
+                'r_scale2': self.figure.add_subplot(gs[2, 0], sharex=speed_ax),  # R Scale 2 放在第三列
             }
+            for row, name in enumerate(self.extra_channels, start=3):
+                self.axes[name] = self.figure.add_subplot(gs[row, 0], sharex=speed_ax)
             
             # 繪製每個圖表
+            self.decimated_lines = {}
             for ax_name, ax in self.axes.items():
                 if ax_name == 'speed':
                     self._plot_data(ax, 'G Speed', '')
@@ -105,6 +199,23 @@ class PlotManager:
                     self._plot_data(ax, 'R Scale 1', '')
                 elif ax_name == 'r_scale2':
                     self._plot_data(ax, 'R Scale 2', '')
+                else:
+                    self._plot_data(ax, self.axis_columns[ax_name], '')
+            self.data_lines = {ax_name: ax.get_lines()[0]
+                               for ax_name, ax in self.axes.items() if ax.get_lines()}
+            
+            # 預先配置每個軸的游標
+            for ax in self.axes.values():
+                self.artist_pool.cursor(ax)
+            
+            # 建立範圍索引，X軸縮放時自動貼合Y軸
+            self._autoscale_segments = {
+                ax_name: [(data, column, 0, 0, len(data) - 1)
+                          for data in self.data_list if column in data.columns]
+                for ax_name, column in self.axis_columns.items()
+            }
+            self._link_x_axes()
+            self._draw_file_boundaries()
             
             # 如果有高亮點，添加高亮顯示
             if highlight_index is not None and highlight_range is not None:
@@ -140,10 +251,10 @@ class PlotManager:
             if temp_start_point_data is not None:
                 self.start_point_data = temp_start_point_data
                 self.has_start_point_set = True
+                self.lap_detector = temp_lap_detector
                 self._draw_start_point_line()
             
-            self.figure.canvas.draw()
-            print("\n=== 圖表創建完成 ===")
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"創建圖表時出錯: {str(e)}")
@@ -168,7 +279,7 @@ class PlotManager:
                     elif column_name == 'R Scale 2':
                         plot_title = 'R Scale 2'
                     else:
-                        plot_title = column_name
+                        plot_title = channel_title(column_name)
                     
                     # 設置黑底白字的標題
                     ax.set_title(plot_title, 
@@ -184,9 +295,16 @@ class PlotManager:
                                ),
                                color='white')
                     
-                    ax.plot(data.index, data[column_name], 
-                           color=self.colors[i % len(self.colors)],
-                           label=f'數據集 {i+1}')
+                    if len(self.data_list) == 1 and len(data) >= self.DECIMATE_ROWS:
+                        # 很長的記錄只繪製可見範圍的區塊最小/最大值，縮放時再細化
+                        self.decimated_lines[self._axis_name(ax)] = DecimatedLine(
+                            ax, data[column_name].to_numpy(), self._range_index(data, column_name),
+                            color=self.colors[i % len(self.colors)],
+                            label=f'數據集 {i+1}')
+                    else:
+                        ax.plot(data.index, data[column_name], 
+                               color=self.colors[i % len(self.colors)],
+                               label=f'數據集 {i+1}')
                     
                     # 設置軸標籤字體
                     ax.tick_params(axis='both', labelsize=8)
@@ -296,10 +414,6 @@ class PlotManager:
             ax.set_xlim(x_min - x_margin, x_max + x_margin)
             ax.set_ylim(y_min - y_margin, y_max + y_margin)
             
-            # 初始化十字線列表
-            self.position_crosshair_lines = []
-            self.position_highlight_point = None
-            
             # 保存繪圖對象
             self.cached_plots['position'] = {
                 'line': line,
@@ -341,7 +455,7 @@ class PlotManager:
                         plot_cache['highlight_point'] = None
             
             # 強制更新畫布
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
         
         except Exception as e:
             print(f"移除舊的高亮顯示時出錯: {str(e)}")
@@ -369,7 +483,7 @@ class PlotManager:
             #         self.cached_plots[i]['highlight_point'] = point
             
             # 更新畫布
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
         
         except Exception as e:
             print(f"添加新的高亮顯示時出錯: {str(e)}")
@@ -400,11 +514,13 @@ class PlotManager:
         ax.set_ylabel('緯度', fontsize=9)
         ax.grid(True)
         ax.tick_params(axis='x', rotation=45, labelsize=8)
-        ax.xaxis.set_major_locator(plt.MaxNLocator(6))
-        ax.yaxis.set_major_locator(plt.MaxNLocator(8))
-        ax.xaxis.set_major_formatter(plt.FormatStrFormatter('%.4f'))
-        ax.yaxis.set_major_formatter(plt.FormatStrFormatter('%.4f'))
+        ax.xaxis.set_major_locator(MaxNLocator(6))
+        ax.yaxis.set_major_locator(MaxNLocator(8))
+        ax.xaxis.set_major_formatter(FormatStrFormatter('%.4f'))
+        ax.yaxis.set_major_formatter(FormatStrFormatter('%.4f'))
 
+    @tracing.traced('plot_click', 'ui')
+    @profiled('plot_click')
     def _on_plot_click(self, event):
         if event.inaxes is None:
             return
@@ -430,14 +546,6 @@ class PlotManager:
                 if clicked_run_info is not None:
                     relative_idx = clicked_run_info['relative_idx']
                     
-                    # 正確的方式清除舊的數值標籤
-                    for ax in self.axes.values():
-                        # 找出需要移除的文字對象
-                        texts_to_remove = [text for text in ax.texts if hasattr(text, 'is_value_label')]
-                        # 逐個移除文字對象
-                        for text in texts_to_remove:
-                            text.remove()
-                    
                     # 其餘代碼保持不變
                     run_count = len(self.range_highlights)
                     vertical_spacing = 0.15
@@ -458,41 +566,34 @@ class PlotManager:
                                 if text.label_type == 'speed':
                                     value = self.data_list[0]['G Speed'].iloc[original_idx]
                                     text.set_text(f'{label_name}\n{value:.1f} km/h')
-                                    print(f"[_on_plot_click] 更新速度標籤，value: {value}")
                                     updates.append((self.axes['speed'], range_id, value, vertical_position))
                                 elif text.label_type == 'r_scale1':
                                     value = self.data_list[0]['R Scale 1'].iloc[original_idx]
                                     text.set_text(f'{label_name}\n{value:.2f}')
-                                    print(f"[_on_plot_click] 更新R Scale 1標籤，value: {value}")
                                     updates.append((self.axes['r_scale1'], range_id, value, vertical_position))
                                 elif text.label_type == 'r_scale2':
                                     value = self.data_list[0]['R Scale 2'].iloc[original_idx]
                                     text.set_text(f'{label_name}\n{value:.2f}')
-                                    print(f"[_on_plot_click] 更新R Scale 2標籤，value: {value}")
                                     updates.append((self.axes['r_scale2'], range_id, value, vertical_position))
+                                elif text.label_type in self.extra_channels:
+                                    value = self.data_list[0][text.label_type].iloc[original_idx]
+                                    text.set_text(f'{label_name}\n{value:.2f}')
+                                    updates.append((self.axes[text.label_type], range_id, value, vertical_position))
                                 text.set_y(0.85)
                     
-                    # 批量添加新的數值標籤
+                    # 原地更新池中的數值標籤，本次沒有數值的Run標籤隱藏
+                    shown_labels = set()
                     for ax, range_id, value, vertical_position in updates:
                         if isinstance(ax, str):
                             ax = self.axes[ax]
-                        # 修改字體大小為7，並調整文字框的padding和間距
-                        value_text = ax.text(0.98, vertical_position,
-                                           f'Run {range_id}: {value:.2f}',
-                                           transform=ax.transAxes,
-                                           horizontalalignment='right',
-                                           verticalalignment='top',
-                                           fontsize=7,  # 縮小字體
-                                           zorder=float('inf'),
-                                           bbox=dict(facecolor='white',
-                                                   edgecolor='black',
-                                                   alpha=0.8,
-                                                   pad=0.2,  # 減小padding
-                                                   boxstyle='round,pad=0.3'))  # 減小文字框邊距
-                        value_text.is_value_label = True
-                        
-                        # 調整垂直間距，避免重疊
-                        vertical_spacing = 0.08  # 減小垂直間距
+                        self.artist_pool.show_label(
+                            ax, 'run_value', range_id,
+                            f'Run {range_id}: {value:.2f}',
+                            (0.98, vertical_position),
+                            transform=ax.transAxes,
+                            **RUN_VALUE_LABEL_STYLE)
+                        shown_labels.add((ax, 'run_value', range_id))
+                    self.artist_pool.hide_labels(groups=('run_value',), keep=shown_labels)
                     
                     # 一次性更新所有圖表
                     self._update_all_plots_with_reset_index(nearest_idx)
@@ -502,7 +603,7 @@ class PlotManager:
                         self.click_callback(nearest_idx)
                     
                     # 最後才重繪圖表
-                    self.figure.canvas.draw()
+                    self.redraw_scheduler.request(self.figure.canvas)
                 
             else:
                 # 使用原始數據的處理邏輯（保持不變）
@@ -521,12 +622,15 @@ class PlotManager:
                             elif text.label_type == 'r_scale2':
                                 value = self.data_list[0]['R Scale 2'].iloc[nearest_idx]
                                 text.set_text(f'Run {text.range_id}\n{value:.2f}')
+                            elif text.label_type in self.extra_channels:
+                                value = self.data_list[0][text.label_type].iloc[nearest_idx]
+                                text.set_text(f'Run {text.range_id}\n{value:.2f}')
                             text.set_y(0.85)
                     
                     if self.click_callback:
                         self.click_callback(nearest_idx)
                     
-                    self.figure.canvas.draw()
+                    self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"處理主圖表點擊回調時出錯: {str(e)}")
@@ -552,47 +656,15 @@ class PlotManager:
             # 更新主圖表上的標記
             for ax_name, ax in self.axes.items():
                 if ax_name != 'position':
-                    column_mapping = {
-                        'speed': 'G Speed',
-                        'r_scale1': 'R Scale 1',
-                        'r_scale2': 'R Scale 2'
-                    }
-                    
-                    col_name = column_mapping.get(ax_name)
+                    col_name = self.axis_columns.get(ax_name)
                     if col_name and col_name in data.columns:
                         value = data[col_name].iloc[index]
                         
-                        # 添加垂直線
-                        v_line = ax.axvline(x=index, color='red', linestyle='--', alpha=0.5)
-                        self.crosshair_lines.append(v_line)
-                        
-                        # 添加高亮點
-                        point = ax.scatter(index, value, color='red', s=100, zorder=5)
-                        self.crosshair_lines.append(point)
-                        
-                        # 添加數值標籤
-                        text = ax.text(
-                            index, value,
-                            f'',
-                            bbox=dict(facecolor='white', edgecolor='none', alpha=0.8),
-                            verticalalignment='bottom',
-                            horizontalalignment='right'
-                        )
-                        self.value_texts.append(text)
-                        print(f"[_update_main_plots_with_reset_index] 更新數值標籤，value: {value}")
-                        # 添加索引標籤
-                        index_text = ax.text(
-                            0.02, 0.95,
-                            f'',
-                            transform=ax.transAxes,
-                            bbox=dict(facecolor='white', edgecolor='none', alpha=0.8),
-                            verticalalignment='top',
-                            horizontalalignment='left'
-                        )
-                        self.value_texts.append(index_text)
+                        # 移動垂直線與高亮點
+                        self.artist_pool.show_cursor(ax, index, value)
             
             # 更新圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"更新主圖表時出錯: {str(e)}")
@@ -619,21 +691,16 @@ class PlotManager:
                     x = data[x_col].iloc[index]
                     y = data[y_col].iloc[index]
                     
-                    point = self.axes['position'].scatter(x, y, color='red', s=100, zorder=5)
-                    self.crosshair_lines.append(point)
+                    self.artist_pool.show_cursor(self.axes['position'], x, y, vline=False)
                     
-                    # 添加座標文字標籤
-                    text = self.axes['position'].text(
-                        x, y,
-                        f'經度: {x:.6f}\n緯度: {y:.6f}',
-                        bbox=dict(facecolor='white', edgecolor='none', alpha=0.8),
-                        verticalalignment='bottom',
-                        horizontalalignment='right'
-                    )
-                    self.value_texts.append(text)
+                    # 更新座標文字標籤
+                    self.artist_pool.show_label(
+                        self.axes['position'], 'coord', 'position',
+                        f'經度: {x:.6f}\n緯度: {y:.6f}', (x, y),
+                        **POINT_VALUE_LABEL_STYLE)
             
             # 更新圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"更新所有圖表時出錯: {str(e)}")
@@ -648,39 +715,210 @@ class PlotManager:
                 self.info_text.remove()
                 self.info_text = None
             
-            # 清除十字虛線和標記點
-            for line in self.crosshair_lines:
-                line.remove()
-            self.crosshair_lines = []
-            
-            # 清除數值文字
-            for text_obj in self.value_texts:
-                text_obj.remove()
-            self.value_texts = []
-            
-            # 清除軌跡圖上的標示點
-            if hasattr(self, 'track_point') and self.track_point:
-                self.track_point.remove()
-                self.track_point = None
-            
-            # 清除位置軌跡圖的十字線和標記點
-            if hasattr(self, 'position_crosshair_lines'):
-                for line in self.position_crosshair_lines:
-                    line.remove()
-                self.position_crosshair_lines = []
-            
-            if hasattr(self, 'position_highlight_point') and self.position_highlight_point:
-                self.position_highlight_point.remove()
-                self.position_highlight_point = None
+            # 隱藏主圖表的游標與數值文字（軌跡圖標示點保留，下次更新時原地移動）
+            main_axes = list(self.axes.values()) if self.axes else []
+            self.artist_pool.hide_cursors(main_axes)
+            self.artist_pool.hide_labels(main_axes, groups=('value', 'index', 'coord'))
             
             # 強制更新圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"清除高亮標記時出錯: {str(e)}")
             import traceback
             traceback.print_exc()
 
+    def _link_x_axes(self):
+        """建立範圍索引，並在X軸改變時自動貼合各子圖的Y軸"""
+        self._build_range_indexes()
+        # 子圖共用速度圖的X軸，任一子圖縮放時共用群組中每個軸都會發出 xlim_changed，
+        # 只在速度圖上連接，每次縮放只重新計算一次
+        speed_ax = self.axes.get('speed')
+        if speed_ax is not None:
+            speed_ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+    def _build_range_indexes(self):
+        """建立自動貼合Y軸所需的範圍索引"""
+        # 只保留目前使用中的資料的索引，已建立者沿用
+        active = {}
+        for segments in self._autoscale_segments.values():
+            for data, column, _, _, _ in segments:
+                self._range_index(data, column)
+                active[(id(data), column)] = self.range_indexes[(id(data), column)]
+        self.range_indexes = active
+
+    def _range_index(self, data, column):
+        """取得數據欄位的範圍索引，尚未建立時建立（有相符的快取區塊統計時直接使用）"""
+        key = (id(data), column)
+        entry = self.range_indexes.get(key)
+        if entry is None or entry[0] is not data or len(entry[1]) != len(data):
+            values = data[column].to_numpy()
+            block_size = block_size_for(len(values))
+            block_min = block_max = None
+            stats = self.block_stats.get(column)
+            if stats is not None:
+                stats_min, stats_max, stats_block_size = stats
+                if (block_size % stats_block_size == 0 and
+                        len(stats_min) == (len(values) + stats_block_size - 1) // stats_block_size):
+                    block_min, block_max = coarsen_blocks(stats_min, stats_max, block_size // stats_block_size)
+            entry = (data, RangeMinMaxIndex(values, block_size, block_min, block_max))
+            self.range_indexes[key] = entry
+        return entry[1]
+
+    def vertex_counts(self):
+        """主圖表的原始數據點數與實際繪製的頂點數"""
+        decimated = {id(line.line): line for line in self.decimated_lines.values()}
+        raw = drawn = 0
+        for ax in self.axes.values():
+            for line in ax.get_lines():
+                source = decimated.get(id(line))
+                if source is not None:
+                    raw += source.raw_vertex_count
+                    drawn += source.drawn_vertex_count
+                else:
+                    count = len(line.get_xdata())
+                    raw += count
+                    drawn += count
+        return raw, drawn
+
+    def extend_plots(self, data, previous_length):
+        """數據在尾端增加後原地延伸總覽圖的曲線，不重新建立圖表
+
+        data 為包含新增數據的完整 DataFrame，previous_length 為增加前的筆數。
+        原有的範圍索引只延伸新增的部分。切換單圈後的圖表不在此更新。
+        """
+        if getattr(self, 'current_checked_items', None) or not self.data_lines:
+            return
+        previous = self.data_list[0] if self.data_list else None
+        self.data_list = [data]
+        self._extend_range_indexes(previous, data)
+        self._apply_channels(data)
+        for ax_name, line in self.data_lines.items():
+            column = self.axis_columns.get(ax_name)
+            if line.axes is None or column not in data.columns or ax_name in self.decimated_lines:
+                continue
+            line.set_data(data.index, data[column])
+        self._autoscale_segments = {
+            ax_name: [(data, column, 0, 0, len(data) - 1)]
+            for ax_name, column in self.axis_columns.items() if column in data.columns
+        }
+        self._build_range_indexes()
+        for ax_name, decimated in self.decimated_lines.items():
+            column = self.axis_columns.get(ax_name)
+            if decimated.line.axes is not None and column in data.columns:
+                decimated.set_values(data[column].to_numpy(), self._range_index(data, column))
+
+        # 原本已顯示到最後一筆時，X軸跟著延伸以顯示新數據
+        ax = self.axes.get('speed')
+        if ax is not None:
+            x_min, x_max = ax.get_xlim()
+            if x_max >= previous_length - 1:
+                ax.set_xlim(x_min, x_max + len(data) - previous_length)
+        self.redraw_scheduler.request(self.figure.canvas)
+
+    def _extend_range_indexes(self, previous, data):
+        """數據在尾端增加後延伸 previous 的範圍索引，改以 data 為鍵
+
+        區塊大小需隨長度加大或欄位不再存在（例如衍生通道）的索引捨棄，
+        之後需要時重新建立。
+        """
+        extended = {}
+        block_size = block_size_for(len(data))
+        for (_, column), (source, index) in self.range_indexes.items():
+            if source is not previous or column not in data.columns or index.block_size != block_size:
+                continue
+            index.extend(data[column].to_numpy())
+            extended[(id(data), column)] = (data, index)
+        self.range_indexes = extended
+
+    def extend_laps(self, data, previous_length, time_ms=None):
+        """以已設定的起點接續偵測新增數據中完成的單圈，回傳新的範圍
+
+        time_ms 為新增數據的時間（毫秒，已接續之前的跨越午夜），未提供時
+        由新增數據的 Time 欄位解析。
+        """
+        detector = self.lap_detector
+        if detector is None or len(data) <= previous_length:
+            return []
+        new_rows = data.iloc[previous_length:]
+        if time_ms is None:
+            time_ms = parse_time_ms(new_rows['Time'])
+        x_col = 'X' if 'X' in data.columns else 'Longitude'
+        y_col = 'Y' if 'Y' in data.columns else 'Latitude'
+        laps = detector.feed(new_rows[x_col].to_numpy(dtype=float),
+                             new_rows[y_col].to_numpy(dtype=float),
+                             time_ms, previous_length)
+        return [self._lap_to_range(data, lap) for lap in laps]
+
+    @staticmethod
+    def _lap_to_range(data, lap):
+        """將單圈偵測結果轉換為範圍列表使用的格式"""
+        return {
+            'range_number': lap['range_number'],
+            'start_index': lap['start_index'],
+            'end_index': lap['end_index'],
+            'start_time': data['Time'].iloc[lap['start_index']],
+            'end_time': data['Time'].iloc[lap['end_index']],
+            'duration': lap['duration'],
+            'duration_str': lap['duration_str'],
+            'data_count': lap['data_count']  # 新增資料筆數
+        }
+
+    def _on_xlim_changed(self, ax):
+        """X軸範圍改變時，以範圍索引重新計算所有子圖的Y軸範圍"""
+        x_min, x_max = ax.get_xlim()
+        for ax_name in self._autoscale_segments:
+            self._autoscale_y(ax_name, x_min, x_max)
+
+    def _autoscale_y(self, ax_name, x_min, x_max):
+        """依X範圍查詢可見數據的最小/最大值並設定Y軸範圍"""
+        ax = self.axes.get(ax_name)
+        segments = self._autoscale_segments.get(ax_name)
+        if ax is None or not segments:
+            return
+
+        x_min, x_max = sorted((x_min, x_max))
+        y_min, y_max = np.nan, np.nan
+        for data, column, offset, first, last in segments:
+            entry = self.range_indexes.get((id(data), column))
+            if entry is None:
+                continue
+            # X座標加上偏移量即為原始數據的索引
+            start = max(first, int(np.ceil(x_min)) + offset)
+            end = min(last, int(np.floor(x_max)) + offset)
+            if start > end:
+                continue
+            seg_min, seg_max = entry[1].query(start, end)
+            y_min = np.fmin(y_min, seg_min)
+            y_max = np.fmax(y_max, seg_max)
+
+        if not (np.isfinite(y_min) and np.isfinite(y_max)):
+            return
+        margin = (y_max - y_min) * 0.05 or max(abs(y_max) * 0.05, 1.0)
+        ax.set_ylim(y_min - margin, y_max + margin)
+
+    def _draw_file_boundaries(self):
+        """在主圖表標示合併數據中各檔案的分界與檔名"""
+        if len(self.file_boundaries) < 2 or 'speed' not in self.axes:
+            return
+        for boundary in self.file_boundaries[1:]:
+            for ax in self.axes.values():
+                ax.axvline(x=boundary['start_index'] - 0.5, color='gray', linestyle=':', linewidth=1)
+        speed_ax = self.axes['speed']
+        for boundary in self.file_boundaries:
+            speed_ax.text(boundary['start_index'], 0.95, boundary['name'],
+                          transform=speed_ax.get_xaxis_transform(),
+                          fontsize=7, color='gray', va='top', ha='left', clip_on=True)
+
+    def _axis_name(self, ax):
+        """取得軸在 self.axes 中的名稱"""
+        return next((name for name, a in self.axes.items() if a is ax), None)
+
+    def _reset_pooled_artists(self):
+        """圖表清除前釋放主圖表軸上的池化 artist"""
+        if self.axes:
+            self.artist_pool.reset(self.axes.values())
+
     def set_click_callback(self, callback):
         """設置點擊回調函數"""
         self.click_callback = callback
@@ -688,49 +926,18 @@ class PlotManager:
     def _add_highlights(self, index, data):
         """添加高亮顯示"""
         try:
-            # 清除舊的高亮
-            for plot_info in self.cached_plots.values():
-                if plot_info['highlight_line']:
-                    plot_info['highlight_line'].remove()
-                    plot_info['highlight_line'] = None
-                if plot_info['highlight_point']:
-                    plot_info['highlight_point'].remove()
-                    plot_info['highlight_point'] = None
-
-            # 在每個子圖上添加垂直線和點
+            # 在每個子圖上移動垂直線和點
             for ax_name, ax in self.axes.items():
-                if ax_name == 'speed' and 'G Speed' in data.columns:
-                    y_value = data['G Speed'].iloc[index]
-                    color = 'red'
-                    # 添加垂直線
-                    self.cached_plots['speed']['highlight_line'] = ax.axvline(
-                        x=index, color=color, linestyle='--', alpha=0.5)
-                    # 添加高亮點
-                    self.cached_plots['speed']['highlight_point'] = ax.scatter(
-                        index, y_value, color=color, s=100, zorder=5)
-                    # 添加數值標籤
-                    self._add_value_text(ax, index, y_value, color)
-
-                elif ax_name == 'r_scale1' and 'R Scale 1' in data.columns:
-                    y_value = data['R Scale 1'].iloc[index]
-                    color = 'red'
-                    self.cached_plots['r_scale1']['highlight_line'] = ax.axvline(
-                        x=index, color=color, linestyle='--', alpha=0.5)
-                    self.cached_plots['r_scale1']['highlight_point'] = ax.scatter(
-                        index, y_value, color=color, s=100, zorder=5)
-                    self._add_value_text(ax, index, y_value, color)
-
-                elif ax_name == 'r_scale2' and 'R Scale 2' in data.columns:
-                    y_value = data['R Scale 2'].iloc[index]
+                col_name = self.axis_columns.get(ax_name)
+                if col_name and col_name in data.columns:
+                    y_value = data[col_name].iloc[index]
                     color = 'red'
-                    self.cached_plots['r_scale2']['highlight_line'] = ax.axvline(
-                        x=index, color=color, linestyle='--', alpha=0.5)
-                    self.cached_plots['r_scale2']['highlight_point'] = ax.scatter(
-                        index, y_value, color=color, s=100, zorder=5)
+                    self.artist_pool.show_cursor(ax, index, y_value)
+                    # 更新數值標籤
                     self._add_value_text(ax, index, y_value, color)
 
             # 更新圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
 
         except Exception as e:
             print(f"添加高亮顯示時出錯: {str(e)}")
@@ -748,22 +955,18 @@ class PlotManager:
             text_x = x + (x_max - x_min) * 0.02
             text_y = y + (y_max - y_min) * 0.02
             
-            # 添加文字標籤
-            text = ax.text(text_x, text_y, f'{y:.2f}', 
-                          color=color,
-                          fontsize=9,
-                          bbox=dict(facecolor='white', 
-                                   edgecolor='none',
-                                   alpha=0.7))
-            
-            # 保存文字對象以便後續清除
-            self.value_texts.append(text)
+            # 原地更新文字標籤
+            self.artist_pool.show_label(ax, 'value', 'highlight', f'{y:.2f}',
+                                        (text_x, text_y),
+                                        color=color,
+                                        **HIGHLIGHT_VALUE_LABEL_STYLE)
             
         except Exception as e:
             print(f"添加數值文字時出錯: {str(e)}")
             import traceback
             traceback.print_exc()
 
+    @tracing.traced('scroll', 'ui')
     def _on_scroll(self, event):
         """處理滾輪縮放事件"""
         try:
@@ -795,12 +998,13 @@ class PlotManager:
             new_y_min = y_center - (y_center - y_min) * scale_factor
             new_y_max = y_center + (y_max - y_center) * scale_factor
             
-            # 更新軸的範圍
+            # 更新X軸範圍（三個子圖共用X軸），有範圍索引的子圖由 _on_xlim_changed 自動貼合Y軸
             ax.set_xlim(new_x_min, new_x_max)
-            ax.set_ylim(new_y_min, new_y_max)
+            if not self._autoscale_segments.get(self._axis_name(ax)):
+                ax.set_ylim(new_y_min, new_y_max)
             
             # 重繪圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"縮放處理時出錯: {str(e)}")
@@ -812,8 +1016,9 @@ class PlotManager:
         self.is_setting_start_point = True
         print("請在位置軌跡圖上選擇起點")
 
-    def set_start_point(self, index, track_ax, track_canvas):
-        """設定起點"""
+    @tracing.traced('set_start_point', 'ui')
+    def set_start_point(self, index, track_ax, track_canvas, laps=None):
+        """設定起點，laps 為預先計算的單圈（例如來自快取）時不再重新分析"""
         try:
             # 確保 index 是整數類型
             index = int(index)
@@ -833,7 +1038,6 @@ class PlotManager:
             
             # 更新軌跡圖上的點
             self.update_track_point(index, track_ax, track_canvas)
-            print(f"已更新軌跡圖上的點 clsaa name {self.update_track_point.__name__}")
             # 清除舊的標記線
             if hasattr(self, 'start_point_line') and self.start_point_line:
                 for line in self.start_point_line:
@@ -845,7 +1049,7 @@ class PlotManager:
             for ax_name, ax in self.axes.items():
                 line = ax.axvline(x=index, color='green', linestyle='--', linewidth=2)
                 self.start_point_line.append(line)
-                ax.figure.canvas.draw()  # 更新每個主圖表
+            self.redraw_scheduler.request(self.figure.canvas)
             
             # 計算1公分的數據單位長度
             y_range = track_ax.get_ylim()[1] - track_ax.get_ylim()[0]
@@ -861,12 +1065,19 @@ class PlotManager:
             self.start_point_line.append(track_line)
             
             # 更新軌跡圖顯示
-            track_canvas.draw()
+            self.redraw_scheduler.request(track_canvas)
             
             # 呼叫 analyze_ranges 進行分析
-            analyze =self.analyze_ranges(index)
-            #print(analyze,"\n",type(analyze),"\n",len(analyze))  
-            print(f"起點已設定在索引: {index}")
+            if laps is None:
+                analyze =self.analyze_ranges(index)
+            else:
+                # 以預先計算的單圈重建偵測器，追蹤檔案新增的數據時繼續偵測單圈
+                self.lap_detector = LapDetector.from_laps(
+                    x, y, index, parse_time_ms(data['Time'].iloc[[index]])[0], laps,
+                    data[x_col].to_numpy(dtype=float), data[y_col].to_numpy(dtype=float))
+                if self.range_update_callback:
+                    self.range_update_callback([self._lap_to_range(data, lap) for lap in laps])
+            tracing.instant('start_point', 'ui', index=index, x=float(x), y=float(y))
             
         except Exception as e:
             print(f"設定起點時出錯: {str(e)}")
@@ -893,7 +1104,7 @@ class PlotManager:
                 self.start_point_line.append(line)
 
             # 更新圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
 
         except Exception as e:
             print(f"重繪起點線時出錯: {str(e)}")
@@ -923,9 +1134,10 @@ class PlotManager:
             self.has_start_point_set = False
             self.start_point_data = None
             self.is_setting_start_point = False
+            self.lap_detector = None
             
             # 更新圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
             print("起點設定已清除")
             
         except Exception as e:
@@ -940,46 +1152,17 @@ class PlotManager:
             if ax is None:
                 return
             
-            # 清除舊的十字線
-            if hasattr(self, 'position_crosshair_lines'):
-                for line in self.position_crosshair_lines:
-                    line.remove()
-            
-            # 清除舊的標記點
-            if hasattr(self, 'position_highlight_point'):
-                if self.position_highlight_point:
-                    self.position_highlight_point.remove()
-            
-            # 獲取軸的範圍
-            x_min, x_max = ax.get_xlim()
-            y_min, y_max = ax.get_ylim()
-            
-            # 創建十字線
-            self.position_crosshair_lines = [
-                ax.axvline(x=x, color='red', linestyle='--', alpha=0.5),
-                ax.axhline(y=y, color='red', linestyle='--', alpha=0.5)
-            ]
-            
-            # 添加標記點
-            self.position_highlight_point = ax.scatter(
-                [x], [y],
-                color='red',
-                s=100,
-                zorder=5
-            )
+            # 移動十字線與標記點
+            self.artist_pool.show_cursor(ax, x, y, crosshair=True)
             
-            # 添加座標文字
-            text = ax.text(
-                x, y,
-                f'經度: {x:.6f}\n緯度: {y:.6f}',
-                bbox=dict(facecolor='white', edgecolor='none', alpha=0.8),
-                verticalalignment='bottom',
-                horizontalalignment='right'
-            )
-            self.position_crosshair_lines.append(text)
+            # 更新座標文字
+            self.artist_pool.show_label(
+                ax, 'coord', 'position',
+                f'經度: {x:.6f}\n緯度: {y:.6f}', (x, y),
+                **POINT_VALUE_LABEL_STYLE)
             
             # 更新圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"顯示位置十字線時出錯: {str(e)}")
@@ -994,55 +1177,36 @@ class PlotManager:
             
             # 遍歷每個子圖
             for ax_name, ax in self.axes.items():
-                if ax_name in ['speed', 'r_scale1', 'r_scale2']:
+                if ax_name in self.axis_columns:
                     # 獲取對應的數據列名
-                    column_mapping = {
-                        'speed': 'G Speed',
-                        'r_scale1': 'R Scale 1',
-                        'r_scale2': 'R Scale 2'
-                    }
-                    
-                    col_name = column_mapping.get(ax_name)
+                    col_name = self.axis_columns.get(ax_name)
                     if col_name and col_name in self.data_list[0].columns:
                         value = self.data_list[0][col_name].iloc[index]
                         
-                        # 添加垂直線
-                        v_line = ax.axvline(x=index, color='red', linestyle='--', alpha=0.5)
-                        self.crosshair_lines.append(v_line)
+                        # 移動垂直線與高亮點
+                        self.artist_pool.show_cursor(ax, index, value)
                         
-                        # 添加高亮點
-                        point = ax.scatter(index, value, color='red', s=100, zorder=5)
-                        self.crosshair_lines.append(point)
+                        # 更新數值標籤
+                        self.artist_pool.show_label(
+                            ax, 'value', 'point', f'{value:.2f}', (index, value),
+                            **POINT_VALUE_LABEL_STYLE)
                         
-                        # 添加數值標籤
-                        text = ax.text(
-                            index, value,
-                            f'{value:.2f}',
-                            bbox=dict(facecolor='white', edgecolor='none', alpha=0.8),
-                            verticalalignment='bottom',
-                            horizontalalignment='right'
-                        )
-                        self.value_texts.append(text)
-                        
-                        # 添加索引標籤
-                        index_text = ax.text(
-                            0.02, 0.95,
-                            f'索引: {index}',
+                        # 更新索引標籤
+                        self.artist_pool.show_label(
+                            ax, 'index', 'point', f'索引: {index}', (0.02, 0.95),
                             transform=ax.transAxes,
-                            bbox=dict(facecolor='white', edgecolor='none', alpha=0.8),
-                            verticalalignment='top',
-                            horizontalalignment='left'
-                        )
-                        self.value_texts.append(index_text)
+                            **INDEX_LABEL_STYLE)
             
             # 更新圖表
-            self.figure.canvas.draw()
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"高亮顯示數據點時出錯: {str(e)}")
             import traceback
             traceback.print_exc()
 
+    @tracing.traced('find_nearest_point', 'compute')
+    @timed('find_nearest_point')
     def find_nearest_point(self, x_click, y_click):
         """找到最接近點擊位置的數據點索引"""
         try:
@@ -1101,6 +1265,7 @@ class PlotManager:
             traceback.print_exc()
             return None
         
+    @tracing.traced('update_track_point', 'ui')
     def update_track_point(self, index, track_ax, track_canvas):
         """更新軌跡圖上的點"""
         try:
@@ -1110,7 +1275,6 @@ class PlotManager:
                 if data.empty:
                     print("警告: combined_track_data 為空")
                     return
-                print(f"使用 combined_track_data，數據長度: {len(data)} 筆")
                 
                 if not hasattr(self, 'current_checked_items') or not self.current_checked_items:
                     print("警告: 沒有選中的範圍數據")
@@ -1127,41 +1291,31 @@ class PlotManager:
                 if index >= first_range_length:
                     print(f"警告: 索引 {index} 超出第一個範圍長度 {first_range_length}")
                     return
-                    
-                print(f"使用第一個範圍的索引: {index}")
                 
             elif self.data_list and self.data_list[0] is not None:
                 data = self.data_list[0]
                 if data.empty:
                     print("警告: data_list[0] 為空")
                     return
-                print(f"使用原始數據，數據長度: {len(data)} 筆")
-                print(f"使用原始索引: {index}")
             else:
                 print("警告: 沒有可用的數據")
                 return
                 
-            # 安全地移除舊的 track_point
-            if hasattr(self, 'track_point') and self.track_point is not None:
-                try:
-                    self.track_point.remove()
-                except ValueError:
-                    pass  # 忽略移除失敗的情況
-            self.track_point = None
-            
             x_col = 'X' if 'X' in data.columns else 'Longitude'
             y_col = 'Y' if 'Y' in data.columns else 'Latitude'
+            tracing.instant('track_point', 'ui', index=index, rows=len(data),
+                            combined=data is getattr(self, 'combined_track_data', None))
             
             # 確保索引在有效範圍內
             if 0 <= index < len(data):
-                self.track_point = track_ax.scatter(
+                # 原地移動軌跡圖上的標示點
+                self.artist_pool.show_cursor(
+                    track_ax,
                     data[x_col].iloc[index],
                     data[y_col].iloc[index],
-                    color='red',
-                    s=100,
-                    zorder=5
+                    vline=False
                 )
-                track_canvas.draw()
+                self.redraw_scheduler.request(track_canvas)
                 
                 # 更新主圖表高亮
                 if hasattr(self, 'combined_track_data') and self.combined_track_data is not None:
@@ -1179,6 +1333,8 @@ class PlotManager:
         """設置範圍更新回調函數"""
         self.range_update_callback = callback
 
+    @tracing.traced('analyze_ranges', 'compute')
+    @timed('analyze_ranges')
     def analyze_ranges(self, start_index):
         """分析數據範圍"""
         try:
@@ -1196,75 +1352,37 @@ class PlotManager:
             QApplication.processEvents()
             
             data = self.data_list[0]
-            data['Time'] = pd.to_datetime(data['Time'])
+            data['Time'] = time_to_datetime(data['Time'])
             
             x_col = 'X' if 'X' in data.columns else 'Longitude'
             y_col = 'Y' if 'Y' in data.columns else 'Latitude'
-            start_x = data[x_col].iloc[start_index]
-            start_y = data[y_col].iloc[start_index]
-            
-            tolerance = 0.00015
-            
+            x_values = data[x_col].to_numpy(dtype=float)
+            y_values = data[y_col].to_numpy(dtype=float)
+            time_ms = parse_time_ms(data['Time'])
+            
+            # 與即時模式共用同一個單圈偵測器，分批處理以更新進度
+            detector = LapDetector(x_values[start_index], y_values[start_index],
+                                   start_index, time_ms[start_index])
+            chunk_size = 50000
+            for chunk_start in range(start_index + 1, len(data), chunk_size):
+                chunk_end = min(chunk_start + chunk_size, len(data))
+                detector.feed(x_values[chunk_start:chunk_end], y_values[chunk_start:chunk_end],
+                              time_ms[chunk_start:chunk_end], chunk_start)
+                progress.setLabelText(f"分析數據範圍中...\n已處理: {chunk_end}/{len(data)} 筆數據")
+                QApplication.processEvents()
+            self.lap_detector = detector
+            
+            # 合併多個檔案時，跨越檔案分界的範圍包含記錄中斷的時間，不列入
             ranges = []
-            current_range = 1
-            last_match_index = start_index
-            in_range = False
-            
-            for i in range(start_index + 1, len(data)):
-                if i % 100 == 0:
-                    progress.setLabelText(f"分析數據範圍中...\n已處理: {i}/{len(data)} 筆數據")
-                    QApplication.processEvents()
-                
-                current_x = data[x_col].iloc[i]
-                current_y = data[y_col].iloc[i]
-                current_time = data['Time'].iloc[i]
-                
-                x_match = abs(current_x - start_x) <= tolerance
-                y_match = abs(current_y - start_y) <= tolerance
-                
-                if x_match and y_match:
-                    if not in_range:
-                        time_diff = (current_time - data['Time'].iloc[last_match_index]).total_seconds()
-                        
-                        if time_diff >= 5:
-                            # 計算該範圍內的資料筆數
-                            data_count = i - last_match_index + 1
-                            
-                            print(f"\n找到範圍 {current_range}:")
-                            print(f"起點: 索引 {last_match_index}")
-                            print(f"  座標: ({data[x_col].iloc[last_match_index]}, {data[y_col].iloc[last_match_index]})")
-                            print(f"  時間: {data['Time'].iloc[last_match_index]}")
-                            print(f"終點: 索引 {i}")
-                            print(f"  座標: ({current_x}, {current_y})")
-                            print(f"  時間: {current_time}")
-                            print(f"資料筆數: {data_count}")
-                            
-                            hours = int(time_diff // 3600)
-                            minutes = int((time_diff % 3600) // 60)
-                            seconds = int(time_diff % 60)
-                            time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-                            print(f"時間差: {time_str}")
-                            print("---")
-                            
-                            ranges.append({
-                                'range_number': current_range,
-                                'start_index': last_match_index,
-                                'end_index': i,
-                                'start_time': data['Time'].iloc[last_match_index],
-                                'end_time': current_time,
-                                'duration': time_diff,
-                                'duration_str': time_str,
-                                'data_count': data_count  # 新增資料筆數
-                            })
-                            
-                            current_range += 1
-                            last_match_index = i
-                            in_range = True
-                else:
-                    if in_range:
-                        in_range = False
+            for lap in laps_within_files(detector.laps, self.file_boundaries):
+                if tracing.enabled():
+                    tracing.instant('lap', 'compute', range_number=lap['range_number'],
+                                    start_index=lap['start_index'], end_index=lap['end_index'],
+                                    data_count=lap['data_count'], duration=lap['duration_str'])
+                ranges.append(self._lap_to_range(data, lap))
             
             progress.close()
+            print(f"找到 {len(ranges)} 個範圍")
             
             if self.range_update_callback:
                 self.range_update_callback(ranges)
@@ -1303,7 +1421,7 @@ class PlotManager:
                 self.remove_range_highlight(range_id)
             
             # 更新圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"清除所有標記時出錯: {str(e)}")
@@ -1319,13 +1437,8 @@ class PlotManager:
                                     if item['id'] == range_id), None)
                     if item_data and 'label' in item_data:
                         label_name = item_data['label']
-                    print(f"[highlight_range] 找到對應的 item_data: {item_data}")
-                    print(f"[highlight_range] label_name: {label_name}")
                 except Exception as e:
                     print(f"[highlight_range] 處理 item_data 時出錯: {str(e)}")
-            else:
-                print(f"[highlight_range] 警告：找不到或無效的 current_checked_items")
-                print(f"[highlight_range] 使用預設 label_name: {label_name}")
             
             # 原有的代碼...
             highlights = []
@@ -1351,14 +1464,9 @@ class PlotManager:
                 x_pos = end_index
                 y_pos = 0.85
                 
-                if i == 0:
-                    label_type = 'speed'
-                elif i == 1:
-                    label_type = 'r_scale1'
-                else:
-                    label_type = 'r_scale2'
+                # 標籤類型即為軸名稱（speed、r_scale1、r_scale2 或額外通道）
+                label_type = ax_name
 
-                print(f"[highlight_range] 添加標籤，軸 {i}，使用 label_name: {label_name}")
                 text = ax.text(x_pos, y_pos, 
                              label_name,
                              horizontalalignment='right',
@@ -1400,13 +1508,11 @@ class PlotManager:
         except Exception as e:
             print(f"移除Run高亮時出錯: {str(e)}")
 
+    @tracing.traced('plot_selected_ranges', 'render')
     def plot_selected_ranges(self, checked_items, full_data, axes, canvas, track_ax, track_canvas):
         """繪製選中Run的圖表"""
         try:
             self.current_checked_items = checked_items
-            print(f"[plot_selected_ranges] current_checked_items: {self.current_checked_items}")
-            
-            print("\n=== 重新編排索引後的Run詳細資料 ===")
             
             # 創建一個字典來存儲每個Run的索引映射
             self.range_index_mapping = {}
@@ -1428,10 +1534,8 @@ class PlotManager:
                     'original_end': end_idx
                 }
                 
-                print(f"\nRun {range_id}:")
-                print(f"原始索引範圍: {start_idx} 到 {end_idx}")
-                print(f"重設後索引範圍: {current_index} 到 {current_index + range_length - 1}")
-                print(f"資料筆數: {range_length}")
+                tracing.instant('run_index_mapping', 'ui', run=range_id, original_start=start_idx,
+                                original_end=end_idx, start=current_index, rows=range_length)
                 
                 current_index += range_length
 
@@ -1445,17 +1549,31 @@ class PlotManager:
                 self.combined_track_data = pd.concat([self.combined_track_data, range_data], ignore_index=True)
 
             # 原有的圖表繪製代碼保持不變
+            self._reset_pooled_artists()
             self.figure.clear()
+            self._apply_channels(full_data)
             
-            gs = self.figure.add_gridspec(3, 1, 
-                                        height_ratios=[1, 1, 1], 
+            rows = 3 + len(self.extra_channels)
+            gs = self.figure.add_gridspec(rows, 1, 
+                                        height_ratios=[1] * rows, 
                                         hspace=0)
             
+            speed_ax = self.figure.add_subplot(gs[0, 0])
             self.axes = {
-                'speed': self.figure.add_subplot(gs[0, 0]),
-                'r_scale1': self.figure.add_subplot(gs[1, 0]),
-                'r_scale2': self.figure.add_subplot(gs[2, 0]),
+                'speed': speed_ax,
+                'r_scale1': self.figure.add_subplot(gs[1, 0], sharex=speed_ax),
+                'r_scale2': self.figure.add_subplot(gs[2, 0], sharex=speed_ax),
             }
+            for row, name in enumerate(self.extra_channels, start=3):
+                self.axes[name] = self.figure.add_subplot(gs[row, 0], sharex=speed_ax)
+            
+            # 預先配置每個軸的游標與每個Run的數值標籤
+            run_ids = [item_data['id'] for item_data in checked_items]
+            for ax in self.axes.values():
+                self.artist_pool.cursor(ax)
+                self.artist_pool.preallocate_labels(ax, 'run_value', run_ids,
+                                                    transform=ax.transAxes,
+                                                    **RUN_VALUE_LABEL_STYLE)
             
             # 清除選中範圍的圖表
             for i, ax in enumerate(axes):
@@ -1467,13 +1585,17 @@ class PlotManager:
                 'r_scale1': ('R Scale 1', self.axes['r_scale1']),
                 'r_scale2': ('R Scale 2', self.axes['r_scale2'])
             }
+            for name in self.extra_channels:
+                plot_config[name] = (name, self.axes[name])
             
             # 為每個勾選的範圍繪製對應的圖表
             for ax_name, (col_name, ax) in plot_config.items():
                 if col_name in full_data.columns:
+                    # 選中範圍的圖表只有三個基本子圖，額外通道只畫在主圖表
+                    selected_index = list(plot_config.keys()).index(ax_name)
+                    selected_ax = axes[selected_index] if selected_index < len(axes) else None
                     for item_data in checked_items:
                         label_name = item_data.get('label', '')
-                        print(f"[plot_selected_ranges] 處理項目，label_name: {label_name}")
                         description = item_data['description']
                         range_id = item_data['id']
                         # 獲取標籤名稱，如果沒有則使用預設的 Run {range_id}
@@ -1494,17 +1616,16 @@ class PlotManager:
                                label=label_name)
                         
                         # 在選中範圍的圖表上繪製（使用相同的重設索引和自定義標籤）
-                        selected_ax = axes[list(plot_config.keys()).index(ax_name)]
-                        line = selected_ax.plot(
-                            range_data.index,
-                            range_data[col_name],
-                            '-',
-                            linewidth=1,
-                            label=label_name
-                        )[0]
-                        print(f"[plot_selected_ranges] 添加選中範圍的線，label_name: {label_name}")
+                        if selected_ax is not None:
+                            line = selected_ax.plot(
+                                range_data.index,
+                                range_data[col_name],
+                                '-',
+                                linewidth=1,
+                                label=label_name
+                            )[0]
                     # 設置主圖表屬性
-                    ax.set_title(col_name, 
+                    ax.set_title(channel_title(col_name), 
                                fontsize=7,
                                fontfamily='sans-serif',
                                loc='left',  # 確保標題靠左
@@ -1522,27 +1643,35 @@ class PlotManager:
                         ax.legend(fontsize=8, loc='upper left')  # 將圖例設置在左上角
                     
                     # 設置選中範圍圖表的屬性
-                    selected_ax = axes[list(plot_config.keys()).index(ax_name)]
-                    selected_ax.set_title(col_name, 
-                                        fontsize=10, 
-                                        loc='left',  # 確保標題靠左
-                                        pad=10)
-                    selected_ax.grid(True)
-                    selected_ax.set_xlabel('索引')
-                    selected_ax.set_ylabel(col_name)
-                    if len(checked_items) > 1:
-                        selected_ax.legend(loc='upper left')  # 將圖例設置在左上角
+                    if selected_ax is not None:
+                        selected_ax.set_title(col_name, 
+                                            fontsize=10, 
+                                            loc='left',  # 確保標題靠左
+                                            pad=10)
+                        selected_ax.grid(True)
+                        selected_ax.set_xlabel('索引')
+                        selected_ax.set_ylabel(col_name)
+                        if len(checked_items) > 1:
+                            selected_ax.legend(loc='upper left')  # 將圖例設置在左上角
+            
+            # 建立範圍索引，各Run的X為重設後索引，加上原始起點即為完整數據索引
+            self._autoscale_segments = {
+                ax_name: [(full_data, column, info['original_start'],
+                           info['original_start'], info['original_end'])
+                          for info in self.range_index_mapping.values()]
+                for ax_name, column in self.axis_columns.items()
+                if column in full_data.columns
+            }
+            self._link_x_axes()
             
             # 調整布局並更新圖表
             self.figure.tight_layout()
             canvas.figure.tight_layout()
-            self.figure.canvas.draw()
-            canvas.draw()
+            self.redraw_scheduler.request(self.figure.canvas)
+            self.redraw_scheduler.request(canvas)
             
             # 繪製軌跡圖
             self.plot_track_for_ranges(checked_items, full_data, track_ax, track_canvas)
-            
-            print("\n=== Run資料輸出完成 ===")
             return True
             
         except Exception as e:
@@ -1603,7 +1732,7 @@ class PlotManager:
             track_ax.set_aspect('equal', adjustable='datalim')
             
             # 更新軌跡圖
-            track_canvas.draw()
+            self.redraw_scheduler.request(track_canvas)
             
         except Exception as e:
             print(f"繪製軌跡圖時出錯: {str(e)}")
@@ -1630,27 +1759,21 @@ class PlotManager:
                 item_data = next((item for item in self.current_checked_items 
                                 if item['id'] == range_id), None)
                 label_name = item_data.get('label', '') if item_data else ''
-                print(f"[_update_right_plot_value] 找到對應的 item_data: {item_data}")
-                print(f"[_update_right_plot_value] label_name: {label_name}")
             else:
                 label_name = ''
-                print(f"[_update_right_plot_value] 警告：找不到 current_checked_items")
-                print(f"[_update_right_plot_value] 使用空白 label_name: {label_name}")
             
             # 尋找並更新Run標籤
             for text in ax.texts:
                 if hasattr(text, 'range_id') and text.range_id == range_id:
                     # 根據數據類型設置不同的格式
                     if plot_type == 'speed':
-                        print(f"[_update_right_plot_value] 更新速度標籤，使用 label_name: {label_name}")
                         text.set_text(f'{label_name}\n{value:.1f} km/h')
                     else:
-                        print(f"[_update_right_plot_value] 更新其他標籤，使用 label_name: {label_name}")
                         text.set_text(f'{label_name}\n{value:.2f}')
                     break
             
             # 重繪圖表
-            self.figure.canvas.draw_idle()
+            self.redraw_scheduler.request(self.figure.canvas)
             
         except Exception as e:
             print(f"更新圖表數值時出錯: {str(e)}")
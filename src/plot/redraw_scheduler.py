@@ -0,0 +1,86 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer
+
+from perf import tracing
+from perf.metrics import counters
+
+
+class RedrawScheduler(QObject):
+    """重繪排程器
+
+    收集需要重繪的畫布，在下一次事件循環時統一重繪，
+    同一次互動中多次請求只會讓每個畫布渲染一次。
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._dirty_canvases = []
+        self.flush_count = 0  # 已執行的批次重繪次數
+        self.draw_count = 0   # 實際渲染的畫布次數
+        # 畫布在耗時統計中使用的名稱（例如 'main'），記錄為 'draw:<名稱>'
+        self.canvas_names = {}
+
+        # 間隔 0 的單次定時器會在目前事件處理完成後觸發
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    @staticmethod
+    def _resolve_canvas(target):
+        """取得畫布、圖表、軸或 artist 所屬的畫布"""
+        if target is None:
+            return None
+        if hasattr(target, 'draw_idle'):
+            return target
+        canvas = getattr(target, 'canvas', None)
+        if canvas is not None:
+            return canvas
+        figure = getattr(target, 'figure', None)
+        return getattr(figure, 'canvas', None)
+
+    def set_canvas_name(self, canvas, name):
+        """設定畫布在耗時統計中的名稱"""
+        self.canvas_names[canvas] = name
+
+    def request(self, target):
+        """標記畫布需要重繪（可傳入畫布、圖表、軸或任意 artist）"""
+        canvas = self._resolve_canvas(target)
+        if canvas is None:
+            return
+        if canvas not in self._dirty_canvases:
+            self._dirty_canvases.append(canvas)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def is_pending(self, target=None):
+        """檢查是否有尚未執行的重繪"""
+        if target is None:
+            return bool(self._dirty_canvases)
+        return self._resolve_canvas(target) in self._dirty_canvases
+
+    def discard(self, target):
+        """取消指定畫布尚未執行的重繪"""
+        canvas = self._resolve_canvas(target)
+        if canvas in self._dirty_canvases:
+            self._dirty_canvases.remove(canvas)
+
+    def flush(self):
+        """立即重繪所有已標記的畫布"""
+        self._timer.stop()
+        canvases, self._dirty_canvases = self._dirty_canvases, []
+        if not canvases:
+            return
+        for canvas in canvases:
+            try:
+                name = self.canvas_names.get(canvas, type(canvas).__name__)
+                started = time.perf_counter()
+                with tracing.span('draw', 'render', canvas=name):
+                    canvas.draw()
+                counters.record(f'draw:{name}', time.perf_counter() - started)
+                self.draw_count += 1
+            except Exception as e:
+                print(f"重繪畫布時出錯: {str(e)}")
+                import traceback
+                traceback.print_exc()
+        self.flush_count += 1
@@ -0,0 +1,326 @@
+import numpy as np
+
+from data.append_buffer import AppendBuffer
+from data.track_simplify import simplification_tolerances, track_extent, track_importance
+
+
+class SegmentGridIndex:
+    """折線線段的均勻網格空間索引"""
+    def __init__(self, x, y, grid_size=64):
+        self.x = x
+        self.y = y
+        self.grid_size = grid_size
+
+        n_seg = max(len(x) - 1, 0)
+        self.seg_xmin = np.fmin(x[:-1], x[1:]) if n_seg else np.empty(0)
+        self.seg_xmax = np.fmax(x[:-1], x[1:]) if n_seg else np.empty(0)
+        self.seg_ymin = np.fmin(y[:-1], y[1:]) if n_seg else np.empty(0)
+        self.seg_ymax = np.fmax(y[:-1], y[1:]) if n_seg else np.empty(0)
+
+        if n_seg == 0 or not np.isfinite(self.seg_xmin).any():
+            self.bounds = None
+            self.sorted_segments = np.empty(0, dtype=np.int64)
+            self.cell_offsets = np.zeros(grid_size * grid_size + 1, dtype=np.int64)
+            return
+
+        self.bounds = (np.nanmin(self.seg_xmin), np.nanmax(self.seg_xmax),
+                       np.nanmin(self.seg_ymin), np.nanmax(self.seg_ymax))
+        x0, x1, y0, y1 = self.bounds
+        self.cell_w = (x1 - x0) / grid_size or 1.0
+        self.cell_h = (y1 - y0) / grid_size or 1.0
+
+        # 以線段中點分配網格，查詢時再以最大線段半寬擴張視窗
+        mid_x = np.nan_to_num((self.seg_xmin + self.seg_xmax) / 2, nan=x0)
+        mid_y = np.nan_to_num((self.seg_ymin + self.seg_ymax) / 2, nan=y0)
+        ix = np.clip(((mid_x - x0) / self.cell_w).astype(np.int64), 0, grid_size - 1)
+        iy = np.clip(((mid_y - y0) / self.cell_h).astype(np.int64), 0, grid_size - 1)
+        cells = iy * grid_size + ix
+
+        self.sorted_segments = np.argsort(cells, kind='stable')
+        self.cell_offsets = np.searchsorted(cells[self.sorted_segments],
+                                            np.arange(grid_size * grid_size + 1))
+        self.pad_x = np.nanmax(self.seg_xmax - self.seg_xmin) / 2
+        self.pad_y = np.nanmax(self.seg_ymax - self.seg_ymin) / 2
+
+    def _cell_range(self, lo, hi, origin, size):
+        """將座標範圍轉換為網格索引範圍"""
+        c0 = int(np.clip((lo - origin) // size, 0, self.grid_size - 1))
+        c1 = int(np.clip((hi - origin) // size, 0, self.grid_size - 1))
+        return c0, c1
+
+    def query(self, xmin, xmax, ymin, ymax):
+        """回傳與視窗相交的線段索引（已排序）"""
+        if self.bounds is None:
+            return np.empty(0, dtype=np.int64)
+
+        x0, x1, y0, y1 = self.bounds
+        if xmax < x0 or xmin > x1 or ymax < y0 or ymin > y1:
+            return np.empty(0, dtype=np.int64)
+
+        ix0, ix1 = self._cell_range(xmin - self.pad_x, xmax + self.pad_x, x0, self.cell_w)
+        iy0, iy1 = self._cell_range(ymin - self.pad_y, ymax + self.pad_y, y0, self.cell_h)
+
+        # 同一列的網格在排序後是連續的，每列只需一次切片
+        chunks = []
+        for iy in range(iy0, iy1 + 1):
+            row = iy * self.grid_size
+            begin = self.cell_offsets[row + ix0]
+            end = self.cell_offsets[row + ix1 + 1]
+            if end > begin:
+                chunks.append(self.sorted_segments[begin:end])
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.concatenate(chunks)
+        hit = ((self.seg_xmax[candidates] >= xmin) & (self.seg_xmin[candidates] <= xmax) &
+               (self.seg_ymax[candidates] >= ymin) & (self.seg_ymin[candidates] <= ymax))
+        return np.sort(candidates[hit])
+
+
+class AppendableSegmentIndex:
+    """可在尾端追加點的折線空間索引
+
+    線段分為數段連續的區間，各自建立 SegmentGridIndex。追加點時只為新增的
+    線段建立索引；最後一段不小於前一段時兩段合併重建（類似二進位進位），
+    每個線段被重建的次數為 O(log n)，不會每次追加都重建整條折線。
+    查詢時依序合併各段的結果，仍為排序好的線段索引。
+    """
+    def __init__(self, x, y, grid_size=64):
+        self.grid_size = grid_size
+        self._x = AppendBuffer(np.asarray(x, dtype=float))
+        self._y = AppendBuffer(np.asarray(y, dtype=float))
+        # (第一個線段的索引, 線段數, SegmentGridIndex)
+        self.runs = []
+        self._add_run(0)
+
+    @property
+    def x(self):
+        return self._x.values
+
+    @property
+    def y(self):
+        return self._y.values
+
+    def _add_run(self, first):
+        """為從 first 開始到最後的線段建立一段索引"""
+        count = len(self._x) - 1 - first
+        if count > 0:
+            self.runs.append((first, count, SegmentGridIndex(self.x[first:], self.y[first:], self.grid_size)))
+
+    def append(self, x_new, y_new):
+        """追加點，新線段包含原本最後一點與第一個新點之間的線段"""
+        if not len(x_new):
+            return
+        first = max(len(self._x) - 1, 0)
+        self._x.append(x_new)
+        self._y.append(y_new)
+        self._add_run(first)
+        while len(self.runs) > 1 and self.runs[-2][1] <= self.runs[-1][1]:
+            self.runs.pop()
+            self._add_run(self.runs.pop()[0])
+
+    def query(self, xmin, xmax, ymin, ymax):
+        """回傳與視窗相交的線段索引（已排序）"""
+        parts = [index.query(xmin, xmax, ymin, ymax) + first for first, _, index in self.runs]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+class TrackRenderer:
+    """位置軌跡渲染器
+
+    只繪製與目前視窗相交的線段，縮小時改用預先計算的
+    Douglas-Peucker 簡化折線，長時間記錄在平移縮放時仍保持流暢。
+    importance 為預先計算的簡化重要度（例如來自快取）；原始數據層級的
+    空間索引在第一次放大到該層級時才建立。追蹤新數據時以 extend 追加，
+    只處理新增的點。
+    """
+    def __init__(self, ax, x_data, y_data, levels=8, grid_size=64,
+                 pixel_tolerance=0.5, view_padding=0.25, importance=None, **line_kwargs):
+        self.ax = ax
+        self.pixel_tolerance = pixel_tolerance
+        self.view_padding = view_padding
+        self.grid_size = grid_size
+
+        self._x = AppendBuffer(np.asarray(x_data, dtype=float))
+        self._y = AppendBuffer(np.asarray(y_data, dtype=float))
+        self.raw_vertex_count = len(self.x)
+        self.drawn_vertex_count = 0
+
+        self.extent = self._compute_extent(self.x, self.y)
+        self.tolerances = simplification_tolerances(self.x, self.y, levels)
+        if importance is not None and len(importance) == len(self.x):
+            self._importance_values = AppendBuffer(np.asarray(importance, dtype=float))
+        else:
+            self._importance_values = AppendBuffer(self._importance(self.x, self.y))
+        self._build_levels()
+
+        coarsest = self.levels[0]
+        self.line, = ax.plot(coarsest.x, coarsest.y, **line_kwargs)
+        self.drawn_vertex_count = len(coarsest.x)
+        ax.update_datalim([(self.extent[0], self.extent[2]),
+                           (self.extent[1], self.extent[3])])
+
+        self.current_level = 0
+        self._culled_window = None
+        self._cids = [
+            ax.callbacks.connect('xlim_changed', self._on_view_changed),
+            ax.callbacks.connect('ylim_changed', self._on_view_changed),
+        ]
+
+    @property
+    def x(self):
+        return self._x.values
+
+    @property
+    def y(self):
+        return self._y.values
+
+    @property
+    def importance(self):
+        return self._importance_values.values
+
+    @staticmethod
+    def _compute_extent(x, y):
+        """計算有效座標的範圍"""
+        return track_extent(x, y)
+
+    def _importance(self, x, y):
+        """計算各點的簡化重要度"""
+        return track_importance(x, y, self.tolerances[-1])
+
+    def _build_levels(self):
+        """建立各層級的折線與空間索引，最後一層為原始資料（延後建立）"""
+        self.levels = []
+        for tol in self.tolerances:
+            keep = self.importance >= tol
+            self.levels.append(AppendableSegmentIndex(self.x[keep], self.y[keep], self.grid_size))
+        self.levels.append(None)
+
+    def _level_index(self, level):
+        """取得層級的空間索引，原始數據層級在此時才建立"""
+        if self.levels[level] is None:
+            self.levels[level] = AppendableSegmentIndex(self.x, self.y, self.grid_size)
+        return self.levels[level]
+
+    def extend(self, x_data, y_data):
+        """在軌跡末端追加新的點
+
+        只對新增的部分（連同原本的最後一點）計算簡化重要度，容差層級沿用
+        建立時的設定；各層級只把新增的點追加到空間索引，目前的折線也只接上
+        與已裁切視窗相交的新線段。
+        """
+        x_new = np.asarray(x_data, dtype=float)
+        y_new = np.asarray(y_data, dtype=float)
+        if len(x_new) == 0:
+            return
+        if len(self.x):
+            joined_x = np.concatenate([self.x[-1:], x_new])
+            joined_y = np.concatenate([self.y[-1:], y_new])
+            importance = self._importance(joined_x, joined_y)[1:]
+        else:
+            importance = self._importance(x_new, y_new)
+
+        self._x.append(x_new)
+        self._y.append(y_new)
+        self._importance_values.append(importance)
+        self.raw_vertex_count = len(self.x)
+        current = self.levels[self.current_level]
+        first_new = max(len(current.x) - 1, 0) if current is not None else None
+        for index, tol in zip(self.levels, self.tolerances):
+            keep = importance >= tol
+            index.append(x_new[keep], y_new[keep])
+        if self.levels[-1] is not None:
+            self.levels[-1].append(x_new, y_new)
+
+        new_extent = self._compute_extent(x_new, y_new)
+        if np.isfinite(new_extent[0]):
+            self.extent = (min(self.extent[0], new_extent[0]), max(self.extent[1], new_extent[1]),
+                           min(self.extent[2], new_extent[2]), max(self.extent[3], new_extent[3]))
+            self.ax.update_datalim([(self.extent[0], self.extent[2]),
+                                    (self.extent[1], self.extent[3])])
+
+        if self._culled_window is not None and first_new is not None:
+            self._extend_view(first_new)
+        else:
+            self.update_view()
+
+    def _extend_view(self, first):
+        """將目前層級從 first 開始的新線段中與已裁切視窗相交者接到折線後"""
+        index = self.levels[self.current_level]
+        segments = np.arange(first, len(index.x) - 1)
+        x0, x1 = index.x[segments], index.x[segments + 1]
+        y0, y1 = index.y[segments], index.y[segments + 1]
+        xmin, xmax, ymin, ymax = self._culled_window
+        hit = ((np.fmax(x0, x1) >= xmin) & (np.fmin(x0, x1) <= xmax) &
+               (np.fmax(y0, y1) >= ymin) & (np.fmin(y0, y1) <= ymax))
+        xs, ys = self._assemble(index.x, index.y, segments[hit])
+        if not len(xs):
+            return
+        drawn_x, drawn_y = self.line.get_data()
+        if len(drawn_x):
+            xs = np.concatenate([drawn_x, [np.nan], xs])
+            ys = np.concatenate([drawn_y, [np.nan], ys])
+        self.line.set_data(xs, ys)
+        self.drawn_vertex_count = len(xs)
+
+    def disconnect(self):
+        """解除與軸的事件連接"""
+        for cid in self._cids:
+            self.ax.callbacks.disconnect(cid)
+        self._cids = []
+
+    def _on_view_changed(self, ax):
+        """軸範圍改變時更新可見線段"""
+        self.update_view()
+
+    def _select_level(self, units_per_px):
+        """依每像素的數據單位選擇最粗且不失真的層級"""
+        target = units_per_px * self.pixel_tolerance
+        for level, tol in enumerate(self.tolerances):
+            if tol <= target:
+                return level
+        return len(self.levels) - 1
+
+    def update_view(self):
+        """依目前視窗裁切並更新折線資料"""
+        if self.line.axes is None:
+            # 軸已被清除，此渲染器不再有效
+            self.disconnect()
+            return
+
+        xmin, xmax = sorted(self.ax.get_xlim())
+        ymin, ymax = sorted(self.ax.get_ylim())
+        width_px = max(self.ax.bbox.width, 1.0)
+        height_px = max(self.ax.bbox.height, 1.0)
+        units_per_px = max((xmax - xmin) / width_px, (ymax - ymin) / height_px)
+        level = self._select_level(units_per_px)
+
+        # 新視窗仍在上次裁切範圍內且層級相同時不需更新
+        if level == self.current_level and self._culled_window is not None:
+            cx0, cx1, cy0, cy1 = self._culled_window
+            if cx0 <= xmin and xmax <= cx1 and cy0 <= ymin and ymax <= cy1:
+                return
+
+        pad_x = (xmax - xmin) * self.view_padding
+        pad_y = (ymax - ymin) * self.view_padding
+        window = (xmin - pad_x, xmax + pad_x, ymin - pad_y, ymax + pad_y)
+
+        index = self._level_index(level)
+        segments = index.query(*window)
+        xs, ys = self._assemble(index.x, index.y, segments)
+        self.line.set_data(xs, ys)
+
+        self.current_level = level
+        self._culled_window = window
+        self.drawn_vertex_count = len(xs)
+
+    @staticmethod
+    def _assemble(x, y, segments):
+        """將可見線段組合為以 NaN 分隔的折線"""
+        if len(segments) == 0:
+            return np.empty(0), np.empty(0)
+        points = np.union1d(segments, segments + 1)
+        breaks = np.nonzero(np.diff(points) > 1)[0] + 1
+        xs = np.insert(x[points], breaks, np.nan)
+        ys = np.insert(y[points], breaks, np.nan)
+        return xs, ys
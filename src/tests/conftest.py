@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 測試以 src 為根目錄匯入模組（與 main.py 相同），圖形介面在離屏環境執行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
@@ -0,0 +1,14 @@
+from data import catalog
+
+
+def test_row_offsets_across_scan_blocks(tmp_path, monkeypatch):
+    path = tmp_path / 'log.csv'
+    lines = [b'Time,G Speed'] + [b'%d,%d' % (i, i * 10) for i in range(50)]
+    content = b'\n'.join(lines)
+    path.write_bytes(content)
+    monkeypatch.setattr(catalog, 'SCAN_BYTES', 7)
+
+    offsets = catalog._row_offsets(str(path), [0, 49, 20, 50, 3])
+
+    starts = [content.index(b'\n%s' % line) + 1 for line in lines[1:]]
+    assert offsets == [starts[0], starts[49], starts[20], None, starts[3]]
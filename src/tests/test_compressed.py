@@ -0,0 +1,32 @@
+import gzip
+
+from data.compressed import read_log
+
+CSV = b'Time,G Speed,SV\n10:00:00.000,1,7\n10:00:00.100,2,8'
+
+
+def test_read_log_plain_csv_without_trailing_newline(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_bytes(CSV)
+
+    data = read_log(str(path))
+
+    assert data['G Speed'].tolist() == [1, 2]
+
+
+def test_read_log_gzip_without_trailing_newline(tmp_path):
+    path = tmp_path / 'log.csv.gz'
+    path.write_bytes(gzip.compress(CSV))
+
+    data = read_log(str(path), chunksize=1)
+
+    assert data['G Speed'].tolist() == [1, 2]
+
+
+def test_read_log_ignores_missing_usecols(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_bytes(CSV)
+
+    data = read_log(str(path), usecols=['Time', 'SV', 'X'])
+
+    assert list(data.columns) == ['Time', 'SV']
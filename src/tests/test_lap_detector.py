@@ -0,0 +1,29 @@
+import numpy as np
+
+from data.lap_detector import LapDetector
+
+
+def _track(laps=4, samples=40):
+    """繞圈的軌跡，每圈開始時在起點停留超過最短單圈時間"""
+    angle = np.tile(np.linspace(0, 2 * np.pi, samples, endpoint=False), laps)
+    angle[np.arange(len(angle)) % samples < 15] = 0
+    x = np.cos(angle) * 0.01
+    y = np.sin(angle) * 0.01
+    time_ms = np.arange(len(angle)) * 1000.0
+    return x, y, time_ms
+
+
+def test_from_laps_continues_like_a_single_pass():
+    x, y, time_ms = _track()
+    reference = LapDetector(x[0], y[0], 0, time_ms[0], min_lap_seconds=10)
+    reference.feed(x[1:], y[1:], time_ms[1:], 1)
+    assert len(reference.laps) >= 3
+
+    for split in range(2, len(x)):
+        first = LapDetector(x[0], y[0], 0, time_ms[0], min_lap_seconds=10)
+        first.feed(x[1:split], y[1:split], time_ms[1:split], 1)
+        resumed = LapDetector.from_laps(x[0], y[0], 0, time_ms[0], first.laps,
+                                        x[:split], y[:split], min_lap_seconds=10)
+        resumed.feed(x[split:], y[split:], time_ms[split:], split)
+
+        assert resumed.laps == reference.laps, split
@@ -0,0 +1,72 @@
+from data.tail_follow import CsvTailFollower
+
+HEADER = b'Time,G Speed\n'
+
+
+def test_read_all_keeps_last_row_without_newline(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_bytes(HEADER + b'10:00:00.000,1\n10:00:00.100,2')
+
+    data = CsvTailFollower(str(path)).read_all()
+
+    assert data['G Speed'].tolist() == [1, 2]
+
+
+def test_poll_continues_after_unterminated_last_row(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_bytes(HEADER + b'10:00:00.000,1\n10:00:00.100,2')
+    follower = CsvTailFollower(str(path))
+    follower.read_all()
+
+    with open(path, 'ab') as f:
+        f.write(b'\n10:00:00.200,3\n10:00:00.3')
+    assert follower.poll()['G Speed'].tolist() == [3]
+
+    # 仍在寫入中的行等寫完才讀取
+    with open(path, 'ab') as f:
+        f.write(b'00,4\n')
+    assert follower.poll()['G Speed'].tolist() == [4]
+
+
+def test_poll_skips_rest_of_line_written_after_load(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_bytes(HEADER + b'10:00:00.000,1\n10:00:00.100,2')
+    follower = CsvTailFollower(str(path))
+    assert len(follower.read_all()) == 2
+
+    with open(path, 'ab') as f:
+        f.write(b'5\n10:00:00.200,3\n')
+    assert follower.poll()['G Speed'].tolist() == [3]
+
+
+def test_read_all_usecols(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_bytes(b'Time,G Speed,SV\n10:00:00.000,1,7\n')
+
+    follower = CsvTailFollower(str(path), usecols=['Time', 'SV', 'X'])
+
+    assert list(follower.read_all().columns) == ['Time', 'SV']
+    assert follower.columns == ['Time', 'G Speed', 'SV']
+
+
+def test_read_all_complete_lines_only_holds_back_last_row(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_bytes(HEADER + b'10:00:00.000,1\n10:00:00.1')
+    follower = CsvTailFollower(str(path))
+
+    assert follower.read_all(complete_lines_only=True)['G Speed'].tolist() == [1]
+
+    with open(path, 'ab') as f:
+        f.write(b'00,2\n')
+    assert follower.poll()['G Speed'].tolist() == [2]
+
+
+def test_resume_after_unterminated_row(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_bytes(HEADER + b'10:00:00.000,1')
+    follower = CsvTailFollower(str(path))
+    follower.resume(path.stat().st_size, ['Time', 'G Speed'])
+
+    with open(path, 'ab') as f:
+        f.write(b'\n10:00:00.100,2\n')
+    assert follower.poll()['G Speed'].tolist() == [2]
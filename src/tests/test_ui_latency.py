@@ -0,0 +1,14 @@
+from perf.benchmark import prepare_log, run_in_worker
+from perf.ui_latency import run_size
+
+
+def test_run_size_on_small_log(tmp_path):
+    """以小型的合成記錄檔完整執行一次互動延遲量測"""
+    log_info = prepare_log(2000, str(tmp_path))
+    result = run_in_worker(run_size, log_info, str(tmp_path), 2)
+
+    assert result['rows'] == 2000
+    assert result['load_seconds'] > 0
+    for name in ('track_click', 'plot_click', 'scroll', 'set_start_point'):
+        assert result['interactions'][name]['count'] >= 1
+    assert not [message for message in result['messages'] if message.startswith('錯誤')]
@@ -0,0 +1,113 @@
+import time
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QDateEdit,
+    QCheckBox, QDoubleSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtCore import Qt, QDate, pyqtSignal
+
+
+class CatalogSearchPanel(QDialog):
+    """搜尋記錄檔目錄中的單圈
+
+    可依日期、賽道（已儲存的起點）與最高速度篩選，結果依單圈時間排列，
+    雙擊結果時發出 lap_selected(檔案路徑, 單圈編號)。
+    """
+    lap_selected = pyqtSignal(str, int)
+
+    COLUMNS = ["檔案", "記錄時間", "單圈", "時間", "最高速度"]
+
+    def __init__(self, catalog, start_point_store, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.start_point_store = start_point_store
+        self.results = []
+        self.setWindowTitle("搜尋記錄")
+        self.resize(720, 480)
+
+        layout = QVBoxLayout(self)
+        filter_layout = QHBoxLayout()
+
+        self.date_check = QCheckBox("日期")
+        self.date_from = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.date_to = QDateEdit(QDate.currentDate())
+        for edit in (self.date_from, self.date_to):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd")
+        filter_layout.addWidget(self.date_check)
+        filter_layout.addWidget(self.date_from)
+        filter_layout.addWidget(QLabel("至"))
+        filter_layout.addWidget(self.date_to)
+
+        self.track_combo = QComboBox()
+        filter_layout.addWidget(QLabel("賽道"))
+        filter_layout.addWidget(self.track_combo)
+
+        self.speed_spin = QDoubleSpinBox()
+        self.speed_spin.setRange(0, 1000)
+        self.speed_spin.setSpecialValueText("不限")
+        filter_layout.addWidget(QLabel("最高速度 ≥"))
+        filter_layout.addWidget(self.speed_spin)
+
+        self.search_button = QPushButton("搜尋")
+        filter_layout.addWidget(self.search_button)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.search_button.clicked.connect(self.search)
+        self.table.cellDoubleClicked.connect(self._on_double_clicked)
+
+    def showEvent(self, event):
+        """每次顯示時重新讀取已儲存的起點"""
+        super().showEvent(event)
+        self.refresh_tracks()
+
+    def refresh_tracks(self):
+        current = self.track_combo.currentData()
+        self.track_combo.clear()
+        self.track_combo.addItem("全部", None)
+        for point in self.start_point_store.points:
+            self.track_combo.addItem(f"{point['x']:.5f}, {point['y']:.5f}", (point['x'], point['y']))
+        index = self.track_combo.findData(current)
+        self.track_combo.setCurrentIndex(max(index, 0))
+
+    def search(self):
+        """依目前的條件查詢目錄"""
+        try:
+            date_from = date_to = None
+            if self.date_check.isChecked():
+                date_from = self.date_from.date().toString("yyyy-MM-dd")
+                date_to = self.date_to.date().toString("yyyy-MM-dd")
+            min_speed = self.speed_spin.value() or None
+
+            started = time.perf_counter()
+            self.results = self.catalog.search_laps(date_from, date_to, self.track_combo.currentData(),
+                                                    min_speed=min_speed)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            self.table.setRowCount(len(self.results))
+            for row, lap in enumerate(self.results):
+                max_speed = lap['max_speed']
+                values = [lap['name'], lap['recorded_at'] or "", f"Run{lap['range_number']}",
+                          lap['duration_str'], "" if max_speed is None else f"{max_speed:.1f}"]
+                for column, value in enumerate(values):
+                    self.table.setItem(row, column, QTableWidgetItem(value))
+            self.status_label.setText(
+                f"共 {self.catalog.log_count} 個記錄檔，找到 {len(self.results)} 圈（{elapsed_ms:.1f} ms）")
+        except Exception as e:
+            print(f"搜尋記錄時出錯: {str(e)}")
+            self.status_label.setText(f"搜尋時出錯：{str(e)}")
+
+    def _on_double_clicked(self, row, column):
+        lap = self.results[row]
+        self.lap_selected.emit(lap['path'], lap['range_number'])
@@ -2,9 +2,10 @@
 
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QPushButton, QFileDialog,
-    QHBoxLayout, QLabel, QSpinBox, QMessageBox, QApplication, QListWidget, QListWidgetItem, QToolBar
+    QHBoxLayout, QLabel, QSpinBox, QMessageBox, QApplication, QListWidget, QListWidgetItem, QToolBar,
+    QInputDialog, QShortcut, QMenu, QActionGroup
 )
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIcon, QKeySequence
 from PyQt5.QtCore import Qt, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
@@ -12,10 +13,35 @@ import pandas as pd
 from matplotlib import rcParams
 import numpy as np
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+import os
 import sys
 from data.data_processor import DataProcessor
+from data.live_ingest import LiveIngestWorker, TelemetryRingBuffer, open_source
+from data.lap_detector import LapDetector
+from data.tail_follow import CsvTailFollower
+from data.append_buffer import FrameBuffers
+from data.session_cache import LARGE_LOG_BYTES, SessionCache, detect_laps, ingest_file
+from data.start_points import StartPointStore
+from data.folder_watcher import FolderWatcher
+from data.session_merge import load_log_files, merge_sessions
+from data.lazy_columns import PRIMARY_COLUMNS, ColumnLoader, ColumnLoadWorker, fit_length
+from data.compressed import LOG_FILE_FILTER, is_compressed, read_log
+from data.archive import ARCHIVE_FILE_FILTER, ARCHIVE_SUFFIX, ArchiveReader, is_archive, write_archive
+from data.catalog import SessionCatalog
+from data.timestamps import continue_time_ms, datetime_to_ms, ms_to_datetime, parse_time_ms
+from data.derived_channels import SMOOTHING_CHOICES, channel_title
+from data.channel_expressions import ExpressionError
 from plot.plot_manager import PlotManager
+from plot.redraw_scheduler import RedrawScheduler
+from plot.fonts import configure_matplotlib_fonts
+from plot.track_renderer import TrackRenderer
+from plot.lap_replay import LapReplay
+from plot.live_plotter import LivePlotter
 from ui.overlay_widget import OverlayWidget
+from ui.catalog_panel import CatalogSearchPanel
+from ui.perf_hud import PerformanceHud
+from perf import tracing
+from perf.profiler import action_profiler, profiled
 
 class MapViewer(QMainWindow):
     """主窗口類"""
@@ -43,6 +69,9 @@ class MapViewer(QMainWindow):
         self.y_range = (-1000, 1000)  # 設置默認Y軸範圍
         self.is_setting_start_point = False
         
+        # 所有畫布共用的重繪排程器
+        self.redraw_scheduler = RedrawScheduler(self)
+        
         # 設置高亮定時器
         self.highlight_timer = QTimer()
         self.highlight_timer.setSingleShot(True)
@@ -50,26 +79,96 @@ class MapViewer(QMainWindow):
         
         # 創建按鈕
         self.load_button = QPushButton("載入CSV")
+        self.export_button = QPushButton("匯出封存")
         self.set_start_button = QPushButton("設定起點")  # 在這裡創建按鈕
         self.update_button = QPushButton("更新圖表")
         self.switch_lap_button = QPushButton("切換單圈")
+        self.replay_button = QPushButton("回放單圈")
+        
+        # 回放倍速（1x 為實際速度）
+        self.replay_speed_spin = QSpinBox()
+        self.replay_speed_spin.setRange(1, 10)
+        self.replay_speed_spin.setSuffix("x")
+        self.replay_speed_spin.setToolTip("回放倍速")
+        self.lap_replay = None
+        
+        # 即時資料模式
+        self.live_button = QPushButton("即時模式")
+        self.live_source_spec = 'udp://0.0.0.0:5005'
+        self.live_worker = None
+        self.live_plotter = None
+        self.live_buffer = None
+        self.live_lap_detector = None
+        
+        # 追蹤持續寫入中的檔案，只解析新增的完整行
+        self.follow_button = QPushButton("追蹤檔案")
+        self.follow_button.setCheckable(True)
+        self.follow_button.setToolTip("檔案持續寫入時自動載入新增的數據")
+        self.tail_follower = None
+        # 追蹤時附加數據用的欄位緩衝區，每次只寫入新增的筆數
+        self.frame_buffers = FrameBuffers()
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(1000)
+        self.follow_timer.timeout.connect(self._on_follow_timer)
+        
+        # 監看資料夾：新記錄檔在背景預先解析到快取，開啟時直接讀取快取
+        self.watch_button = QPushButton("監看資料夾")
+        self.watch_button.setCheckable(True)
+        self.session_cache = SessionCache()
+        self.start_point_store = StartPointStore()
+        self.folder_watcher = None
+        
+        # 記錄檔目錄：監看資料夾解析的檔案與單圈，可搜尋後直接開啟
+        self.search_button = QPushButton("搜尋記錄")
+        self.session_catalog = SessionCatalog()
+        self.catalog_panel = None
+        
+        # 主圖表額外顯示的通道（衍生通道等），從選單勾選
+        self.channels_button = QPushButton("通道")
+        self.channels_menu = QMenu(self)
+        self.channels_menu.aboutToShow.connect(self._populate_channels_menu)
+        self.channels_button.setMenu(self.channels_menu)
+        
+        # 載入時只讀取繪圖所需欄位，其餘欄位在需要時於背景載入
+        self.column_loader = None
+        self.column_worker = None
+        # 等待欄位載入的請求：(欄位, 載入後的回呼)
+        self._column_requests = []
         
         # 設置UI
         self._init_ui()
         
         # 連接按鈕信號
         self.load_button.clicked.connect(self.load_csv)
+        self.export_button.clicked.connect(self.export_archive)
         self.set_start_button.clicked.connect(self.start_setting_start_point)
         self.update_button.clicked.connect(self.update_data_range)
         self.switch_lap_button.clicked.connect(self.switch_lap)
+        self.replay_button.clicked.connect(self.toggle_replay)
+        self.replay_speed_spin.valueChanged.connect(self._on_replay_speed_changed)
+        self.live_button.clicked.connect(self.toggle_live_mode)
+        self.follow_button.toggled.connect(self._on_follow_toggled)
+        self.watch_button.toggled.connect(self._on_watch_toggled)
+        self.search_button.clicked.connect(self.show_catalog_search)
         
         print("初始化完成：按鈕信號已連接")
 
         # 創建圖表管理器並設置回調
-        self.plot_manager = PlotManager(self.figure)
+        self.plot_manager = PlotManager(self.figure, self.redraw_scheduler)
         self.plot_manager.set_click_callback(self._on_plot_clicked)
         self.plot_manager.set_range_update_callback(self.update_range_list)
 
+        # 效能監看面板（F12 切換），重繪耗時以畫布名稱記錄
+        self.redraw_scheduler.set_canvas_name(self.canvas, 'main')
+        self.redraw_scheduler.set_canvas_name(self.track_canvas, 'track')
+        self.perf_hud = PerformanceHud(self, self.central_widget)
+        self.perf_hud_shortcut = QShortcut(QKeySequence(Qt.Key_F12), self)
+        self.perf_hud_shortcut.activated.connect(self.perf_hud.toggle)
+        # 隱藏功能：逐項操作的效能分析（Ctrl+Shift+P 切換）
+        self.profiler_shortcut = QShortcut(QKeySequence("Ctrl+Shift+P"), self)
+        self.profiler_shortcut.activated.connect(self.toggle_action_profiler)
+        action_profiler.finish_callback = self.redraw_scheduler.flush
+
         # 設置 check_list 的選取模式
         self.check_list.setSelectionMode(QListWidget.NoSelection)  # 禁用選取反白
         self.check_list.setFocusPolicy(Qt.NoFocus)  # 禁用焦點顯示
@@ -122,7 +221,19 @@ class MapViewer(QMainWindow):
         """
         
         # 添加按鈕到頂部布局
-        for button in [self.load_button, self.set_start_button, self.update_button, self.switch_lap_button]:
+        for button in [self.load_button, self.export_button, self.set_start_button, self.update_button,
+                       self.switch_lap_button, self.replay_button]:
+            button.setStyleSheet(button_style)
+            top_button_layout.addWidget(button)
+        top_button_layout.addWidget(self.replay_speed_spin)
+        for button in [self.follow_button, self.watch_button]:
+            button.setStyleSheet(button_style + """
+                QPushButton:checked {
+                    background-color: #28a745;
+                }
+            """)
+            top_button_layout.addWidget(button)
+        for button in [self.channels_button, self.search_button, self.live_button]:
             button.setStyleSheet(button_style)
             top_button_layout.addWidget(button)
         top_button_layout.addStretch()
@@ -142,6 +253,9 @@ class MapViewer(QMainWindow):
         plot_layout = QVBoxLayout(plot_container)
         plot_layout.setContentsMargins(10, 10, 10, 10)
         
+        # 設置字體（在建立任何文字之前）
+        configure_matplotlib_fonts()
+
         # 創建主圖表（只包含三個垂直子圖）
         self.figure = Figure(figsize=(10, 6))
         self.axes = self.figure.subplots(3, 1)  # 只創建三個垂直排列的子圖
@@ -150,9 +264,6 @@ class MapViewer(QMainWindow):
         for ax in self.axes:
             ax.set_title("")
         
-        # 設置字體
-        rcParams['font.family'] = ['Microsoft JhengHei', 'Noto Sans TC', 'DFKai-SB', 'sans-serif']
-        rcParams['axes.unicode_minus'] = False
         rcParams['axes.titley'] = 1.0
         rcParams['axes.titlepad'] = -14
         
@@ -174,7 +285,7 @@ class MapViewer(QMainWindow):
         self.track_home_limits = None  # 添加這行來存儲初始視圖範圍
         
         # 創建圖表管理器並設置回調
-        self.plot_manager = PlotManager(self.figure)
+        self.plot_manager = PlotManager(self.figure, self.redraw_scheduler)
         self.plot_manager.set_click_callback(self._on_plot_clicked)
         
         main_layout.addWidget(plot_container)
@@ -270,6 +381,8 @@ class MapViewer(QMainWindow):
         
         # 初始化追蹤點
         self.track_point = None
+        # 軌跡渲染器（視窗裁切與縮放層級簡化）
+        self.track_renderer = None
         
         # 設置底部區域的寬度比例（左側列表:右側軌跡圖 = 1:2）
         bottom_layout.addWidget(self.check_list, 1)
@@ -283,6 +396,7 @@ class MapViewer(QMainWindow):
         main_layout.setStretch(1, 2)  # 主圖表區域佔2
         main_layout.setStretch(2, 1)  # 底部區域佔1
 
+    @tracing.traced('item_changed', 'ui')
     def on_item_changed(self, item):
         """處理列表項勾選狀態變化"""
         try:
@@ -309,7 +423,7 @@ class MapViewer(QMainWindow):
                 self.plot_manager.remove_range_highlight(item_data['id'])
             
             # 重繪圖表
-            self.canvas.draw()
+            self.redraw_scheduler.request(self.canvas)
             
         except Exception as e:
             print(f"處理列表項變化時出錯: {str(e)}")
@@ -431,7 +545,7 @@ class MapViewer(QMainWindow):
         self.right_layout.addWidget(right_container)
         
         # 創建圖表管理器並設置回調
-        self.plot_manager = PlotManager(self.figure)
+        self.plot_manager = PlotManager(self.figure, self.redraw_scheduler)
         self.plot_manager.set_click_callback(self._on_plot_clicked)
         
         # 連接軌跡圖的點擊事件
@@ -546,6 +660,7 @@ class MapViewer(QMainWindow):
     def update_data_range(self):
         """更新數據範圍"""
         try:
+            self._stop_replay()
             if not hasattr(self, 'full_data'):
                 print("錯誤：沒有載入數據")
                 QMessageBox.warning(self, "警告", "請先載入數據")
@@ -567,8 +682,8 @@ class MapViewer(QMainWindow):
             self.plot_manager.create_plots()
             
             # 確保重新繪製所有圖表
-            self.canvas.draw()
-            self.track_canvas.draw()
+            self.redraw_scheduler.request(self.canvas)
+            self.redraw_scheduler.request(self.track_canvas)
             self._update_track_ax()
             print("圖表更新完成")
             
@@ -644,42 +759,112 @@ class MapViewer(QMainWindow):
 
     def load_csv(self):
         """載入 CSV 文件"""
+        # 選擇文件（可多選，同一天分成多個檔案時合併為單一數據）
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self,
+            "選擇 CSV 文件",
+            "",
+            LOG_FILE_FILTER
+        )
+        
+        if file_paths:
+            self.load_files(file_paths)
+    
+    @tracing.traced('load_files', 'load')
+    @profiled('load')
+    def load_files(self, file_paths):
+        """載入記錄檔，回傳是否成功"""
         try:
-            # 選擇文件
-            file_path, _ = QFileDialog.getOpenFileName(
-                self,
-                "選擇 CSV 文件",
-                "",
-                "CSV 文件 (*.csv);;所有文件 (*.*)"
-            )
-            
-            if not file_path:
-                return
-                
+            self._stop_replay()
             print("\n=== 開始載入 CSV 文件 ===")
-            print(f"文件路徑: {file_path}")
+            for file_path in file_paths:
+                print(f"文件路徑: {file_path}")
             
-            # 讀取 CSV 文件
-            self.full_data = pd.read_csv(file_path)
+            # 只讀取繪圖與分析需要的欄位，其餘欄位稍後在背景載入
+            self._discard_column_loader()
+            cache_meta = None
+            file_boundaries = []
+            block_stats = {}
+            track_importance = None
+            if len(file_paths) > 1:
+                # 以工作程序池同時解析各檔案，再依時間順序合併
+                frames = load_log_files(file_paths, self.session_cache.root, PRIMARY_COLUMNS)
+                self.full_data, file_boundaries = merge_sessions(file_paths, frames)
+                self.tail_follower = None  # 合併的數據不追蹤檔案
+            else:
+                # 優先使用背景預先解析的快取，否則讀取 CSV 文件；
+                # 兩者都記住讀取位置供追蹤模式接續
+                file_path = file_paths[0]
+                # 壓縮檔邊解壓邊解析、封存檔不是文字格式，兩者都不能追蹤
+                followable = not (is_compressed(file_path) or is_archive(file_path))
+                self.tail_follower = CsvTailFollower(file_path, usecols=PRIMARY_COLUMNS) if followable else None
+                self.frame_buffers = FrameBuffers()
+                # 快取以記憶體映射開啟，只有顯示或分析到的部分會被讀入
+                cached = self.session_cache.load(file_path, PRIMARY_COLUMNS, mmap=True)
+                if cached is None and not is_archive(file_path) and os.path.getsize(file_path) >= LARGE_LOG_BYTES:
+                    # 大型記錄檔整個載入會耗盡記憶體，先串流解析到快取
+                    print("大型記錄檔，先解析到快取")
+                    ingest_file(file_path, self.session_cache.root)
+                    cached = self.session_cache.load(file_path, PRIMARY_COLUMNS, mmap=True)
+                if cached is not None:
+                    self.full_data, cache_meta = cached
+                    block_stats = self.session_cache.load_blocks(file_path)
+                    track_importance = self.session_cache.load_track_importance(file_path)
+                    if self.tail_follower is not None:
+                        self.tail_follower.resume(cache_meta['parsed_bytes'] or 0,
+                                                  [column['name'] for column in cache_meta['columns']])
+                    print("已從快取載入")
+                elif is_archive(file_path):
+                    # 封存檔中記錄的單圈與快取的格式相同，載入後直接套用
+                    archive = ArchiveReader(file_path)
+                    self.full_data = archive.read(PRIMARY_COLUMNS)
+                    cache_meta = archive.meta
+                    print("已從封存檔載入")
+                elif self.tail_follower is None:
+                    self.full_data = read_log(file_path, usecols=PRIMARY_COLUMNS)
+                else:
+                    # 追蹤中的檔案最後一行可能仍在寫入，留待追蹤時讀取
+                    self.full_data = self.tail_follower.read_all(
+                        complete_lines_only=self.follow_button.isChecked())
+            self._on_follow_toggled(self.follow_button.isChecked())
+            self.plot_manager.file_boundaries = file_boundaries
+            
+            ordered_paths = [boundary['path'] for boundary in file_boundaries] or file_paths
+            # 其餘欄位在第一次需要時才於背景讀取（request_columns）
+            self.column_loader = ColumnLoader(ordered_paths, self.full_data.columns, self.session_cache)
             print(f"載入數據總長度: {len(self.full_data)} 筆")
             
+            # 單一且有快取的記錄檔，解碼通道的結果一併保存在快取中
+            cached_file = len(file_paths) == 1 and self.session_cache.is_fresh(file_paths[0])
+            self.plot_manager.derived_channels.session = (self.session_cache, file_paths[0]) if cached_file else None
+            # 已選取的通道所需的欄位（例如 raw1..raw4）不在優先載入的欄位中，
+            # 在背景載入後重繪通道
+            if self.plot_manager.extra_channels and not self._has_columns(self._channel_sources()):
+                self._replot_channels()
+            
             # 更新主圖表（三個垂直子圖）
             self.plot_manager.data_list = [self.full_data]
+            self.plot_manager.block_stats = block_stats
             self.plot_manager.create_plots()
-            self.canvas.draw()
+            self.redraw_scheduler.request(self.canvas)
             
             # 更新位置軌跡圖（底部右方）
             self.track_ax.clear()
             if 'X' in self.full_data.columns and 'Y' in self.full_data.columns:
                 print("繪製位置軌跡圖 (X-Y)")
-                self.track_ax.plot(self.full_data['X'], self.full_data['Y'], 
-                                 'b-', linewidth=1.5, zorder=1)
+                self.track_renderer = TrackRenderer(
+                    self.track_ax, self.full_data['X'], self.full_data['Y'],
+                    color='b', linestyle='-', linewidth=1.5, zorder=1)
                 self.track_ax.set_xlabel('X', fontsize=10)
                 self.track_ax.set_ylabel('Y', fontsize=10)
             elif 'Longitude' in self.full_data.columns and 'Latitude' in self.full_data.columns:
                 print("繪製位置軌跡圖 (經緯度)")
-                self.track_ax.plot(self.full_data['Longitude'], self.full_data['Latitude'], 
-                                 'b-', linewidth=1.5, zorder=1)
+                importance = None
+                if track_importance is not None and track_importance[:2] == ('Longitude', 'Latitude'):
+                    importance = track_importance[2]
+                self.track_renderer = TrackRenderer(
+                    self.track_ax, self.full_data['Longitude'], self.full_data['Latitude'],
+                    importance=importance, color='b', linestyle='-', linewidth=1.5, zorder=1)
                 self.track_ax.set_xlabel('經度', fontsize=10)
                 self.track_ax.set_ylabel('緯度', fontsize=10)
             
@@ -715,7 +900,7 @@ class MapViewer(QMainWindow):
                         pass  # 如果沒有連接的信號，忽略錯誤
                     action.triggered.connect(self._track_home)
             
-            self.track_canvas.draw()
+            self.redraw_scheduler.request(self.track_canvas)
             
             print("已設置初始視圖範圍：", self.track_home_limits)
             
@@ -725,24 +910,391 @@ class MapViewer(QMainWindow):
             # 新增：更新布局
             self.track_figure.tight_layout()
             
+            # 快取中有依已存起點計算的單圈時直接套用
+            if cache_meta is not None and cache_meta.get('start_point') and cache_meta.get('laps') is not None:
+                self.plot_manager.set_start_point(cache_meta['start_point']['index'], self.track_ax,
+                                                  self.track_canvas, laps=cache_meta['laps'])
+            
             print("=== CSV 文件載入完成 ===\n")
+            return True
             
         except Exception as e:
             print(f"載入 CSV 文件時出錯: {str(e)}")
             QMessageBox.critical(self, "錯誤", f"無法載入文件：{str(e)}")
+            return False
+
+    def export_archive(self):
+        """將目前的數據（含已設定起點的單圈）匯出為封存檔"""
+        try:
+            if not hasattr(self, 'full_data'):
+                QMessageBox.warning(self, "警告", "請先載入數據")
+                return
+            
+            file_path, _ = QFileDialog.getSaveFileName(self, "匯出封存檔", "", ARCHIVE_FILE_FILTER)
+            if not file_path:
+                return
+            if not is_archive(file_path):
+                file_path += ARCHIVE_SUFFIX
+            
+            # 封存完整數據，尚未載入的欄位在背景讀取後才寫入
+            pending = self.column_loader.pending_columns() if self.column_loader is not None else []
+            self.request_columns(pending, lambda available: self._write_archive(file_path))
+            
+        except Exception as e:
+            print(f"匯出封存檔時出錯: {str(e)}")
+            QMessageBox.critical(self, "錯誤", f"無法匯出封存檔：{str(e)}")
+    
+    def _write_archive(self, file_path):
+        """將目前的數據寫入封存檔"""
+        try:
+            laps = None
+            start_point = None
+            start_index = self.plot_manager.start_point
+            if self.plot_manager.has_start_point_set and start_index is not None:
+                x_col = 'X' if 'X' in self.full_data.columns else 'Longitude'
+                y_col = 'Y' if 'Y' in self.full_data.columns else 'Latitude'
+                laps = detect_laps(self.full_data, start_index,
+                                   file_boundaries=self.plot_manager.file_boundaries)
+                start_point = {'x': float(self.full_data[x_col].iloc[start_index]),
+                               'y': float(self.full_data[y_col].iloc[start_index]),
+                               'index': int(start_index)}
+            
+            # 衍生通道可由原始欄位重新計算，不寫入封存檔
+            derived = self.plot_manager.derived_channels.derived_columns(self.full_data)
+            meta = write_archive(file_path, self.full_data.drop(columns=derived), laps=laps, start_point=start_point)
+            lap_text = f"，{len(laps)} 圈" if laps is not None else ""
+            print(f"已匯出封存檔 {file_path}：{meta['rows']} 筆數據{lap_text}")
+            
+        except Exception as e:
+            print(f"匯出封存檔時出錯: {str(e)}")
+            QMessageBox.critical(self, "錯誤", f"無法匯出封存檔：{str(e)}")
+    
+    def _discard_column_loader(self):
+        """放棄尚未載入的欄位（數據已被取代），進行中的背景載入結果不再使用"""
+        self.column_loader = None
+        self.column_worker = None
+        self._column_requests = []
+    
+    def _has_columns(self, names):
+        return hasattr(self, 'full_data') and all(name in self.full_data.columns for name in names)
+    
+    def request_columns(self, names, callback=None):
+        """確保指定欄位已載入，尚未載入的欄位在背景從記錄檔讀取
+
+        欄位可用後（或無法再載入時）在介面執行緒呼叫 callback(是否全部可用)；
+        不需載入時立即呼叫。
+        """
+        if not hasattr(self, 'full_data'):
+            return
+        loader = self.column_loader
+        pending = loader.pending_columns() if loader is not None else []
+        if not any(name in pending for name in names if name not in self.full_data.columns):
+            if callback is not None:
+                callback(self._has_columns(names))
+            return
+        self._column_requests.append((list(names), callback))
+        if self.column_worker is None:
+            needed = [name for request, _ in self._column_requests for name in request
+                      if name in pending and name not in self.full_data.columns]
+            worker = ColumnLoadWorker(loader, dict.fromkeys(needed), parent=self)
+            worker.loaded.connect(lambda columns, worker=worker: self._on_columns_loaded(worker, columns))
+            worker.error.connect(lambda message, worker=worker: self._on_columns_error(worker, message))
+            worker.finished.connect(worker.deleteLater)
+            self.column_worker = worker
+            worker.start()
+    
+    def _on_columns_loaded(self, worker, columns):
+        """背景載入的欄位併入目前的數據，再處理等待中的請求"""
+        if worker is not self.column_worker:
+            return
+        self.column_worker = None
+        for name, values in columns.items():
+            if name not in self.full_data.columns:
+                self.full_data[name] = fit_length(values, len(self.full_data))
+        # 之後追蹤檔案時一併解析新載入的欄位
+        if columns and self.tail_follower is not None and self.tail_follower.usecols is not None:
+            self.tail_follower.usecols = list(self.tail_follower.usecols) + list(columns)
+        # 載入期間加入的請求可能需要其他欄位，重新提出
+        requests, self._column_requests = self._column_requests, []
+        for names, callback in requests:
+            self.request_columns(names, callback)
+    
+    def _on_columns_error(self, worker, message):
+        """背景載入失敗，等待中的請求以目前可用的欄位繼續"""
+        if worker is not self.column_worker:
+            return
+        self.column_worker = None
+        print(f"載入欄位時出錯: {message}")
+        requests, self._column_requests = self._column_requests, []
+        for names, callback in requests:
+            if callback is not None:
+                callback(self._has_columns(names))
+    
+    def _populate_channels_menu(self):
+        """依目前可用的通道重建通道選單"""
+        menu = self.channels_menu
+        menu.clear()
+        selected = self.plot_manager.extra_channels
+        for name in self.plot_manager.derived_channels.names():
+            action = menu.addAction(channel_title(name))
+            action.setCheckable(True)
+            action.setChecked(name in selected)
+            action.toggled.connect(lambda checked, name=name: self._on_channel_toggled(name, checked))
+        
+        menu.addSeparator()
+        menu.addAction("新增運算式通道...").triggered.connect(self._add_expression_channel)
+        expressions = list(self.plot_manager.derived_channels.expressions)
+        if expressions:
+            remove_menu = menu.addMenu("移除運算式通道")
+            for name in expressions:
+                remove_menu.addAction(name).triggered.connect(
+                    lambda checked, name=name: self._remove_expression_channel(name))
+        
+        menu.addSeparator()
+        smoothing_menu = menu.addMenu("衍生通道平滑")
+        group = QActionGroup(smoothing_menu)
+        current = self.plot_manager.derived_channels.smoothing_s
+        for window_s in SMOOTHING_CHOICES:
+            action = smoothing_menu.addAction(f"{window_s:g} 秒" if window_s else "不平滑")
+            action.setCheckable(True)
+            action.setChecked(window_s == current)
+            group.addAction(action)
+            action.triggered.connect(lambda checked, window_s=window_s: self._on_smoothing_selected(window_s))
+    
+    def _on_channel_toggled(self, name, checked):
+        """勾選或取消通道選單中的通道"""
+        channels = [channel for channel in self.plot_manager.extra_channels if channel != name]
+        if checked:
+            channels.append(name)
+        self.set_extra_channels(channels)
+    
+    def _add_expression_channel(self):
+        """輸入運算式（例如 R Scale 1 - R Scale 2、G Speed * 0.2778）並顯示為通道"""
+        if not hasattr(self, 'full_data'):
+            QMessageBox.warning(self, "警告", "請先載入數據")
+            return
+        text, ok = QInputDialog.getText(
+            self, "新增運算式通道",
+            "運算式（欄位名稱可含空白或寫成 [欄位]；可用 + - * / ** 、比較、abs、sqrt、where 等；Time 為秒）：")
+        if not ok or not text.strip():
+            return
+        # 運算式可能引用尚未載入的欄位，只讀取標題取得欄位名稱
+        derived = self.plot_manager.derived_channels
+        columns = [name for name in self.full_data.columns if not derived.is_derived(name)]
+        if self.column_loader is not None:
+            columns.extend(self.column_loader.pending_columns())
+        try:
+            name = derived.add_expression(text, columns)
+        except ExpressionError as e:
+            QMessageBox.warning(self, "運算式錯誤", str(e))
+            return
+        sources = derived.sources(name) if derived.is_derived(name) else [name]
+        self.request_columns(sources, lambda available: self._show_expression_channel(name))
+    
+    def _show_expression_channel(self, name):
+        """運算式所需的欄位載入後先試算一次，成功時加入顯示的通道"""
+        derived = self.plot_manager.derived_channels
+        if derived.is_derived(name):
+            try:
+                derived.values(self.full_data, name)
+            except (ExpressionError, KeyError) as e:
+                derived.remove_expression(name)
+                QMessageBox.warning(self, "運算式錯誤", str(e))
+                return
+        if name not in self.plot_manager.extra_channels:
+            self.set_extra_channels(self.plot_manager.extra_channels + [name])
+    
+    def _remove_expression_channel(self, name):
+        """移除運算式通道，顯示中時一併從圖表移除"""
+        channels = self.plot_manager.extra_channels
+        self.plot_manager.derived_channels.remove_expression(name)
+        if name in self.full_data.columns:
+            self.full_data.drop(columns=[name], inplace=True)
+        if name in channels:
+            self.set_extra_channels([channel for channel in channels if channel != name])
+    
+    def _on_smoothing_selected(self, window_s):
+        """改變衍生通道的平滑視窗"""
+        self.plot_manager.set_smoothing(window_s)
+        if self.plot_manager.extra_channels:
+            self._replot_channels()
+    
+    def set_extra_channels(self, names):
+        """設定主圖表在速度與 R Scale 之外額外顯示的通道並重繪"""
+        self.plot_manager.set_extra_channels(names)
+        self._replot_channels()
+    
+    def _channel_sources(self):
+        """額外通道計算所需的數據欄位"""
+        derived = self.plot_manager.derived_channels
+        needed = []
+        for name in self.plot_manager.extra_channels:
+            needed.extend(derived.sources(name) if derived.is_derived(name) else [name])
+        return list(dict.fromkeys(needed))
+    
+    def _replot_channels(self):
+        """通道改變後重繪主圖表，通道所需的欄位尚未載入時在背景載入後才重繪"""
+        if not hasattr(self, 'full_data'):
+            return
+        self.request_columns(self._channel_sources(), self._on_channel_sources_loaded)
+    
+    def _on_channel_sources_loaded(self, available):
+        """重繪主圖表：單圈模式重新繪製選取的Run，否則重建總覽圖並保留起點與Run高亮"""
+        if not available:
+            missing = [name for name in self._channel_sources() if name not in self.full_data.columns]
+            print(f"數據中沒有通道所需的欄位: {', '.join(missing)}")
+        try:
+            channels = self.plot_manager.extra_channels
+            with tracing.span('replot_channels', 'ui', channels=list(channels)):
+                if getattr(self.plot_manager, 'current_checked_items', None):
+                    self.switch_lap()
+                    return
+                self.plot_manager.refresh_plots()
+                for i in range(self.check_list.count()):
+                    item = self.check_list.item(i)
+                    if item.checkState() == Qt.Checked:
+                        self.on_item_changed(item)
+                self.redraw_scheduler.request(self.canvas)
+        except Exception as e:
+            print(f"更新通道時出錯: {str(e)}")
+            import traceback
+            traceback.print_exc()
+    
+    def _on_watch_toggled(self, checked):
+        """開始或停止監看資料夾"""
+        if not checked:
+            if self.folder_watcher is not None:
+                self.folder_watcher.stop()
+                self.folder_watcher = None
+                print("已停止監看資料夾")
+            return
+        
+        folder = QFileDialog.getExistingDirectory(self, "選擇要監看的資料夾")
+        if not folder:
+            self.watch_button.setChecked(False)
+            return
+        self.folder_watcher = FolderWatcher(folder, self.session_cache, catalog=self.session_catalog, parent=self)
+        self.folder_watcher.file_ingested.connect(self._on_file_ingested)
+        self.folder_watcher.start()
+        print(f"開始監看資料夾: {folder}")
+    
+    def _on_file_ingested(self, path, summary):
+        """背景解析完成的回調"""
+        laps = summary.get('laps')
+        lap_text = f"，{laps} 圈" if laps is not None else ""
+        print(f"已預先解析 {path}：{summary.get('rows')} 筆數據{lap_text}")
+    
+    def show_catalog_search(self):
+        """顯示記錄檔目錄的搜尋面板"""
+        if self.catalog_panel is None:
+            self.catalog_panel = CatalogSearchPanel(self.session_catalog, self.start_point_store, self)
+            self.catalog_panel.lap_selected.connect(self._on_catalog_lap_selected)
+        self.catalog_panel.show()
+        self.catalog_panel.raise_()
+    
+    def _on_catalog_lap_selected(self, path, range_number):
+        """開啟搜尋結果的記錄檔並勾選該單圈"""
+        if not self.load_files([path]):
+            return
+        for row in range(self.check_list.count()):
+            item = self.check_list.item(row)
+            if item.data(Qt.UserRole)['id'] == range_number:
+                item.setCheckState(Qt.Checked)
+                break
+        else:
+            print(f"記錄檔中沒有 Run{range_number}（請重新設定起點）")
+    
+    def _on_follow_toggled(self, checked):
+        """切換是否追蹤檔案的新增數據"""
+        if checked and self.tail_follower is not None:
+            self.follow_timer.start()
+        else:
+            self.follow_timer.stop()
+    
+    def _on_follow_timer(self):
+        """定時讀取檔案新增的完整行並附加到目前的數據"""
+        if self.tail_follower is None or self.live_worker is not None:
+            return
+        try:
+            new_rows = self.tail_follower.poll()
+        except OSError as e:
+            print(f"追蹤檔案時出錯: {str(e)}")
+            return
+        if self.tail_follower.truncated:
+            print("檔案已被截斷或重新建立，停止追蹤")
+            self.follow_button.setChecked(False)
+            return
+        if not new_rows.empty:
+            self._append_rows(new_rows)
+    
+    def _append_rows(self, new_rows):
+        """將新增的數據附加到目前的數據，並增量更新圖表、軌跡與單圈
+
+        各欄位保存在可增長的緩衝區，只寫入新增的筆數，不重新串接整個記錄；
+        衍生通道不保留，由 extend_plots 重新計算。
+        """
+        previous_length = len(self.full_data)
+        time_ms = None
+        # 分析單圈後 Time 欄位已轉為 datetime，新數據需一致，並接續之前的跨越午夜
+        times = self.full_data['Time']
+        if pd.api.types.is_datetime64_any_dtype(times):
+            last = previous_length - 1 if previous_length and pd.notna(times.iloc[-1]) else times.last_valid_index()
+            last_ms = None if last is None else datetime_to_ms(times.iloc[[last]].to_numpy())[0]
+            time_ms = continue_time_ms(parse_time_ms(new_rows['Time']), last_ms)
+            new_rows['Time'] = ms_to_datetime(time_ms)
+        derived = self.plot_manager.derived_channels
+        self.full_data = self.frame_buffers.append(
+            self.full_data, new_rows, exclude=[name for name in self.full_data.columns if derived.is_derived(name)])
+        
+        self.plot_manager.extend_plots(self.full_data, previous_length)
+        renderer = getattr(self, 'track_renderer', None)
+        if renderer is not None and renderer.line.axes is not None:
+            x_col = 'X' if 'X' in new_rows.columns else 'Longitude'
+            y_col = 'Y' if 'Y' in new_rows.columns else 'Latitude'
+            renderer.extend(new_rows[x_col], new_rows[y_col])
+            self.redraw_scheduler.request(self.track_canvas)
+        
+        for range_info in self.plot_manager.extend_laps(self.full_data, previous_length, time_ms):
+            self._add_range_item(range_info)
+            print(f"完成 Run{range_info['range_number']}，時間 {range_info['duration_str']}")
+        print(f"已附加 {len(new_rows)} 筆新數據，共 {len(self.full_data)} 筆")
+
+    def toggle_action_profiler(self):
+        """開始或停止逐項操作的效能分析"""
+        suffix = " [效能分析中]"
+        title = self.windowTitle().replace(suffix, "")
+        if action_profiler.toggle():
+            self.setWindowTitle(title + suffix)
+            print(f"開始效能分析，每項操作的結果寫入 {action_profiler.directory}")
+        else:
+            self.setWindowTitle(title)
+            print(f"停止效能分析，共寫入 {len(action_profiler.written)} 個分析檔")
 
     def resizeEvent(self, event):
         """窗口大小改變時調整遮罩層"""
         super().resizeEvent(event)
+        if hasattr(self, 'perf_hud') and self.perf_hud.isVisible():
+            self.perf_hud.setGeometry(self.central_widget.rect())
         if hasattr(self, 'overlay'):
             self.overlay.resize(self.central_widget.size())
+    
+    def closeEvent(self, event):
+        """關閉窗口時停止背景工作"""
+        if self.folder_watcher is not None:
+            self.folder_watcher.stop()
+            self.folder_watcher = None
+        if self.live_worker is not None:
+            self.live_worker.stop()
+        if self.column_worker is not None:
+            self.column_worker.wait()
+        self._discard_column_loader()
+        super().closeEvent(event)
 
     def _on_plot_clicked(self, index):
         """處理主圖表點擊回調"""
         try:
             # 清除舊的標記點並更新軌跡圖
             self.plot_manager.update_track_point(index, self.track_ax, self.track_canvas)
-            print(f"已更新軌跡圖上的點 class name _on_plot_clicked")
         except Exception as e:
             print(f"處理主圖表點擊回調時出錯: {str(e)}")
             import traceback
@@ -803,7 +1355,7 @@ class MapViewer(QMainWindow):
         
             # 清除軌跡圖上的起點標記
             self.plot_manager.clear_start_point()
-            self.track_canvas.draw()  # 立即更新軌跡圖顯示
+            self.redraw_scheduler.request(self.track_canvas)  # 更新軌跡圖顯示
         
         # UI 狀態管理
         self.is_setting_start_point = True
@@ -811,8 +1363,13 @@ class MapViewer(QMainWindow):
         # 委託 PlotManager 處理數據相關操作
         self.plot_manager.enable_start_point_selection()
 
+    @tracing.traced('track_click', 'ui')
+    @profiled(lambda self, event: 'set_start_point' if self.is_setting_start_point else 'track_click')
     def _on_track_click(self, event):
         """處理軌跡圖點擊事件"""
+        if self.live_worker is not None:
+            self._on_live_track_click(event)
+            return
         if event.inaxes != self.track_ax or not hasattr(self, 'full_data'):
             return
         
@@ -831,21 +1388,18 @@ class MapViewer(QMainWindow):
             if self.is_setting_start_point:
                 # 委託 PlotManager 處理數據相關操作
                 self.plot_manager.set_start_point(nearest_idx, self.track_ax, self.track_canvas)
+                # 記住起點，之後同一賽道的新檔案可預先計算單圈
+                try:
+                    self.start_point_store.save(x, y)
+                except OSError as e:
+                    print(f"儲存起點時出錯: {str(e)}")
                 # UI 狀態管理保留在 MapViewer
                 self.is_setting_start_point = False
                 self.set_start_button.setText("設定起點")
-                print(f"已在軌跡圖上設定起點:")
-                print(f"索引: {nearest_idx}")
-                print(f"經度: {x:.6f}")
-                print(f"緯度: {y:.6f}")
+                print(f"已在軌跡圖上設定起點: 索引 {nearest_idx}, 經度 {x:.6f}, 緯度 {y:.6f}")
             else:
                 # 委託 PlotManager 處理數據相關操作
                 self.plot_manager.update_track_point(nearest_idx, self.track_ax, self.track_canvas)
-                print(f"已更新軌跡圖上的點 def name : _on_track_click ")
-                print(f"已更新顯示位置:")
-                print(f"索引: {nearest_idx}")
-                print(f"經度: {x:.6f}")
-                print(f"緯度: {y:.6f}")
 
         except Exception as e:
             print(f"處理軌跡圖點擊時出錯: {str(e)}")
@@ -856,13 +1410,17 @@ class MapViewer(QMainWindow):
         """更新範圍列表"""
         self.check_list.clear()
         for range_info in ranges:
-            # 創建列表項，格式：範圍1, 時間 00:00:00
-            item_text = f"Run{range_info['range_number']}, 時間 {range_info['duration_str']}"
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, {"id": range_info['range_number'], "description": f"start_index:{range_info['start_index']},end_index:{range_info['end_index']}"})
-            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-            item.setCheckState(Qt.Unchecked)
-            self.check_list.addItem(item)
+            self._add_range_item(range_info)
+    
+    def _add_range_item(self, range_info):
+        """在範圍列表末端加入一個Run"""
+        # 創建列表項，格式：範圍1, 時間 00:00:00
+        item_text = f"Run{range_info['range_number']}, 時間 {range_info['duration_str']}"
+        item = QListWidgetItem(item_text)
+        item.setData(Qt.UserRole, {"id": range_info['range_number'], "description": f"start_index:{range_info['start_index']},end_index:{range_info['end_index']}"})
+        item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+        item.setCheckState(Qt.Unchecked)
+        self.check_list.addItem(item)
             
     def update_map(self):
         """更新地圖顯示"""
@@ -911,8 +1469,8 @@ class MapViewer(QMainWindow):
             
             # 設置新的起點
             self.plot_manager.set_start_point(x, y)
-            self.canvas.draw()
-            self.track_canvas.draw()
+            self.redraw_scheduler.request(self.canvas)
+            self.redraw_scheduler.request(self.track_canvas)
             
         except Exception as e:
             print(f"設定起點時出錯: {str(e)}")
@@ -929,8 +1487,8 @@ class MapViewer(QMainWindow):
             self.plot_manager.create_plots()
             
             # 重繪圖表
-            self.canvas.draw()
-            self.track_canvas.draw()
+            self.redraw_scheduler.request(self.canvas)
+            self.redraw_scheduler.request(self.track_canvas)
             
         except Exception as e:
             print(f"更新數據列表時出錯: {str(e)}")
@@ -944,7 +1502,7 @@ class MapViewer(QMainWindow):
                 self.track_ax.set_xlim(self.track_home_limits['xlim'])
                 self.track_ax.set_ylim(self.track_home_limits['ylim'])
                 self.track_ax.set_aspect(self.track_home_limits['aspect'])
-                self.track_canvas.draw()
+                self.redraw_scheduler.request(self.track_canvas)
                 print("視圖重置完成")
             else:
                 print("沒有保存的初始視圖範圍")
@@ -954,47 +1512,45 @@ class MapViewer(QMainWindow):
     def switch_lap(self):
         """切換單圈功能"""
         try:
-            checked_items = []
-            checked_ids = []  # 新增: 儲存已勾選項目的ID
+            with tracing.span('switch_lap', 'ui') as span, action_profiler.action('switch_lap'):
+                self._stop_replay()
+                checked_items = []
+                checked_ids = []  # 新增: 儲存已勾選項目的ID
             
-            # 收集已勾選的項目和ID
-            for i in range(self.check_list.count()):
-                item = self.check_list.item(i)
-                if item.checkState() == Qt.Checked:
-                    item_data = item.data(Qt.UserRole)
-                    checked_items.append(item_data)
-                    checked_ids.append(item_data['id'])  # 儲存項目ID
-            
-            if checked_items:
-                # 更新軌跡圖標題
-                print(f"debug checked_items:{checked_items}")
-                if len(checked_ids) == 1:
-                    self.track_ax.set_title(f"範圍 {checked_ids[0]} 軌跡圖", fontsize=12)
-                else:
-                    id_str = ', '.join(str(id) for id in checked_ids)
-                    self.track_ax.set_title(f"範圍 {id_str} 軌跡圖", fontsize=12)
+                # 收集已勾選的項目和ID
+                for i in range(self.check_list.count()):
+                    item = self.check_list.item(i)
+                    if item.checkState() == Qt.Checked:
+                        item_data = item.data(Qt.UserRole)
+                        checked_items.append(item_data)
+                        checked_ids.append(item_data['id'])  # 儲存項目ID
+            
+                if checked_items:
+                    # 更新軌跡圖標題
+                    span.set(runs=checked_ids)
+                    if len(checked_ids) == 1:
+                        self.track_ax.set_title(f"範圍 {checked_ids[0]} 軌跡圖", fontsize=12)
+                    else:
+                        id_str = ', '.join(str(id) for id in checked_ids)
+                        self.track_ax.set_title(f"範圍 {id_str} 軌跡圖", fontsize=12)
                 
-                # 使用 plot_manager 繪製圖表
-                # 重新排序 checked_items,讓第一個選的範圍在最後繪製
-                #checked_items.reverse()
-                success = self.plot_manager.plot_selected_ranges(
-                    checked_items,
-                    self.full_data, 
-                    self.axes,
-                    self.canvas,
-                    self.track_ax,
-                    self.track_canvas
-                )
+                    # 使用 plot_manager 繪製圖表
+                    # 重新排序 checked_items,讓第一個選的範圍在最後繪製
+                    #checked_items.reverse()
+                    success = self.plot_manager.plot_selected_ranges(
+                        checked_items,
+                        self.full_data, 
+                        self.axes,
+                        self.canvas,
+                        self.track_ax,
+                        self.track_canvas
+                    )
                 
-                if success:
-                    print("\n=== 已重繪範圍 ===")
-                    for id in checked_ids:
-                        print(f"範圍 {id}")
+                    if not success:
+                        QMessageBox.warning(self, "警告", "繪製圖表時發生錯誤")
                 else:
-                    QMessageBox.warning(self, "警告", "繪製圖表時發生錯誤")
-            else:
-                print("沒有勾選任何範圍")
-                QMessageBox.warning(self, "警告", "請先勾選要顯示的範圍")
+                    print("沒有勾選任何範圍")
+                    QMessageBox.warning(self, "警告", "請先勾選要顯示的範圍")
             
         except Exception as e:
             print(f"切換單圈時出錯: {str(e)}")
@@ -1002,6 +1558,207 @@ class MapViewer(QMainWindow):
             traceback.print_exc()
             QMessageBox.critical(self, "錯誤", f"切換單圈時出錯：{str(e)}")
 
+    def toggle_replay(self):
+        """開始或停止單圈回放"""
+        try:
+            if self.lap_replay is not None and self.lap_replay.is_running:
+                self._stop_replay()
+                return
+            
+            if not hasattr(self, 'full_data'):
+                QMessageBox.warning(self, "警告", "請先載入數據")
+                return
+            
+            self._stop_replay()
+            
+            # 回放第一個勾選的範圍，沒有勾選時回放整段數據
+            start_index, end_index = 0, len(self.full_data) - 1
+            range_id = None
+            for i in range(self.check_list.count()):
+                item = self.check_list.item(i)
+                if item.checkState() == Qt.Checked:
+                    item_data = item.data(Qt.UserRole)
+                    indices = {}
+                    for pair in item_data['description'].split(','):
+                        key, value = pair.split(':')
+                        indices[key] = int(value)
+                    start_index = indices['start_index']
+                    end_index = indices['end_index']
+                    range_id = item_data['id']
+                    break
+            
+            # 切換單圈後主圖表的X軸是各Run重設後的索引
+            x_offset = 0
+            range_mapping = getattr(self.plot_manager, 'range_index_mapping', None)
+            if (getattr(self.plot_manager, 'current_checked_items', None)
+                    and range_mapping and range_id in range_mapping):
+                x_offset = -range_mapping[range_id]['original_start']
+            
+            self.lap_replay = LapReplay(
+                self.full_data, start_index, end_index,
+                self.track_ax, list(self.plot_manager.axes.values()),
+                x_offset=x_offset,
+                speed=self.replay_speed_spin.value(),
+                finished_callback=self._on_replay_finished,
+                redraw_scheduler=self.redraw_scheduler,
+                parent=self
+            )
+            self.lap_replay.start()
+            self.replay_button.setText("停止回放")
+            
+        except Exception as e:
+            print(f"單圈回放時出錯: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            QMessageBox.critical(self, "錯誤", f"單圈回放時出錯：{str(e)}")
+    
+    def _stop_replay(self):
+        """停止進行中的回放"""
+        if self.lap_replay is not None:
+            self.lap_replay.stop()
+            self.lap_replay = None
+        self.replay_button.setText("回放單圈")
+    
+    def _on_replay_finished(self):
+        """回放結束的回調"""
+        self.lap_replay = None
+        self.replay_button.setText("回放單圈")
+    
+    def _on_replay_speed_changed(self, value):
+        """回放中調整倍速"""
+        if self.lap_replay is not None:
+            self.lap_replay.set_speed(value)
+
+    def toggle_live_mode(self):
+        """開始或停止即時資料模式"""
+        if self.live_worker is not None:
+            self._stop_live_mode()
+            return
+        
+        spec, ok = QInputDialog.getText(
+            self, "即時模式",
+            "資料來源（udp://主機:埠、serial://COM3?baud=115200、replay://檔案.csv 或檔案路徑）：",
+            text=self.live_source_spec)
+        if not ok or not spec.strip():
+            return
+        
+        try:
+            self._stop_replay()
+            source = open_source(spec)
+            self.live_source_spec = spec.strip()
+            self.live_buffer = TelemetryRingBuffer()
+            
+            # 軌跡圖改由即時繪圖器管理
+            if getattr(self, 'track_renderer', None) is not None:
+                self.track_renderer.disconnect()
+                self.track_renderer = None
+            self.live_plotter = LivePlotter(self.plot_manager, self.track_ax, self.live_buffer, parent=self)
+            self.live_plotter.setup()
+            
+            self.live_lap_detector = None
+            self.tail_follower = None  # 即時數據取代目前的檔案
+            self._discard_column_loader()
+            self.is_setting_start_point = False
+            self.set_start_button.setText("設定起點")
+            self.check_list.clear()
+            
+            self.live_worker = LiveIngestWorker(source, self.live_buffer)
+            self.live_worker.rows_received.connect(self._on_live_rows)
+            self.live_worker.error.connect(self._on_live_error)
+            self.live_worker.start()
+            self.live_plotter.start()
+            
+            # 即時模式下仍可設定起點，單圈會隨資料進來即時偵測
+            for button in [self.load_button, self.update_button,
+                           self.switch_lap_button, self.replay_button]:
+                button.setEnabled(False)
+            self.live_button.setText("停止即時")
+            print(f"即時模式已開始: {self.live_source_spec}")
+            
+        except Exception as e:
+            print(f"開始即時模式時出錯: {str(e)}")
+            self._stop_live_mode()
+            QMessageBox.critical(self, "錯誤", f"無法開始即時模式：{str(e)}")
+    
+    def _stop_live_mode(self):
+        """停止即時模式，已接收的資料轉為一般數據供分析"""
+        if self.live_plotter is not None:
+            self.live_plotter.stop()
+        if self.live_worker is not None:
+            self.live_worker.stop()
+        self.live_worker = None
+        self.live_plotter = None
+        self.is_setting_start_point = False
+        self.set_start_button.setText("設定起點")
+        
+        if self.live_buffer is not None and len(self.live_buffer):
+            self.full_data = self.live_buffer.to_dataframe()
+            self.plot_manager.file_boundaries = []
+            self.plot_manager.data_list = [self.full_data]
+            self.plot_manager.create_plots()
+            self._update_track_ax()
+            print(f"即時模式結束，共 {len(self.full_data)} 筆數據")
+            
+            # 起點仍在緩衝區內時，以相同起點重新分析整段數據
+            detector = self.live_lap_detector
+            if detector is not None and detector.laps:
+                start_index = detector.laps[0]['start_index'] - self.live_buffer.first_sequence
+                if start_index >= 0:
+                    self.plot_manager.set_start_point(start_index, self.track_ax, self.track_canvas)
+                else:
+                    self.check_list.clear()
+        self.live_buffer = None
+        self.live_lap_detector = None
+        
+        for button in [self.load_button, self.set_start_button, self.update_button,
+                       self.switch_lap_button, self.replay_button]:
+            button.setEnabled(True)
+        self.live_button.setText("即時模式")
+    
+    def _on_live_track_click(self, event):
+        """即時模式下在軌跡圖上設定起點"""
+        if not self.is_setting_start_point or event.inaxes != self.track_ax:
+            return
+        # 與資料一起在鎖內取得第一筆的序號，寫入線程之後新增的資料不影響序號
+        columns, first, _ = self.live_buffer.read_since(0, ['Longitude', 'Latitude', 'Time'])
+        if not len(columns['Time']):
+            return
+        distances = (columns['Longitude'] - event.xdata) ** 2 + (columns['Latitude'] - event.ydata) ** 2
+        if np.all(np.isnan(distances)):
+            return
+        nearest = int(np.nanargmin(distances))
+        x, y = columns['Longitude'][nearest], columns['Latitude'][nearest]
+        
+        self.live_lap_detector = LapDetector(
+            x, y, first + nearest, columns['Time'][nearest])
+        self.live_plotter.set_start_marker(x, y)
+        self.is_setting_start_point = False
+        self.set_start_button.setText("設定起點")
+        self.check_list.clear()
+        print(f"已在即時軌跡上設定起點: 經度 {x:.6f}, 緯度 {y:.6f}")
+        
+        # 處理起點之後已收到的資料
+        self._on_live_rows(0)
+    
+    def _on_live_rows(self, count):
+        """新資料寫入緩衝區後，只將新增的樣本交給單圈偵測器"""
+        detector = self.live_lap_detector
+        if detector is None or self.live_buffer is None:
+            return
+        columns, first, _ = self.live_buffer.read_since(
+            detector.next_index, ['Longitude', 'Latitude', 'Time'])
+        if first > detector.next_index:
+            print(f"警告: 單圈偵測落後，略過 {first - detector.next_index} 筆已被覆蓋的數據")
+            detector.next_index = first
+        for lap in detector.feed(columns['Longitude'], columns['Latitude'], columns['Time'], first):
+            self._add_range_item(lap)
+            print(f"完成 Run{lap['range_number']}，時間 {lap['duration_str']}")
+    
+    def _on_live_error(self, error_msg):
+        """即時資料接收錯誤的回調"""
+        self._stop_live_mode()
+        QMessageBox.critical(self, "錯誤", f"即時資料接收錯誤：{error_msg}")
+
     def _update_track_ax(self):
         """更新軌跡圖"""
         self.track_ax.clear()
@@ -1009,14 +1766,16 @@ class MapViewer(QMainWindow):
         self.track_ax.clear()
         if 'X' in self.full_data.columns and 'Y' in self.full_data.columns:
             print("繪製位置軌跡圖 (X-Y)")
-            self.track_ax.plot(self.full_data['X'], self.full_data['Y'], 
-                                'b-', linewidth=1.5, zorder=1)
+            self.track_renderer = TrackRenderer(
+                self.track_ax, self.full_data['X'], self.full_data['Y'],
+                color='b', linestyle='-', linewidth=1.5, zorder=1)
             self.track_ax.set_xlabel('X', fontsize=10)
             self.track_ax.set_ylabel('Y', fontsize=10)
         elif 'Longitude' in self.full_data.columns and 'Latitude' in self.full_data.columns:
             print("繪製位置軌跡圖 (經緯度)")
-            self.track_ax.plot(self.full_data['Longitude'], self.full_data['Latitude'], 
-                                'b-', linewidth=1.5, zorder=1)
+            self.track_renderer = TrackRenderer(
+                self.track_ax, self.full_data['Longitude'], self.full_data['Latitude'],
+                color='b', linestyle='-', linewidth=1.5, zorder=1)
             self.track_ax.set_xlabel('經度', fontsize=10)
             self.track_ax.set_ylabel('緯度', fontsize=10)
         
@@ -1035,4 +1794,4 @@ class MapViewer(QMainWindow):
         # 設置軸範圍
         self.track_ax.set_xlim(x_min - margin_x, x_max + margin_x)
         self.track_ax.set_ylim(y_min - margin_y, y_max + margin_y)
-        self.track_canvas.draw()
\ No newline at end of file
+        self.redraw_scheduler.request(self.track_canvas)
\ No newline at end of file
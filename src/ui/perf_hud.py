@@ -0,0 +1,98 @@
+from PyQt5.QtCore import Qt, QTimer
+
+from perf.metrics import counters, current_rss
+from ui.overlay_widget import OverlayWidget
+
+# 顯示的耗時項目與標題（名稱與 counters 中的記錄相同）
+HUD_TIMINGS = [
+    ('draw:main', "主圖表重繪"),
+    ('draw:track', "軌跡圖重繪"),
+    ('analyze_ranges', "單圈分析"),
+    ('find_nearest_point', "最近點查詢"),
+    ('startup', "啟動時間"),
+]
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    return f"{seconds * 1000:.1f} ms"
+
+
+class PerformanceHud(OverlayWidget):
+    """效能監看面板
+
+    疊在主窗口右上角，定時顯示各畫布最近一次的重繪時間、軌跡圖與主圖表
+    實際繪製的頂點數、記憶體用量，以及最近一次單圈分析與最近點查詢的耗時。
+    耗時來自 perf.metrics.counters，與效能測試使用同一份記錄。
+    """
+    REFRESH_MS = 500
+
+    def __init__(self, viewer, parent=None):
+        super().__init__(parent)
+        self.viewer = viewer
+        self.setStyleSheet("background-color: transparent;")
+        self.label.setStyleSheet("""
+            QLabel {
+                color: #7CFC00;
+                background-color: rgba(0, 0, 0, 170);
+                padding: 6px;
+                border-radius: 4px;
+                font-family: Consolas, "Courier New", monospace;
+                font-size: 11px;
+            }
+        """)
+        self.label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.layout().setAlignment(self.label, Qt.AlignTop | Qt.AlignRight)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.REFRESH_MS)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        """顯示或隱藏面板"""
+        if self.isVisible():
+            self.timer.stop()
+            self.hide()
+            return
+        self.setGeometry(self.parent().rect())
+        self.refresh()
+        self.show()
+        self.raise_()
+        self.timer.start()
+
+    def refresh(self):
+        try:
+            self.label.setText("\n".join(self._lines()))
+        except Exception as e:
+            self.label.setText(f"無法取得效能資料：{str(e)}")
+
+    def _lines(self):
+        lines = ["效能監看 (F12)"]
+        for name, title in HUD_TIMINGS:
+            stat = counters.get(name)
+            if stat is None:
+                lines.append(f"{title:<8}-")
+            else:
+                lines.append(f"{title:<8}{_format_seconds(stat['last']):>10}"
+                             f"  平均 {_format_seconds(stat['mean'])}  ×{stat['count']}")
+
+        renderer = getattr(self.viewer, 'track_renderer', None)
+        if renderer is not None:
+            lines.append(f"{'軌跡頂點':<8}{renderer.drawn_vertex_count:>10,} / {renderer.raw_vertex_count:,}"
+                         f"  (層級 {renderer.current_level})")
+        raw, drawn = self.viewer.plot_manager.vertex_counts()
+        if raw:
+            lines.append(f"{'主圖表頂點':<7}{drawn:>10,} / {raw:,}")
+
+        rss = current_rss()
+        memory = f"{rss / 1024 / 1024:>7.0f} MB" if rss is not None else "-"
+        data = getattr(self.viewer, 'full_data', None)
+        if data is not None:
+            data_bytes = data.memory_usage(index=False, deep=False).sum()
+            memory += f"  (數據 {data_bytes / 1024 / 1024:.0f} MB, {len(data):,} 筆)"
+        lines.append(f"{'記憶體':<8}{memory}")
+        return lines